@@ -8,7 +8,7 @@ from ..models.auth_models import (
     UserResponse,
     UserBase
 )
-from ..services.auth import auth_service
+from ..services.auth import auth_service, oauth2_scheme
 from ..services.supabase_client import supabase_service
 
 router = APIRouter(tags=["auth"])
@@ -25,6 +25,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # The row just read is the user's current state; refresh every cached
+    # principal for them (e.g. after a role change made in the database)
+    auth_service.invalidate_user(str(user.get("id")))
+    
     access_token = auth_service.create_access_token(
         data={"sub": str(user.get("id"))}
     )
@@ -45,8 +49,8 @@ async def register_user(user_data: UserCreate):
     
     # Check if user already exists
     try:
-        response = supabase_service.client.table('users').select('id').eq('email', user_data.email).execute()
-        if response.data and len(response.data) > 0:
+        existing_user = await supabase_service.get_user_by_email(user_data.email)
+        if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Email already registered"
@@ -58,22 +62,21 @@ async def register_user(user_data: UserCreate):
         )
     
     # Hash the password
-    password_hash = auth_service.get_password_hash(user_data.password)
+    password_hash = await auth_service.get_password_hash(user_data.password)
     
     # Create user in database
     try:
         user_dict = user_data.dict(exclude={"password"})
         user_dict["password_hash"] = password_hash
         
-        response = supabase_service.client.table('users').insert(user_dict).execute()
+        new_user = await supabase_service.create_user(user_dict)
         
-        if not response.data or len(response.data) == 0:
+        if not new_user:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create user"
             )
             
-        new_user = response.data[0]
         return UserResponse(
             id=new_user.get("id"),
             email=new_user.get("email"),
@@ -86,6 +89,18 @@ async def register_user(user_data: UserCreate):
             detail=f"Error creating user: {str(e)}"
         )
 
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme)):
+    """
+    Log out by revoking the token until it expires.
+    
+    Revocation is held in memory by the worker that serves this request, so
+    other workers, or this one after a restart, still accept the token until
+    it expires.
+    """
+    auth_service.logout(token)
+    return {"success": True}
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: Dict[str, Any] = Depends(auth_service.get_current_user)):
     """Get information about the currently authenticated user."""
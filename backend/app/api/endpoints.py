@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException, status
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from ..models.api_models import (
     PromptRequest,
     PromptResponse,
@@ -6,9 +8,20 @@ from ..models.api_models import (
     HealthResponse,
     APITestResponse,
 )
-from ..services import prompt_processor, llm_client
+from ..services import prompt_processor, async_llm_client
+from ..services.llm_client import prefix_cache_stats, hedge_policy
+from ..services.agents import agent_pool, structured_output_stats
+from ..services.response_cache import response_cache, wants_cache_bypass
+from ..services.semantic_cache import semantic_cache
+from ..services.password_hasher import password_hasher
+from ..services.auth import auth_service
+from ..services.history_recorder import history_recorder
+from ..services.history_search import history_search_index
+from ..services.retrieval import few_shot_retriever
 from ..core.config import settings
 from ..core.agent_config import get_available_roles
+from ..core.prompt_templates import prompt_templates
+from ..utils.streaming import format_sse, SSE_HEADERS
 
 router = APIRouter()
 
@@ -19,7 +32,8 @@ async def root():
         "status": "online",
         "endpoints": {
             "process-prompt": "/process-prompt (POST)",
-            "normal-prompt": "/normal-prompt (POST)"
+            "normal-prompt": "/normal-prompt (POST)",
+            "normal-prompt-stream": "/normal-prompt/stream (POST, text/event-stream)"
         },
         "available_roles": get_available_roles()
     }
@@ -43,6 +57,25 @@ async def health_check():
         roles_available=get_available_roles()
     )
 
+@router.get("/metrics", tags=["general"])
+async def metrics():
+    """Get in-process pool metrics."""
+    return {
+        "agent_pool": agent_pool.stats(),
+        "structured_output": structured_output_stats(),
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "prompt_coalescing": prompt_processor.stats(),
+        "prompt_templates": prompt_templates.stats(),
+        "prefix_cache": prefix_cache_stats.snapshot(),
+        "hedging": hedge_policy.stats(),
+        "password_hasher": password_hasher.stats(),
+        "auth_cache": auth_service.cache_stats(),
+        "history_recorder": history_recorder.stats(),
+        "history_search": history_search_index.stats(),
+        "few_shot_retrieval": few_shot_retriever.stats() if few_shot_retriever is not None else None,
+    }
+
 @router.get("/test-api", response_model=APITestResponse, tags=["testing"])
 async def test_api():
     """Test endpoint to verify LLM API is working."""
@@ -55,7 +88,7 @@ async def test_api():
             )
         
         # Make a simple API call
-        response = llm_client.generate_completion(
+        response = await async_llm_client.agenerate_completion(
             messages=[
                 {"role": "user", "content": "Hello from Gregify! This is a test message."}
             ],
@@ -89,10 +122,17 @@ async def test_api():
         )
 
 @router.post("/normal-prompt", response_model=NormalPromptResponse, tags=["prompt"])
-async def normal_prompt(request: PromptRequest):
+async def normal_prompt(
+    request: PromptRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+    current_user: Optional[Dict[str, Any]] = Depends(auth_service.get_optional_user),
+):
     """
     Process a prompt directly with the LLM API.
     This is faster but provides a simpler enhancement compared to the multi-agent system.
+    Repeated and near-duplicate prompts are served from the response caches
+    unless the request sets bypassCache or sends Cache-Control: no-cache.
     """
     if not settings.OPENAI_API_KEY:
         raise HTTPException(
@@ -103,7 +143,8 @@ async def normal_prompt(request: PromptRequest):
     result = await prompt_processor.process_with_direct_api(
         prompt=request.prompt,
         role=request.role,
-        model=request.model
+        model=request.model,
+        bypass_cache=wants_cache_bypass(request.bypassCache, cache_control)
     )
     
     if not result["success"]:
@@ -112,14 +153,58 @@ async def normal_prompt(request: PromptRequest):
             detail=result.get("error", "Unknown error in prompt processing")
         )
     
+    if result.get("cache") and response_cache is not None:
+        response.headers.update(response_cache.headers(result["cache"]))
+    
+    # Signed-in users get a history row; the write happens in the background
+    if current_user is not None:
+        history_recorder.record(
+            user_id=current_user["id"],
+            original_prompt=request.prompt,
+            enhanced_prompt=result["response"],
+            role=request.role,
+            model=request.model or settings.DEFAULT_MODEL
+        )
+    
     return NormalPromptResponse(
         success=True,
         response=result["response"],
         error=None
     )
 
+@router.post("/normal-prompt/stream", tags=["prompt"])
+async def normal_prompt_stream(request: PromptRequest):
+    """
+    Process a prompt directly with the LLM API and stream the result.
+    Emits Server-Sent Events: `delta` for each token chunk, `section` when the
+    response moves from the enhanced prompt to the explanation, and a final
+    `summary` (or `error`) event.
+    """
+    if not settings.OPENAI_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="API key is not configured. Please check your .env file."
+        )
+    
+    async def event_stream():
+        async for event in prompt_processor.stream_with_direct_api(
+            prompt=request.prompt,
+            role=request.role,
+            model=request.model
+        ):
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @router.post("/process-prompt", response_model=PromptResponse, tags=["prompt"])
-async def process_prompt(request: PromptRequest):
+async def process_prompt(
+    request: PromptRequest,
+    current_user: Optional[Dict[str, Any]] = Depends(auth_service.get_optional_user),
+):
     """
     Process a prompt through the multi-agent system.
     This provides a more sophisticated enhancement but takes longer.
@@ -133,20 +218,32 @@ async def process_prompt(request: PromptRequest):
     result = await prompt_processor.process_with_agents(
         prompt=request.prompt,
         role=request.role,
-        session_id=request.sessionId
+        session_id=request.sessionId,
+        candidates=request.candidates
     )
     
+    if current_user is not None:
+        history_recorder.record(
+            user_id=current_user["id"],
+            original_prompt=request.prompt,
+            enhanced_prompt=result["final_prompt"],
+            role=request.role,
+            success=result["success"]
+        )
+    
     if not result["success"]:
         return PromptResponse(
             success=False,
             messages=result["messages"],
             final_prompt=result["final_prompt"],
-            error=result["error"]
+            error=result["error"],
+            metadata=result.get("metadata", {})
         )
     
     return PromptResponse(
         success=True,
         messages=result["messages"],
         final_prompt=result["final_prompt"],
-        error=None
+        error=None,
+        metadata=result.get("metadata", {})
     ) 
\ No newline at end of file
@@ -0,0 +1,91 @@
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from ..core.config import settings
+from ..models.api_models import HistoryPageResponse
+from ..services.auth import auth_service
+from ..services.supabase_client import supabase_service, HISTORY_PREVIEW_COLUMNS
+from ..services.history_search import history_search_index, postgres_search_failed, search_backend
+from ..utils.pagination import encode_cursor, decode_cursor
+
+router = APIRouter(tags=["history"])
+
+@router.get("", response_model=HistoryPageResponse)
+async def get_history(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of records"),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated columns to return (defaults to previews only)"
+    ),
+    role: Optional[str] = Query(None, description="Only return history for this role"),
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
+):
+    """Get the current user's prompt history, newest first, one page at a time."""
+    if not supabase_service.is_configured():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="History service not available"
+        )
+    
+    columns = [field.strip() for field in fields.split(",") if field.strip()] if fields else HISTORY_PREVIEW_COLUMNS
+    try:
+        result = await supabase_service.get_prompt_history_page(
+            current_user["id"],
+            limit=limit,
+            cursor=cursor,
+            columns=columns,
+            role=role
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if not result["success"]:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=result.get("error", "Unknown error fetching history")
+        )
+    
+    return HistoryPageResponse(items=result["data"], next_cursor=result["next_cursor"])
+
+@router.get("/search", response_model=HistoryPageResponse)
+async def search_history(
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of records"),
+    role: Optional[str] = Query(None, description="Only search history for this role"),
+    current_user: Dict[str, Any] = Depends(auth_service.get_current_user),
+):
+    """Search the current user's prompt history, best matches first."""
+    try:
+        offset = decode_cursor(cursor, 1)[0] if cursor else 0
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError("Invalid cursor")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # One extra row tells us whether another page exists
+    rows = None
+    if search_backend() == "postgres":
+        result = await supabase_service.search_prompt_history(
+            current_user["id"],
+            q,
+            limit=limit + 1,
+            offset=offset,
+            role=role
+        )
+        if result["success"]:
+            rows = result["data"]
+        elif settings.HISTORY_SEARCH_BACKEND == "auto":
+            # e.g. the search RPC is not deployed; serve the local index instead
+            postgres_search_failed()
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=result.get("error", "Unknown error searching history")
+            )
+    if rows is None:
+        rows = history_search_index.search(current_user["id"], q, limit=limit + 1, offset=offset, role=role)
+    
+    next_cursor = encode_cursor([offset + limit]) if len(rows) > limit else None
+    return HistoryPageResponse(items=rows[:limit], next_cursor=next_cursor)
\ No newline at end of file
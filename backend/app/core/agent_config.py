@@ -88,28 +88,15 @@ def get_available_roles() -> List[str]:
 
 def get_agent_config(agent_type: str, role: str) -> Dict[str, Any]:
     """Get the combined configuration for a specific agent and role."""
+    # The registry compiles from the configs above, so it is imported late
+    from .prompt_templates import prompt_templates
+    
     if agent_type not in AGENT_CONFIGS:
         raise ValueError(f"Unknown agent type: {agent_type}")
     
-    if role not in ROLE_CONFIGS:
-        raise ValueError(f"Unknown role: {role}")
-    
-    # Start with the base config
-    config = BASE_CONFIG.copy()
-    
-    # Add agent-specific config
-    agent_config = AGENT_CONFIGS[agent_type].copy()
-    
-    # Add role-specific context to the system message
-    role_config = ROLE_CONFIGS[role].copy()
-    
-    # Combine the system messages
-    agent_config["system_message"] = (
-        f"{agent_config['system_message']}\n\n"
-        f"Role-specific context:\n{role_config['system_message']}"
-    )
-    
-    # Update the config with agent-specific settings
-    config.update(agent_config)
-    
+    # The system message is precompiled; only the small dicts are merged here
+    template = prompt_templates.get(agent_type, role)
+    config = {**BASE_CONFIG, **AGENT_CONFIGS[agent_type], "system_message": template.system_message}
+    if template.temperature is not None:
+        config["temperature"] = template.temperature
     return config 
\ No newline at end of file
@@ -21,6 +21,8 @@ class Settings:
         "PERPLEXITY_BASE_URL",
         "https://api.perplexity.ai"
     )
+    DEEPSEEK_BASE_URL: str = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL")
     
     # Server settings
     HOST: str = os.getenv("HOST", "0.0.0.0")
@@ -44,9 +46,162 @@ class Settings:
     DEFAULT_MAX_TOKENS: int = int(os.getenv("DEFAULT_MAX_TOKENS", "1500"))
     SEED: int = int(os.getenv("SEED", "42"))
     
+    # Agent execution engine: "autogen" (default) runs an AutoGen
+    # assistant/user-proxy conversation, "direct" opts in to one async
+    # completion per agent without the AutoGen round trip
+    AGENT_ENGINE: str = os.getenv("AGENT_ENGINE", "autogen")
+    
+    # Agent output: "text" scrapes free-form replies with regexes, "json" asks
+    # for JSON matching each agent's schema and falls back to the regexes when
+    # it does not validate. The provider JSON mode sent with "json" requests:
+    # "json_schema", "json_object", or "none" (instructions in the message only)
+    AGENT_OUTPUT_MODE: str = os.getenv("AGENT_OUTPUT_MODE", "text")
+    AGENT_JSON_RESPONSE_FORMAT: str = os.getenv("AGENT_JSON_RESPONSE_FORMAT", "json_schema")
+    
+    # Reusable agent pool: agents prebuilt per (agent type, role) at startup,
+    # and the most that may exist per (agent type, role) under load
+    AGENT_POOL_SIZE: int = int(os.getenv("AGENT_POOL_SIZE", "2"))
+    AGENT_POOL_MAX_SIZE: int = int(os.getenv("AGENT_POOL_MAX_SIZE", "16"))
+    
+    # Speculative draft: a refinement without critic feedback runs alongside
+    # the critic, is evaluated alongside the main refinement, and wins if the
+    # evaluator scores it higher (costs two extra calls, adds no latency)
+    AGENT_SPECULATIVE_DRAFT: bool = os.getenv("AGENT_SPECULATIVE_DRAFT", "false").lower() == "true"
+    
+    # Best-of-N refinement: candidates per request (1 disables), the most a
+    # request may ask for, temperature added per extra candidate, and the most
+    # extra candidates in flight process-wide (beyond it requests get fewer)
+    AGENT_REFINE_CANDIDATES: int = int(os.getenv("AGENT_REFINE_CANDIDATES", "1"))
+    AGENT_REFINE_MAX_CANDIDATES: int = int(os.getenv("AGENT_REFINE_MAX_CANDIDATES", "4"))
+    AGENT_REFINE_TEMPERATURE_STEP: float = float(os.getenv("AGENT_REFINE_TEMPERATURE_STEP", "0.2"))
+    AGENT_REFINE_CONCURRENCY: int = int(os.getenv("AGENT_REFINE_CONCURRENCY", "32"))
+    
+    # Early exit: skip the whole pipeline when the local pre-gate scores the
+    # prompt at or above AGENT_PREGATE_THRESHOLD (0-1), and skip refinement
+    # and evaluation when the critic rates clarity, technical accuracy and
+    # completeness all at or above AGENT_CRITIC_EXIT_THRESHOLD
+    AGENT_EARLY_EXIT: bool = os.getenv("AGENT_EARLY_EXIT", "false").lower() == "true"
+    AGENT_PREGATE_THRESHOLD: float = float(os.getenv("AGENT_PREGATE_THRESHOLD", "0.9"))
+    AGENT_CRITIC_EXIT_THRESHOLD: float = float(os.getenv("AGENT_CRITIC_EXIT_THRESHOLD", "0.85"))
+    
+    # LLM HTTP connection pool settings
+    LLM_POOL_MAX_CONNECTIONS: int = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "500"))
+    LLM_POOL_MAX_KEEPALIVE: int = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "100"))
+    LLM_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+    LLM_POOL_MAX_PER_HOST: int = int(os.getenv("LLM_POOL_MAX_PER_HOST", "200"))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_REQUEST_TIMEOUT: float = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+    LLM_CONNECT_TIMEOUT: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    
+    # Hedged requests: when a call has not finished (or a stream has not
+    # produced its first token) by the LLM_HEDGE_PERCENTILE latency of recent
+    # calls, a backup call is raced against it and the loser is cancelled.
+    # Backups are capped at LLM_HEDGE_BUDGET of all calls, and no call is
+    # hedged until LLM_HEDGE_MIN_SAMPLES latencies have been seen
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_HEDGE_BUDGET: float = float(os.getenv("LLM_HEDGE_BUDGET", "0.05"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    
+    # Per-user provider client registry
+    CLIENT_REGISTRY_MAX_SIZE: int = int(os.getenv("CLIENT_REGISTRY_MAX_SIZE", "1000"))
+    CLIENT_REGISTRY_IDLE_TTL: float = float(os.getenv("CLIENT_REGISTRY_IDLE_TTL", "1800"))
+    
+    # Provider routing for direct completions: "fixed" (default) uses only the
+    # requested provider, "failover" tries it first and falls back to the
+    # user's other providers on connect errors, timeouts, 429s and 5xx
+    # responses, "latency" (opt-in; may answer from a provider the user did not
+    # pick) tries the fastest healthy backend first. Backends are provider:model
+    # pairs; latency and error rate are EWMAs weighted by PROVIDER_EWMA_ALPHA,
+    # and a backend whose error rate reaches PROVIDER_ERROR_THRESHOLD is tried
+    # last until PROVIDER_COOLDOWN seconds pass without a failure
+    PROVIDER_ROUTING: str = os.getenv("PROVIDER_ROUTING", "fixed")
+    PROVIDER_BACKENDS: str = os.getenv("PROVIDER_BACKENDS", "deepseek:deepseek-chat,openai:gpt-4o-mini")
+    PROVIDER_EWMA_ALPHA: float = float(os.getenv("PROVIDER_EWMA_ALPHA", "0.2"))
+    PROVIDER_ERROR_THRESHOLD: float = float(os.getenv("PROVIDER_ERROR_THRESHOLD", "0.5"))
+    PROVIDER_COOLDOWN: float = float(os.getenv("PROVIDER_COOLDOWN", "30"))
+    
+    # Per-user API key record cache
+    API_KEY_CACHE_MAX_SIZE: int = int(os.getenv("API_KEY_CACHE_MAX_SIZE", "10000"))
+    API_KEY_CACHE_TTL: float = float(os.getenv("API_KEY_CACHE_TTL", "300"))
+    API_KEY_CACHE_NEGATIVE_TTL: float = float(os.getenv("API_KEY_CACHE_NEGATIVE_TTL", "30"))
+    
+    # Prompt enhancement response cache: backend is "memory", "sqlite" (shared
+    # by all workers on a host) or "none". The sqlite backend prunes expired
+    # and least recently used entries at most every PRUNE_INTERVAL seconds
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_MAX_SIZE: int = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "5000"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_SQLITE_PATH: str = os.getenv("RESPONSE_CACHE_SQLITE_PATH", "cache/responses.sqlite3")
+    RESPONSE_CACHE_PRUNE_INTERVAL: float = float(os.getenv("RESPONSE_CACHE_PRUNE_INTERVAL", "30"))
+    
+    # Semantic near-duplicate cache (opt-in): prompts whose hashed n-gram vectors
+    # have a cosine similarity above the threshold, and the same negations,
+    # numbers, literals and word order, reuse a cached enhancement. Each
+    # (role, model) scope holds up to MAX_ENTRIES; the least recently used
+    # scope is dropped past MAX_SCOPES
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_DIM: int = int(os.getenv("SEMANTIC_CACHE_DIM", "512"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+    SEMANTIC_CACHE_MAX_SCOPES: int = int(os.getenv("SEMANTIC_CACHE_MAX_SCOPES", "32"))
+    SEMANTIC_CACHE_TTL: float = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+    SEMANTIC_CACHE_SAMPLE_RATE: float = float(os.getenv("SEMANTIC_CACHE_SAMPLE_RATE", "0.02"))
+    SEMANTIC_CACHE_VERIFY_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_VERIFY_THRESHOLD", "0.6"))
+    
+    # Few-shot examples retrieved from rag_structure.json: examples per prompt,
+    # minimum blended score, weight of vector similarity against BM25 (0 uses
+    # BM25 only) and how often the file is checked for changes (seconds)
+    RAG_ENABLED: bool = os.getenv("RAG_ENABLED", "true").lower() == "true"
+    RAG_EXAMPLES_PATH: str = os.getenv(
+        "RAG_EXAMPLES_PATH",
+        os.path.join(os.path.dirname(root_env_path), "rag_structure.json")
+    )
+    RAG_TOP_K: int = int(os.getenv("RAG_TOP_K", "2"))
+    RAG_MIN_SCORE: float = float(os.getenv("RAG_MIN_SCORE", "0.25"))
+    RAG_DENSE_WEIGHT: float = float(os.getenv("RAG_DENSE_WEIGHT", "0.5"))
+    RAG_RELOAD_INTERVAL: float = float(os.getenv("RAG_RELOAD_INTERVAL", "5"))
+    
+    # Optional JSON file overriding role and agent system messages or
+    # temperatures, and how often it is checked for changes (seconds)
+    PROMPT_TEMPLATES_PATH: Optional[str] = os.getenv("PROMPT_TEMPLATES_PATH")
+    PROMPT_TEMPLATES_RELOAD_INTERVAL: float = float(os.getenv("PROMPT_TEMPLATES_RELOAD_INTERVAL", "5"))
+    
+    # Password hashing pool: bcrypt threads and how many operations may queue
+    # before logins are shed with a 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    
+    # Authenticated-user caches (decoded tokens and user principals); entries
+    # never outlive their token
+    AUTH_CACHE_MAX_SIZE: int = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+    AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", "300"))
+    
     # Supabase settings
     SUPABASE_URL: Optional[str] = os.getenv("SUPABASE_URL")
     SUPABASE_KEY: Optional[str] = os.getenv("SUPABASE_KEY")
+    SUPABASE_POOL_MAX_CONNECTIONS: int = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "50"))
+    SUPABASE_POOL_MAX_KEEPALIVE: int = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+    SUPABASE_TIMEOUT: float = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    SUPABASE_CONNECT_TIMEOUT: float = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3"))
+    
+    # Write-behind prompt history: rows are flushed in bulk inserts of up to
+    # HISTORY_BATCH_SIZE rows or every HISTORY_FLUSH_INTERVAL seconds; at most
+    # HISTORY_MAX_PENDING rows are held in memory and the rest, plus batches the
+    # database rejects as unavailable, go to the spill file for retry
+    HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+    HISTORY_FLUSH_INTERVAL: float = float(os.getenv("HISTORY_FLUSH_INTERVAL", "2"))
+    HISTORY_MAX_PENDING: int = int(os.getenv("HISTORY_MAX_PENDING", "5000"))
+    HISTORY_SPILL_PATH: str = os.getenv("HISTORY_SPILL_PATH", "cache/history_spill.jsonl")
+    
+    # History search: "postgres" (tsvector/GIN via RPC), "local" (in-process
+    # inverted index fed by the history recorder) or "auto" (postgres, falling
+    # back to local for RETRY_INTERVAL seconds whenever the RPC fails); the
+    # local index keeps the newest N rows per user
+    HISTORY_SEARCH_BACKEND: str = os.getenv("HISTORY_SEARCH_BACKEND", "auto")
+    HISTORY_SEARCH_MAX_DOCS_PER_USER: int = int(os.getenv("HISTORY_SEARCH_MAX_DOCS_PER_USER", "1000"))
+    HISTORY_SEARCH_RETRY_INTERVAL: float = float(os.getenv("HISTORY_SEARCH_RETRY_INTERVAL", "60"))
     
     # JWT settings for authentication
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your-secret-key-for-development-only")
@@ -0,0 +1,202 @@
+"""
+Precompiled system prompts for every agent and role.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .agent_config import AGENT_CONFIGS, ROLE_CONFIGS
+from .config import settings
+
+# Template kind for the single-call enhancement path
+DIRECT = "direct"
+
+DIRECT_SYSTEM_TEMPLATE = """You are a prompt optimization expert specializing in {role} topics. Your task is to IMPROVE the given prompt, not to answer it.
+
+Focus on making the original prompt:
+1. More specific and detailed
+2. Better structured
+3. More likely to get a high-quality response
+4. Include relevant context and constraints
+
+Role-specific guidance for {role}:
+{guidance}
+
+DO NOT answer the prompt's question - instead, rewrite it to be a better prompt.
+
+Your response should be in this format:
+"Enhanced prompt: [your improved version of the prompt]"
+
+Followed by "Explanation:" and a brief explanation of what you improved and why."""
+
+class PromptTemplate(NamedTuple):
+    """An immutable compiled system prompt."""
+    kind: str
+    role: str
+    system_message: str
+    temperature: Optional[float]
+    content_hash: str
+    version: int
+
+def content_hash(system_message: str) -> str:
+    """Stable short hash of a system message."""
+    return hashlib.sha256(system_message.encode("utf-8")).hexdigest()[:16]
+
+def compile_templates(
+    role_configs: Dict[str, Dict[str, Any]],
+    agent_configs: Dict[str, Dict[str, Any]],
+    version: int,
+) -> Dict[Tuple[str, str], PromptTemplate]:
+    """
+    Build the system prompt of every (agent type, role) and (direct, role) pair.
+    
+    Args:
+        role_configs: Role configurations (see ROLE_CONFIGS)
+        agent_configs: Agent configurations (see AGENT_CONFIGS)
+        version: Version stamped on the templates
+    
+    Returns:
+        Templates keyed by (kind, role)
+    """
+    templates = {}
+    for role, role_config in role_configs.items():
+        guidance = role_config.get("system_message", "Optimize for clarity and specificity in this domain.")
+        for agent_type, agent_config in agent_configs.items():
+            message = f"{agent_config['system_message']}\n\nRole-specific context:\n{guidance}"
+            templates[(agent_type, role)] = PromptTemplate(
+                agent_type, role, message, agent_config.get("temperature"), content_hash(message), version
+            )
+        message = DIRECT_SYSTEM_TEMPLATE.format(role=role, guidance=guidance)
+        templates[(DIRECT, role)] = PromptTemplate(DIRECT, role, message, None, content_hash(message), version)
+    return templates
+
+class PromptTemplateRegistry:
+    """
+    Compiled system prompts, swapped in whole when the configuration changes.
+    
+    Templates are compiled from ROLE_CONFIGS and AGENT_CONFIGS, with optional
+    overrides from a JSON file ({"roles": {role: {...}}, "agents": {type: {...}}})
+    that may replace the system message or temperature of a known role or
+    agent. The file is checked for changes at most every reload_interval
+    seconds; a file that fails to load or validate keeps the current templates.
+    """
+    
+    def __init__(
+        self,
+        overrides_path: Optional[str] = settings.PROMPT_TEMPLATES_PATH,
+        reload_interval: float = settings.PROMPT_TEMPLATES_RELOAD_INTERVAL,
+    ):
+        """
+        Initialize the registry and compile the built-in templates.
+        
+        Args:
+            overrides_path: Optional JSON overrides file
+            reload_interval: Seconds between checks of the file's modification time
+        """
+        self.overrides_path = overrides_path
+        self.reload_interval = reload_interval
+        self.version = 0
+        self.loads = 0
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._templates: Dict[Tuple[str, str], PromptTemplate] = {}
+        self.load()
+    
+    def _read_overrides(self) -> Dict[str, Any]:
+        """Read and validate the overrides file."""
+        with open(self.overrides_path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for section, known in (("roles", ROLE_CONFIGS), ("agents", AGENT_CONFIGS)):
+            for name, values in overrides.get(section, {}).items():
+                if name not in known:
+                    raise ValueError(f"Unknown {section[:-1]} in overrides: {name}")
+                unknown = set(values) - {"system_message", "temperature"}
+                if unknown:
+                    raise ValueError(f"Unsupported override fields for {name}: {', '.join(sorted(unknown))}")
+        return overrides
+    
+    def load(self) -> bool:
+        """
+        Compile the templates, applying the overrides file if there is one.
+        
+        Returns:
+            True if new templates were swapped in
+        """
+        self._checked_at = time.monotonic()
+        role_configs = ROLE_CONFIGS
+        agent_configs = AGENT_CONFIGS
+        mtime = None
+        if self.overrides_path and os.path.exists(self.overrides_path):
+            try:
+                mtime = os.path.getmtime(self.overrides_path)
+                overrides = self._read_overrides()
+            except (OSError, ValueError) as e:
+                print(f"Error loading prompt templates from {self.overrides_path}: {e}")
+                # Keep serving the current templates, or start from the built-in ones
+                if self._templates:
+                    return False
+                overrides = {}
+            role_configs = {
+                role: {**config, **overrides.get("roles", {}).get(role, {})}
+                for role, config in ROLE_CONFIGS.items()
+            }
+            agent_configs = {
+                agent_type: {**config, **overrides.get("agents", {}).get(agent_type, {})}
+                for agent_type, config in AGENT_CONFIGS.items()
+            }
+        
+        # Readers hold a reference to the old dict, so one assignment swaps atomically
+        self._templates = compile_templates(role_configs, agent_configs, self.version + 1)
+        self.version += 1
+        self.loads += 1
+        self._mtime = mtime
+        return True
+    
+    def _maybe_reload(self) -> None:
+        """Recompile if the overrides file appeared, changed or disappeared."""
+        now = time.monotonic()
+        if not self.overrides_path or now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.overrides_path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.load()
+    
+    def get(self, kind: str, role: str) -> PromptTemplate:
+        """
+        Get a compiled template.
+        
+        Args:
+            kind: An agent type or DIRECT
+            role: The role context
+        
+        Returns:
+            The template
+        
+        Raises:
+            ValueError: For an unknown kind or role
+        """
+        self._maybe_reload()
+        template = self._templates.get((kind, role))
+        if template is None:
+            if role not in ROLE_CONFIGS:
+                raise ValueError(f"Unknown role: {role}")
+            raise ValueError(f"Unknown agent type: {kind}")
+        return template
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the template version and the content hash of every template."""
+        return {
+            "version": self.version,
+            "loads": self.loads,
+            "templates": len(self._templates),
+            "hashes": {f"{kind}:{role}": template.content_hash for (kind, role), template in self._templates.items()},
+        }
+
+# Create the global template registry; built-in templates compile at import
+prompt_templates = PromptTemplateRegistry()
\ No newline at end of file
@@ -5,9 +5,15 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .api import api_router
 from .api.auth_endpoints import router as auth_router
+from .api.history_endpoints import router as history_router
 from .core.config import settings
 from .utils import app_logger, setup_fastapi_logging
 from .services.supabase_client import supabase_service
+from .services.llm_client import async_llm_client
+from .services.agents import agent_pool
+from .services.password_hasher import password_hasher
+from .services.history_recorder import history_recorder
+from .services.retrieval import few_shot_retriever
 from . import __version__
 
 # Setup logging
@@ -75,6 +81,7 @@ async def log_requests(request: Request, call_next):
 # Include the API routers
 app.include_router(api_router)
 app.include_router(auth_router, prefix="/auth")
+app.include_router(history_router, prefix="/history")
 
 # Validate settings on startup
 @app.on_event("startup")
@@ -86,11 +93,26 @@ async def startup_event():
     app_logger.info(f"API configured: {bool(settings.OPENAI_API_KEY)}")
     app_logger.info(f"Supabase configured: {supabase_service.is_configured()}")
 
+    # Prebuild agents so requests do not pay for agent construction
+    warmed = await agent_pool.warm()
+    app_logger.info(f"Agent pool warmed: {warmed} agents ({settings.AGENT_ENGINE} engine)")
+
+    if few_shot_retriever is not None:
+        app_logger.info(f"Few-shot examples loaded: {few_shot_retriever.load()}")
+    
+    # Prompt history is written in batches by a background task
+    history_recorder.start()
+
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown."""
     app_logger.info(f"Shutting down {settings.PROJECT_NAME}")
+    await async_llm_client.aclose()
+    # Flush buffered history before the database pool closes
+    await history_recorder.stop()
+    await supabase_service.aclose()
+    password_hasher.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
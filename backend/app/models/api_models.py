@@ -9,6 +9,12 @@ class PromptRequest(BaseModel):
     role: str = Field(..., description="The role context for the prompt")
     model: str = Field("sonar", description="The model to use for processing")
     sessionId: str = Field(..., description="Unique session identifier")
+    bypassCache: bool = Field(False, description="Skip the response cache and fetch a fresh enhancement")
+    candidates: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Refinement candidates for the multi-agent path (capped by the server)"
+    )
 
 class AgentMessage(BaseModel):
     """
@@ -26,6 +32,7 @@ class PromptResponse(BaseModel):
     messages: List[AgentMessage] = Field(default_factory=list, description="Messages from the agents")
     final_prompt: str = Field(..., description="The final enhanced prompt")
     error: Optional[str] = Field(None, description="Error message if any")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Pipeline stage timings and details")
 
 class NormalPromptResponse(BaseModel):
     """
@@ -35,6 +42,13 @@ class NormalPromptResponse(BaseModel):
     response: str = Field(..., description="The enhanced prompt")
     error: Optional[str] = Field(None, description="Error message if any")
 
+class HistoryPageResponse(BaseModel):
+    """
+    Response model for one page of prompt history.
+    """
+    items: List[Dict[str, Any]] = Field(default_factory=list, description="History records, newest first")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or null on the last page")
+
 class HealthResponse(BaseModel):
     """
     Response model for the health check endpoint.
@@ -2,12 +2,20 @@
 Services module that contains the different services like LLM and agent management.
 """
 
-from .llm_client import LLMClient, llm_client
+from .llm_client import LLMClient, llm_client, AsyncLLMClient, async_llm_client
 from .prompt_processor import PromptProcessorService, prompt_processor
+from .client_registry import ClientRegistry, client_registry
+from .api_key_cache import ApiKeyCache, api_key_cache
 
 __all__ = [
     "LLMClient",
     "llm_client",
+    "AsyncLLMClient",
+    "async_llm_client",
     "PromptProcessorService",
     "prompt_processor",
+    "ClientRegistry",
+    "client_registry",
+    "ApiKeyCache",
+    "api_key_cache",
 ] 
\ No newline at end of file
@@ -3,14 +3,18 @@ Agents module that contains the different agent implementations
 for prompt enhancement and analysis.
 """
 
-from .base import BaseAgent
+from .base import BaseAgent, structured_output_stats
 from .critic import CriticAgent
 from .refiner import RefinerAgent
 from .evaluator import EvaluatorAgent
+from .pool import AgentPool, agent_pool
 
 __all__ = [
     "BaseAgent",
     "CriticAgent",
     "RefinerAgent", 
     "EvaluatorAgent",
+    "AgentPool",
+    "agent_pool",
+    "structured_output_stats",
 ] 
\ No newline at end of file
@@ -1,32 +1,104 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Type
+import asyncio
+import json
 import autogen
+from pydantic import BaseModel
 from ...core.agent_config import get_agent_config
+from ...core.config import settings
+from ...core.prompt_templates import prompt_templates
+from ..llm_client import async_llm_client, prefix_cache_stats, usage_from_response
+from .schemas import json_instructions, parse_structured, render_text, response_format
+
+# Engines that can execute an agent turn
+AGENT_ENGINES = ("direct", "autogen")
+
+# Ways of asking for agent output: free text scraped with regexes, or JSON
+# validated against the agent's output schema
+AGENT_OUTPUT_MODES = ("text", "json")
+
+# Structured responses per agent type that validated, and that fell back to
+# the text extractors
+_structured_output_counts: Dict[str, Dict[str, int]] = {}
+
+def structured_output_stats() -> Dict[str, Any]:
+    """Get structured output and fallback counts per agent type."""
+    stats = {}
+    for agent_type, counts in _structured_output_counts.items():
+        total = counts["structured"] + counts["fallback"]
+        stats[agent_type] = {
+            **counts,
+            "fallback_rate": counts["fallback"] / total if total else 0.0,
+        }
+    return stats
+
+class UsageRecordingClient:
+    """
+    Forwards to an AutoGen client and keeps the token usage of each completion.
+    
+    AutoGen does not hand completions back to the caller of initiate_chat, so
+    the agent wraps its client for the call to see them.
+    """
+    
+    def __init__(self, client: autogen.OpenAIWrapper):
+        """
+        Initialize the wrapper.
+        
+        Args:
+            client: The AutoGen client that makes the calls
+        """
+        self._client = client
+        self.usages: List[Optional[Dict[str, Any]]] = []
+    
+    def create(self, **params: Any) -> Any:
+        """Create a completion and record its usage."""
+        response = self._client.create(**params)
+        self.usages.append(usage_from_response(response))
+        return response
+    
+    def __getattr__(self, name: str) -> Any:
+        """Forward everything else to the wrapped client."""
+        return getattr(self._client, name)
 
 class BaseAgent:
     """Base class for all agents in the multi-agent system."""
     
-    def __init__(self, agent_type: str, role: str):
+    # Schema of the agent's JSON output; agents without one always use text
+    output_schema: Optional[Type[BaseModel]] = None
+    
+    def __init__(self, agent_type: str, role: str, engine: Optional[str] = None):
         """
         Initialize the base agent.
         
         Args:
             agent_type: Type of agent (critic, refiner, evaluator)
             role: The role context (webdev, syseng, analyst, designer)
+            engine: Execution engine, "direct" or "autogen" (defaults to settings.AGENT_ENGINE)
         """
         self.agent_type = agent_type
         self.role = role
         self.config = get_agent_config(agent_type, role)
+        self.engine = engine or settings.AGENT_ENGINE
+        self.output_mode = settings.AGENT_OUTPUT_MODE
+        
+        if self.engine not in AGENT_ENGINES:
+            raise ValueError(f"Unknown agent engine: {self.engine}")
+        if self.output_mode not in AGENT_OUTPUT_MODES:
+            raise ValueError(f"Unknown agent output mode: {self.output_mode}")
         
+        # The direct engine talks to the pooled async client and needs no AutoGen agents
+        if self.engine == "autogen":
+            self._init_autogen_agents()
+    
+    def _init_autogen_agents(self):
+        """Create the AutoGen assistant and user proxy used by the autogen engine."""
         # Initialize the AutoGen agent
         self.agent = autogen.AssistantAgent(
             name=self.config["name"],
             system_message=self.config["system_message"],
-            llm_config={
-                "config_list": self.config["config_list"],
-                "temperature": self.config.get("temperature", 0.7),
-                "seed": self.config.get("seed", 42),
-            },
+            llm_config=self._autogen_llm_config(self.config.get("temperature", 0.7)),
         )
+        # Clients for per-call temperatures and JSON modes, built on first use
+        self._autogen_clients: Dict[Tuple[float, Optional[str]], autogen.OpenAIWrapper] = {}
         
         # Initialize the user proxy for agent interactions
         self.user_proxy = autogen.UserProxyAgent(
@@ -36,13 +108,70 @@ class BaseAgent:
             code_execution_config={"work_dir": "coding", "use_docker": False},
         )
     
-    async def process(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _autogen_llm_config(
+        self,
+        temperature: float,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Get the AutoGen llm_config for a sampling temperature and provider JSON mode."""
+        llm_config = {
+            "config_list": self.config["config_list"],
+            "temperature": temperature,
+            "seed": self.config.get("seed", 42),
+        }
+        if response_format is not None:
+            llm_config["response_format"] = response_format
+            # AutoGen's response cache can only key pydantic response formats,
+            # not a plain JSON mode dict, so these calls skip it
+            llm_config["cache_seed"] = None
+        return llm_config
+    
+    def _autogen_client(
+        self,
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> autogen.OpenAIWrapper:
+        """
+        Get an AutoGen client for a sampling temperature and provider JSON mode.
+        
+        AutoGen fixes both when the assistant's client is built and lets its
+        config list override anything passed per call, so other settings need
+        their own client.
+        
+        Args:
+            temperature: Sampling temperature (defaults to the assistant's)
+            response_format: Provider JSON mode request, if any
+        
+        Returns:
+            The assistant's own client for its configured settings, otherwise
+            a cached client for these settings
+        """
+        if temperature is None:
+            temperature = self.agent.llm_config.get("temperature")
+        if temperature == self.agent.llm_config.get("temperature") and response_format is None:
+            return self.agent.client
+        key = (temperature, json.dumps(response_format, sort_keys=True) if response_format is not None else None)
+        client = self._autogen_clients.get(key)
+        if client is None:
+            client = self._autogen_clients[key] = autogen.OpenAIWrapper(
+                **self._autogen_llm_config(temperature, response_format)
+            )
+        return client
+    
+    async def process(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        temperature: Optional[float] = None,
+    ) -> Dict[str, Any]:
         """
         Process the prompt and return the agent's response.
         
         Args:
             prompt: The prompt to process
             context: Additional context for the agent
+            temperature: Sampling temperature for this call (defaults to the
+                agent's configured temperature)
             
         Returns:
             A dictionary with the agent's response
@@ -51,34 +180,17 @@ class BaseAgent:
             # Prepare the message with context
             message = self._prepare_message(prompt, context)
             
-            # Start a conversation
-            self.user_proxy.initiate_chat(
-                self.agent,
-                message=message,
-            )
-            
-            # Get the last message from the conversation
-            last_message = self.user_proxy.last_message()
+            structured = self.output_mode == "json" and self.output_schema is not None
+            if structured:
+                message += "\n\n" + json_instructions(self.output_schema)
             
-            # Handle different response formats
-            if last_message is None:
-                raise Exception(f"No response received from {self.agent_type} agent")
-            
-            # Extract content from AutoGen response
-            if isinstance(last_message, dict):
-                # Handle AutoGen's dictionary response format
-                content = last_message.get('content', '')
-                if not content and 'message' in last_message:
-                    content = last_message['message']
-            else:
-                # Handle string or other response types
-                content = str(last_message)
+            content = await self._complete(message, temperature, self._response_format() if structured else None)
             
             if not content:
                 raise Exception(f"Empty response from {self.agent_type} agent")
             
             # Process and structure the response
-            response = self._process_response(content)
+            response = self._parse_structured_response(content) if structured else self._process_response(content)
             
             return {
                 "success": True,
@@ -104,6 +216,160 @@ class BaseAgent:
                 },
             }
     
+    def _response_format(self) -> Optional[Dict[str, Any]]:
+        """Get the provider JSON mode request for the output schema (None if disabled)."""
+        if settings.AGENT_JSON_RESPONSE_FORMAT == "json_schema":
+            return response_format(self.output_schema)
+        if settings.AGENT_JSON_RESPONSE_FORMAT == "json_object":
+            return {"type": "json_object"}
+        return None
+    
+    def _parse_structured_response(self, response: str) -> Dict[str, Any]:
+        """
+        Validate a JSON response, falling back to the text extractors.
+        
+        Args:
+            response: The raw response from the agent
+        
+        Returns:
+            A structured response in the shape _process_response produces
+        """
+        counts = _structured_output_counts.setdefault(self.agent_type, {"structured": 0, "fallback": 0})
+        try:
+            output = parse_structured(self.output_schema, response)
+        except ValueError as e:
+            counts["fallback"] += 1
+            print(f"Invalid structured {self.agent_type} response, using text extraction: {str(e)[:200]}")
+            return self._process_response(response)
+        counts["structured"] += 1
+        return self._from_structured(output)
+    
+    def _from_structured(self, output: BaseModel) -> Dict[str, Any]:
+        """
+        Convert validated JSON output into the _process_response shape.
+        
+        Agents override this to map their schema's fields directly; by default
+        the output is rendered as labelled text and parsed by _process_response,
+        so every agent with an output_schema works in JSON mode.
+        
+        Args:
+            output: The validated output_schema instance
+        
+        Returns:
+            A structured response with content, confidence, suggestions and analysis
+        """
+        return self._process_response(render_text(output))
+    
+    async def _complete(
+        self,
+        message: str,
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Run one agent turn on the configured engine."""
+        if self.engine == "direct":
+            return await self._complete_direct(message, temperature, response_format)
+        return await self._complete_autogen(message, temperature, response_format)
+    
+    async def _complete_direct(
+        self,
+        message: str,
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Run the agent turn as a single async chat completion.
+        
+        Args:
+            message: The prepared user message
+            temperature: Sampling temperature (defaults to the agent's configured temperature)
+            response_format: Provider JSON mode request, if any
+        
+        Returns:
+            The agent's reply
+        """
+        llm_config = self.config["config_list"][0]
+        # Read the template per call so reloaded prompts reach pooled agents
+        template = prompt_templates.get(self.agent_type, self.role)
+        if temperature is None:
+            temperature = template.temperature if template.temperature is not None else 0.7
+        extra = {"response_format": response_format} if response_format is not None else {}
+        result = await async_llm_client.agenerate_completion(
+            messages=[
+                {"role": "system", "content": template.system_message},
+                {"role": "user", "content": message},
+            ],
+            model=llm_config.get("model"),
+            temperature=temperature,
+            **extra,
+        )
+        
+        if not result.get("success"):
+            raise Exception(result.get("error", f"No response received from {self.agent_type} agent"))
+        
+        prefix_cache_stats.record(self.role, result.get("metadata", {}).get("usage"))
+        
+        return result.get("content", "")
+    
+    async def _complete_autogen(
+        self,
+        message: str,
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Run the agent turn as an AutoGen conversation.
+        
+        Args:
+            message: The prepared user message
+            temperature: Sampling temperature (defaults to the agent's configured temperature)
+            response_format: Provider JSON mode request, if any
+        
+        Returns:
+            The agent's reply
+        """
+        # Read the template per call so reloaded prompts reach pooled agents
+        template = prompt_templates.get(self.agent_type, self.role)
+        self.agent.update_system_message(template.system_message)
+        if temperature is None and template.temperature is not None:
+            temperature = template.temperature
+        
+        # A checked-out agent serves one call at a time, so swapping its client
+        # for the call's settings cannot leak into another request
+        client = self.agent.client
+        recorder = UsageRecordingClient(self._autogen_client(temperature, response_format))
+        self.agent.client = recorder
+        try:
+            # initiate_chat blocks, so keep it off the event loop
+            await asyncio.to_thread(
+                self.user_proxy.initiate_chat,
+                self.agent,
+                message=message,
+            )
+        finally:
+            self.agent.client = client
+            for usage in recorder.usages:
+                prefix_cache_stats.record(self.role, usage)
+        
+        # Get the last message from the conversation
+        last_message = self.user_proxy.last_message()
+        
+        # Handle different response formats
+        if last_message is None:
+            raise Exception(f"No response received from {self.agent_type} agent")
+        
+        # Extract content from AutoGen response
+        if isinstance(last_message, dict):
+            # Handle AutoGen's dictionary response format
+            content = last_message.get('content', '')
+            if not content and 'message' in last_message:
+                content = last_message['message']
+        else:
+            # Handle string or other response types
+            content = str(last_message)
+        
+        return content
+    
     def _prepare_message(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
         Prepare the message for the agent with context.
@@ -141,9 +407,13 @@ class BaseAgent:
             "suggestions": [],
         }
     
-    def terminate(self):
-        """Clean up any resources."""
+    def reset(self):
+        """Clear conversation state so the agent can be reused for another request."""
         if hasattr(self, 'agent'):
             self.agent.reset()
         if hasattr(self, 'user_proxy'):
-            self.user_proxy.reset() 
\ No newline at end of file
+            self.user_proxy.reset() 
+    
+    def terminate(self):
+        """Clean up any resources."""
+        self.reset()
\ No newline at end of file
@@ -1,6 +1,7 @@
-from typing import Dict, Any, List
-import re
+from typing import Dict, Any, Optional
 from .base import BaseAgent
+from .parsing import ParsedResponse
+from .schemas import CriticOutput
 
 class CriticAgent(BaseAgent):
     """
@@ -8,14 +9,17 @@ class CriticAgent(BaseAgent):
     This agent evaluates the initial prompt and provides feedback for improvements.
     """
     
-    def __init__(self, role: str):
+    output_schema = CriticOutput
+    
+    def __init__(self, role: str, engine: Optional[str] = None):
         """
         Initialize the Critic agent.
         
         Args:
             role: The role context (webdev, syseng, analyst, designer)
+            engine: Execution engine, "direct" or "autogen" (defaults to settings.AGENT_ENGINE)
         """
-        super().__init__("critic", role)
+        super().__init__("critic", role, engine)
     
     def _process_response(self, response: str) -> Dict[str, Any]:
         """
@@ -28,23 +32,19 @@ class CriticAgent(BaseAgent):
             A structured response with issues, analysis, and confidence
         """
         try:
-            # Extract issues and recommendations
-            issues = self._extract_issues(response)
-            
-            # Extract confidence level (default to 0.7 if not found)
-            confidence = self._extract_confidence(response)
+            parsed = ParsedResponse(response)
             
             # Create the structured response
             return {
                 "content": response,
-                "confidence": confidence,
-                "issues": issues,
+                "confidence": parsed.confidence(0.7),
+                "issues": parsed.issues,
                 "analysis": {
-                    "issue_count": len(issues),
-                    "primary_concerns": self._extract_primary_concerns(response),
-                    "technical_accuracy": self._extract_rating(response, "technical accuracy"),
-                    "clarity": self._extract_rating(response, "clarity"),
-                    "completeness": self._extract_rating(response, "completeness"),
+                    "issue_count": len(parsed.issues),
+                    "primary_concerns": parsed.primary_concerns,
+                    "technical_accuracy": parsed.rating("technical accuracy"),
+                    "clarity": parsed.rating("clarity"),
+                    "completeness": parsed.rating("completeness"),
                 }
             }
         except Exception as e:
@@ -57,110 +57,20 @@ class CriticAgent(BaseAgent):
                 "analysis": {},
             }
     
-    def _extract_issues(self, text: str) -> List[str]:
-        """Extract a list of issues from the response text."""
-        issues = []
-        
-        # Look for numbered lists, bullet points, or "Issues:" sections
-        patterns = [
-            r"(?:^|\n)\s*\d+\.\s*(.+?)(?=\n\s*\d+\.|\n\s*\n|$)",  # Numbered list
-            r"(?:^|\n)\s*[-*•]\s*(.+?)(?=\n\s*[-*•]|\n\s*\n|$)",  # Bullet points
-            r"(?:^|\n)Issues:\s*\n\s*(.+?)(?=\n\s*\n|$)",         # Issues section
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.MULTILINE)
-            if matches:
-                issues.extend([match.strip() for match in matches if match.strip()])
-        
-        # If no structured issues found, extract sentences that mention issues/problems
-        if not issues:
-            issue_sentences = re.findall(r"(?:^|\n)([^.\n]+(?:issue|problem|lacks|missing|unclear)[^.\n]+\.)", text)
-            issues.extend([sentence.strip() for sentence in issue_sentences if sentence.strip()])
-        
-        return issues
-    
-    def _extract_confidence(self, text: str) -> float:
-        """Extract the confidence level from the response text."""
-        # Look for explicit confidence indicators
-        confidence_match = re.search(r"[Cc]onfidence:?\s*(\d+(?:\.\d+)?)", text)
-        if confidence_match:
-            try:
-                return float(confidence_match.group(1))
-            except ValueError:
-                pass
-        
-        # Look for qualitative indicators
-        if re.search(r"(?:high confidence|very confident|certain)", text, re.IGNORECASE):
-            return 0.9
-        elif re.search(r"(?:moderate confidence|somewhat confident)", text, re.IGNORECASE):
-            return 0.7
-        elif re.search(r"(?:low confidence|not confident|uncertain)", text, re.IGNORECASE):
-            return 0.5
-            
-        # Default confidence
-        return 0.7
-    
-    def _extract_primary_concerns(self, text: str) -> List[str]:
-        """Extract the primary concerns from the response text."""
-        # Look for explicit primary concerns
-        primary_concerns_section = re.search(r"(?:^|\n)(?:Primary|Main|Key) [Cc]oncerns?:?\s*\n(.+?)(?=\n\s*\n|$)", text, re.DOTALL)
-        if primary_concerns_section:
-            concerns_text = primary_concerns_section.group(1).strip()
-            # Extract individual concerns
-            concerns = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", concerns_text, re.MULTILINE)
-            if concerns:
-                return [concern.strip() for concern in concerns if concern.strip()]
-        
-        # Fallback: use the first 1-2 issues as primary concerns
-        issues = self._extract_issues(text)
-        return issues[:min(2, len(issues))]
-    
-    def _extract_rating(self, text: str, aspect: str) -> float:
-        """Extract a numeric rating for a specific aspect."""
-        # Look for ratings in the format "Aspect: X/Y" or "Aspect: X out of Y"
-        rating_match = re.search(
-            rf"{aspect}:?\s*(\d+(?:\.\d+)?)\s*(?:\/|out of)\s*(\d+(?:\.\d+)?)",
-            text,
-            re.IGNORECASE
-        )
-        
-        if rating_match:
-            try:
-                numerator = float(rating_match.group(1))
-                denominator = float(rating_match.group(2))
-                if denominator > 0:
-                    return numerator / denominator
-            except (ValueError, ZeroDivisionError):
-                pass
-        
-        # Look for percentage ratings
-        percentage_match = re.search(
-            rf"{aspect}:?\s*(\d+(?:\.\d+)?)\s*%",
-            text,
-            re.IGNORECASE
-        )
-        
-        if percentage_match:
-            try:
-                return float(percentage_match.group(1)) / 100.0
-            except ValueError:
-                pass
-        
-        # Default ratings based on positive/negative language for this aspect
-        text_lower = text.lower()
-        aspect_lower = aspect.lower()
-        
-        if re.search(rf"{aspect_lower}.*(?:excellent|great|very good|strong)", text_lower):
-            return 0.9
-        elif re.search(rf"{aspect_lower}.*(?:good|solid)", text_lower):
-            return 0.8
-        elif re.search(rf"{aspect_lower}.*(?:adequate|acceptable|fair)", text_lower):
-            return 0.6
-        elif re.search(rf"{aspect_lower}.*(?:poor|weak|inadequate|low)", text_lower):
-            return 0.4
-        elif re.search(rf"{aspect_lower}.*(?:very poor|very weak|terrible)", text_lower):
-            return 0.2
-        
-        # Default to a neutral rating
-        return 0.5 
\ No newline at end of file
+    def _from_structured(self, output: CriticOutput) -> Dict[str, Any]:
+        """Convert validated JSON output into the _process_response shape."""
+        feedback = output.feedback
+        if output.issues:
+            feedback += "\n\nIssues:\n" + "\n".join(f"- {issue}" for issue in output.issues)
+        return {
+            "content": feedback,
+            "confidence": output.confidence,
+            "issues": output.issues,
+            "analysis": {
+                "issue_count": len(output.issues),
+                "primary_concerns": output.primary_concerns or output.issues[:2],
+                "technical_accuracy": output.technical_accuracy,
+                "clarity": output.clarity,
+                "completeness": output.completeness,
+            }
+        }
\ No newline at end of file
@@ -1,6 +1,7 @@
 from typing import Dict, Any, List, Optional
-import re
 from .base import BaseAgent
+from .parsing import ParsedResponse, split_candidates
+from .schemas import EvaluatorOutput
 
 class EvaluatorAgent(BaseAgent):
     """
@@ -8,14 +9,17 @@ class EvaluatorAgent(BaseAgent):
     This agent verifies the quality of the refined prompt and provides a final assessment.
     """
     
-    def __init__(self, role: str):
+    output_schema = EvaluatorOutput
+    
+    def __init__(self, role: str, engine: Optional[str] = None):
         """
         Initialize the Evaluator agent.
         
         Args:
             role: The role context (webdev, syseng, analyst, designer)
+            engine: Execution engine, "direct" or "autogen" (defaults to settings.AGENT_ENGINE)
         """
-        super().__init__("evaluator", role)
+        super().__init__("evaluator", role, engine)
     
     async def process(
         self, 
@@ -80,7 +84,86 @@ class EvaluatorAgent(BaseAgent):
             "1. Overall assessment\n"
             "2. Strengths of the refined prompt\n"
             "3. Any remaining weaknesses or suggestions\n"
-            "4. Quality score (0-1) for the refined prompt"
+            "4. A final line \"Quality score: <number from 0 to 1>\" for the refined prompt"
+        )
+        
+        return message
+    
+    async def evaluate_candidates(
+        self,
+        candidates: List[str],
+        context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Score several refined prompts in one call and pick the best.
+        
+        Args:
+            candidates: The refined prompts to compare
+            context: Additional context including original prompt and critic feedback
+        
+        Returns:
+            The evaluation of the winning candidate; metadata.analysis holds
+            candidate_scores and selected_index
+        """
+        try:
+            content = await self._complete(self._prepare_batch_message(candidates, context or {}))
+            if not content:
+                raise Exception("Empty response from evaluator agent")
+            
+            sections = split_candidates(content, len(candidates))
+            # A candidate the evaluator skipped cannot win
+            scores = [
+                ParsedResponse(section).quality_score if section else 0.0
+                for section in sections
+            ]
+            selected = max(range(len(candidates)), key=lambda i: scores[i])
+            evaluation = self._process_response(sections[selected] or content)
+            evaluation["analysis"]["candidate_scores"] = scores
+            evaluation["analysis"]["selected_index"] = selected
+            
+            return {
+                "success": True,
+                "message": str(evaluation.get("content", "")),
+                "metadata": {
+                    "confidence": scores[selected],
+                    "suggestions": list(evaluation.get("suggestions", [])),
+                    "role": self.role,
+                    "agent_type": self.agent_type,
+                    "analysis": evaluation["analysis"],
+                },
+            }
+        except Exception as e:
+            print(f"Error in evaluator agent batch: {str(e)}")
+            return {
+                "success": False,
+                "error": f"evaluator agent error: {str(e)}",
+                "metadata": {
+                    "role": self.role,
+                    "agent_type": self.agent_type,
+                },
+            }
+    
+    def _prepare_batch_message(self, candidates: List[str], context: Dict[str, Any]) -> str:
+        """Prepare one message asking for a score per candidate."""
+        message = (
+            f"You need to compare {len(candidates)} candidate refinements of the same prompt.\n\n"
+            f"Original prompt: \"{context.get('original_prompt', 'Not provided')}\"\n\n"
+        )
+        
+        if "critic_feedback" in context:
+            message += f"Critic's feedback:\n{context['critic_feedback']}\n\n"
+        
+        for number, candidate in enumerate(candidates, 1):
+            message += f"Candidate {number}: \"{candidate}\"\n\n"
+        
+        message += (
+            "Evaluate each candidate separately against the critic's concerns, technical\n"
+            "accuracy, clarity and fit for the role. For every candidate write a section\n"
+            "starting with \"Candidate <number>\" that contains:\n"
+            "1. Overall assessment\n"
+            "2. Strengths\n"
+            "3. Weaknesses\n"
+            "4. A final line \"Quality score: <number from 0 to 1>\", e.g. \"Quality score: 0.85\""
         )
         
         return message
@@ -96,26 +179,18 @@ class EvaluatorAgent(BaseAgent):
             A structured response with the evaluation results
         """
         try:
-            # Extract quality score
-            quality_score = self._extract_quality_score(response)
-            
-            # Extract strengths and weaknesses
-            strengths = self._extract_strengths(response)
-            weaknesses = self._extract_weaknesses(response)
-            
-            # Extract the overall assessment
-            assessment = self._extract_assessment(response)
+            parsed = ParsedResponse(response)
             
             # Create the structured response
             return {
-                "content": assessment or response,
-                "confidence": quality_score,
-                "suggestions": weaknesses,
+                "content": parsed.assessment or response,
+                "confidence": parsed.quality_score,
+                "suggestions": parsed.weaknesses,
                 "analysis": {
-                    "quality_score": quality_score,
-                    "strengths": strengths,
-                    "weaknesses": weaknesses,
-                    "assessment": assessment,
+                    "quality_score": parsed.quality_score,
+                    "strengths": parsed.strengths,
+                    "weaknesses": parsed.weaknesses,
+                    "assessment": parsed.assessment,
                 }
             }
         except Exception as e:
@@ -128,117 +203,16 @@ class EvaluatorAgent(BaseAgent):
                 "analysis": {},
             }
     
-    def _extract_quality_score(self, text: str) -> float:
-        """Extract the quality score from the response text."""
-        # Look for explicit quality score indicators
-        score_patterns = [
-            r"[Qq]uality [Ss]core:?\s*(\d+(?:\.\d+)?)",
-            r"[Ss]core:?\s*(\d+(?:\.\d+)?)",
-            r"[Rr]ating:?\s*(\d+(?:\.\d+)?)\s*\/\s*1",
-        ]
-        
-        for pattern in score_patterns:
-            score_match = re.search(pattern, text)
-            if score_match:
-                try:
-                    return float(score_match.group(1))
-                except ValueError:
-                    pass
-        
-        # Look for percentage scores
-        percentage_match = re.search(r"(\d+(?:\.\d+)?)\s*%", text)
-        if percentage_match:
-            try:
-                return float(percentage_match.group(1)) / 100.0
-            except ValueError:
-                pass
-        
-        # Analyze qualitative assessment
-        if re.search(r"(?:excellent|outstanding|exceptional)", text, re.IGNORECASE):
-            return 0.9
-        elif re.search(r"(?:good|strong|solid)", text, re.IGNORECASE):
-            return 0.8
-        elif re.search(r"(?:adequate|satisfactory|acceptable)", text, re.IGNORECASE):
-            return 0.7
-        elif re.search(r"(?:moderate|fair|average)", text, re.IGNORECASE):
-            return 0.6
-        elif re.search(r"(?:weak|poor|inadequate)", text, re.IGNORECASE):
-            return 0.4
-        
-        # Default quality score
-        return 0.7
-    
-    def _extract_strengths(self, text: str) -> List[str]:
-        """Extract a list of strengths from the response text."""
-        strengths = []
-        
-        # Look for strengths section
-        strengths_section = re.search(
-            r"(?:^|\n)(?:Strengths|Positive aspects|Pros|What works well):?\s*\n((?:.+\n)+)",
-            text,
-            re.IGNORECASE | re.MULTILINE
-        )
-        
-        if strengths_section:
-            section_text = strengths_section.group(1)
-            # Extract individual strengths
-            items = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", section_text, re.MULTILINE)
-            if items:
-                strengths.extend([item.strip() for item in items if item.strip()])
-        
-        # If no structured strengths found, look for sentences about strengths
-        if not strengths:
-            strength_sentences = re.findall(
-                r"(?:^|\n)([^.\n]+(?:strength|positive|good|excellent|well done)[^.\n]+\.)",
-                text
-            )
-            strengths.extend([sentence.strip() for sentence in strength_sentences if sentence.strip()])
-        
-        return strengths
-    
-    def _extract_weaknesses(self, text: str) -> List[str]:
-        """Extract a list of weaknesses from the response text."""
-        weaknesses = []
-        
-        # Look for weaknesses section
-        weaknesses_section = re.search(
-            r"(?:^|\n)(?:Weaknesses|Negative aspects|Cons|Areas for improvement|Suggestions):?\s*\n((?:.+\n)+)",
-            text,
-            re.IGNORECASE | re.MULTILINE
-        )
-        
-        if weaknesses_section:
-            section_text = weaknesses_section.group(1)
-            # Extract individual weaknesses
-            items = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", section_text, re.MULTILINE)
-            if items:
-                weaknesses.extend([item.strip() for item in items if item.strip()])
-        
-        # If no structured weaknesses found, look for sentences about weaknesses
-        if not weaknesses:
-            weakness_sentences = re.findall(
-                r"(?:^|\n)([^.\n]+(?:weakness|negative|issue|problem|improve|suggest)[^.\n]+\.)",
-                text
-            )
-            weaknesses.extend([sentence.strip() for sentence in weakness_sentences if sentence.strip()])
-        
-        return weaknesses
-    
-    def _extract_assessment(self, text: str) -> Optional[str]:
-        """Extract the overall assessment from the response text."""
-        # Look for assessment section
-        assessment_section = re.search(
-            r"(?:^|\n)(?:Overall [Aa]ssessment|[Aa]ssessment|[Ee]valuation|[Ss]ummary):?\s*\n((?:.+\n)+?)(?=\n\s*\n|$)",
-            text,
-            re.IGNORECASE | re.MULTILINE
-        )
-        
-        if assessment_section:
-            return assessment_section.group(1).strip()
-        
-        # If no structured assessment found, use the first paragraph
-        paragraphs = re.split(r"\n\s*\n", text)
-        if paragraphs:
-            return paragraphs[0].strip()
-        
-        return None 
\ No newline at end of file
+    def _from_structured(self, output: EvaluatorOutput) -> Dict[str, Any]:
+        """Convert validated JSON output into the _process_response shape."""
+        return {
+            "content": output.assessment,
+            "confidence": output.quality_score,
+            "suggestions": output.weaknesses,
+            "analysis": {
+                "quality_score": output.quality_score,
+                "strengths": output.strengths,
+                "weaknesses": output.weaknesses,
+                "assessment": output.assessment,
+            }
+        }
\ No newline at end of file
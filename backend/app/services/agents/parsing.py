@@ -0,0 +1,323 @@
+"""
+Single-pass tokenizer and extractors for free-text agent responses.
+"""
+import re
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+# Section headings, lowercased, mapped to the section they start
+SECTION_LABELS: Dict[str, str] = {
+    "issues": "issues",
+    "problems": "issues",
+    "primary concerns": "primary_concerns",
+    "primary concern": "primary_concerns",
+    "main concerns": "primary_concerns",
+    "main concern": "primary_concerns",
+    "key concerns": "primary_concerns",
+    "key concern": "primary_concerns",
+    "strengths": "strengths",
+    "positive aspects": "strengths",
+    "pros": "strengths",
+    "what works well": "strengths",
+    "weaknesses": "weaknesses",
+    "negative aspects": "weaknesses",
+    "cons": "weaknesses",
+    "areas for improvement": "weaknesses",
+    "suggestions": "weaknesses",
+    "changes made": "improvements",
+    "improvements made": "improvements",
+    "enhancements made": "improvements",
+    "overall assessment": "assessment",
+    "assessment": "assessment",
+    "evaluation": "assessment",
+    "summary": "assessment",
+    "ratings": "ratings",
+    "scores": "ratings",
+    "confidence": "confidence",
+    "confidence level": "confidence",
+    "refined prompt": "refined_prompt",
+    "improved prompt": "refined_prompt",
+    "enhanced prompt": "refined_prompt",
+    "final prompt": "refined_prompt",
+}
+
+# A heading line: optional Markdown decoration, a known label, then either a
+# colon with optional inline text or the end of the line. Matching from the
+# newline (the text is searched with one prepended) lets the engine jump
+# between line starts instead of trying the labels at every character, and
+# matching the lowercased text avoids slow case-insensitive matching.
+SECTION_HEADING_PATTERN = (
+    r"\n[ \t]*(?:#{1,6}[ \t]*)?\**[ \t]*("
+    + "|".join(sorted(map(re.escape, SECTION_LABELS), key=len, reverse=True))
+    + r")[ \t]*\**(?::\**[ \t]*(.*?)|)[ \t]*$"
+)
+SECTION_HEADING = re.compile(SECTION_HEADING_PATTERN, re.MULTILINE)
+# For the rare text whose lowercase form has a different length
+SECTION_HEADING_ANY_CASE = re.compile(SECTION_HEADING_PATTERN, re.IGNORECASE | re.MULTILINE)
+LIST_ITEM = re.compile(r"^[ \t]*(?:[-*•]|\d+[.)])[ \t]+(.+?)[ \t]*$", re.MULTILINE)
+BLANK_LINE = re.compile(r"\n[ \t]*\n")
+CANDIDATE_HEADING = re.compile(r"^[#*\s]*Candidate\s+(\d+)\b[^\n]*\n?", re.IGNORECASE | re.MULTILINE)
+
+# Value and word patterns below are lowercase and run on the lowercased
+# response, which is much faster than case-insensitive matching
+CONFIDENCE_VALUE = re.compile(r"confidence(?: level)?\**:?\**\s*(\d+(?:\.\d+)?)")
+CONFIDENCE_WORDS: Tuple[Tuple[re.Pattern, float], ...] = (
+    (re.compile(r"\b(?:high confidence|very confident|certain)\b"), 0.9),
+    (re.compile(r"\b(?:moderate confidence|somewhat confident)\b"), 0.7),
+    (re.compile(r"\b(?:low confidence|not confident|uncertain)\b"), 0.5),
+)
+
+# Critic ratings written as "Aspect: X/Y", "Aspect: X out of Y" or "Aspect: X%"
+RATED_ASPECTS = ("technical accuracy", "clarity", "completeness")
+RATING = re.compile(
+    r"(technical accuracy|clarity|completeness)\**:?\**\s*(\d+(?:\.\d+)?)\s*"
+    r"(?:(?:/|out of)\s*(\d+(?:\.\d+)?)|(%))"
+)
+# Words describing an aspect, checked in order on the rest of each line naming it
+RATING_WORDS: Tuple[Tuple[re.Pattern, float], ...] = (
+    (re.compile(r"excellent|great|very good|strong"), 0.9),
+    (re.compile(r"good|solid"), 0.8),
+    (re.compile(r"adequate|acceptable|fair"), 0.6),
+    (re.compile(r"very poor|very weak|terrible|poor|weak|inadequate|low"), 0.4),
+)
+
+# Quality scores written as "Quality score: 0.9", "Quality score (0-1): 0.9",
+# "Score: 8/10", "Score: 85%" or "Rating: 4 out of 5"; groups are the value,
+# the scale and a percent sign
+SCORE_SCALE = r"(?:\s*(?:/|out of)\s*(\d+(?:\.\d+)?)|\s*(%))"
+QUALITY_SCORE_VALUES = (
+    re.compile(r"quality score\**(?:[ \t]*\([^)\n]*\))?\**:?\**\s*(\d+(?:\.\d+)?)" + SCORE_SCALE + "?"),
+    re.compile(r"\bscore\**(?:[ \t]*\([^)\n]*\))?\**:?\**\s*(\d+(?:\.\d+)?)" + SCORE_SCALE + "?"),
+    re.compile(r"\brating\**:?\**\s*(\d+(?:\.\d+)?)" + SCORE_SCALE),
+)
+PERCENTAGE = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+# Whole words only, so headings like "Weaknesses" do not read as a verdict
+QUALITY_WORDS: Tuple[Tuple[re.Pattern, float], ...] = (
+    (re.compile(r"\b(?:excellent|outstanding|exceptional)\b"), 0.9),
+    (re.compile(r"\b(?:good|strong|solid)\b"), 0.8),
+    (re.compile(r"\b(?:adequate|satisfactory|acceptable)\b"), 0.7),
+    (re.compile(r"\b(?:moderate|fair|average)\b"), 0.6),
+    (re.compile(r"\b(?:weak|poor|inadequate)\b"), 0.4),
+)
+
+# Sentences used when a response has no labeled section for a list
+ISSUE_SENTENCE = re.compile(r"^([^.\n]+(?:issue|problem|lacks|missing|unclear)[^.\n]+\.)", re.MULTILINE)
+STRENGTH_SENTENCE = re.compile(r"^([^.\n]+(?:strength|positive|good|excellent|well done)[^.\n]+\.)", re.MULTILINE)
+WEAKNESS_SENTENCE = re.compile(r"^([^.\n]+(?:weakness|negative|issue|problem|improve|suggest)[^.\n]+\.)", re.MULTILINE)
+IMPROVEMENT_SENTENCE = re.compile(r"^([^.\n]+(?:improve|enhance|add|change|clarify|specify)[^.\n]+\.)", re.MULTILINE)
+
+QUOTED_LINE = re.compile(r"^\"([^\"\n]+)\"[ \t]*$", re.MULTILINE)
+ANALYSIS_PARAGRAPH = re.compile(r"confidence|analysis|suggest|improv")
+
+def normalize_score(value: float, scale: Optional[float] = None, percent: bool = False) -> float:
+    """
+    Bring a stated score into [0, 1].
+    
+    Args:
+        value: The stated number
+        scale: The stated maximum (e.g. 10 for "8/10"), if any
+        percent: Whether the number was a percentage
+    
+    Returns:
+        The score, reading bare numbers above 1 as out of 10 or 100, clamped to [0, 1]
+    """
+    if percent:
+        value /= 100.0
+    elif scale is not None:
+        value = value / scale if scale > 0 else 0.0
+    elif value > 1:
+        value /= 10.0 if value <= 10 else 100.0
+    return min(1.0, max(0.0, value))
+
+class ParsedResponse:
+    """
+    An agent response split once into labeled sections.
+    
+    The constructor makes one pass over the text to find section headings;
+    every extractor then reads its section (or falls back to the whole text)
+    and caches the result, so no extractor rescans the response twice.
+    """
+    
+    def __init__(self, text: str):
+        """
+        Tokenize a response.
+        
+        Args:
+            text: The raw response
+        """
+        self.text = text
+        # label -> (inline text after the colon, body up to the next heading)
+        self.sections: Dict[str, Tuple[str, str]] = {}
+        padded = "\n" + text
+        lowered = padded.lower()
+        self.lower = lowered[1:]
+        # Offsets into the lowercased text are valid in the original when the lengths agree
+        if len(lowered) == len(padded):
+            headings = list(SECTION_HEADING.finditer(lowered))
+        else:
+            headings = list(SECTION_HEADING_ANY_CASE.finditer(padded))
+        for i, heading in enumerate(headings):
+            label = SECTION_LABELS[heading.group(1).lower()]
+            if label in self.sections:
+                continue
+            inline = padded[heading.start(2):heading.end(2)] if heading.group(2) is not None else ""
+            end = headings[i + 1].start() if i + 1 < len(headings) else len(padded)
+            self.sections[label] = (inline.strip(), padded[heading.end():end])
+    
+    def block(self, label: str) -> Optional[str]:
+        """Get a section's inline text and lines up to its first blank line."""
+        section = self.sections.get(label)
+        if section is None:
+            return None
+        inline, body = section
+        # Inline text continues onto the next lines; a bare heading's block
+        # starts at its first non-blank line
+        rest = (body[1:] if body.startswith("\n") else body) if inline else body.lstrip(" \t\n")
+        first = BLANK_LINE.split("\n" + rest, 1)[0].strip()
+        return "\n".join(part for part in (inline, first) if part) or None
+    
+    def items(self, label: str) -> List[str]:
+        """Get the list items of a section."""
+        block = self.block(label)
+        return LIST_ITEM.findall(block) if block else []
+    
+    @cached_property
+    def paragraphs(self) -> List[str]:
+        """Blank-line separated paragraphs of the response."""
+        return BLANK_LINE.split(self.text)
+    
+    @cached_property
+    def issues(self) -> List[str]:
+        """Issues from an Issues section, any list, or sentences naming problems."""
+        issues = self.items("issues") or LIST_ITEM.findall(self.text)
+        if not issues:
+            issues = ISSUE_SENTENCE.findall(self.text)
+        return [issue.strip() for issue in issues if issue.strip()]
+    
+    @cached_property
+    def primary_concerns(self) -> List[str]:
+        """Listed primary concerns, or the first two issues."""
+        return self.items("primary_concerns") or self.issues[:2]
+    
+    def confidence(self, default: float) -> float:
+        """Stated confidence, else a qualitative one, else the default."""
+        match = CONFIDENCE_VALUE.search(self.lower)
+        if match:
+            return float(match.group(1))
+        for pattern, value in CONFIDENCE_WORDS:
+            if pattern.search(self.lower):
+                return value
+        return default
+    
+    @cached_property
+    def ratings(self) -> Dict[str, float]:
+        """Numeric ratings per aspect, fractions preferred over percentages."""
+        fractions: Dict[str, float] = {}
+        percentages: Dict[str, float] = {}
+        for match in RATING.finditer(self.lower):
+            aspect = match.group(1)
+            if match.group(4):
+                percentages.setdefault(aspect, float(match.group(2)) / 100.0)
+            elif float(match.group(3)) > 0:
+                fractions.setdefault(aspect, float(match.group(2)) / float(match.group(3)))
+        return {**percentages, **fractions}
+    
+    @cached_property
+    def lower_lines(self) -> List[str]:
+        """Lowercased lines of the response."""
+        return self.lower.splitlines()
+    
+    def rating(self, aspect: str) -> float:
+        """
+        Rating of an aspect in [0, 1].
+        
+        Args:
+            aspect: One of RATED_ASPECTS (other aspects only get word-based ratings)
+        
+        Returns:
+            The numeric rating, a rating inferred from words after the aspect, or 0.5
+        """
+        aspect = aspect.lower()
+        if aspect in self.ratings:
+            return self.ratings[aspect]
+        tails = [line[line.index(aspect) + len(aspect):] for line in self.lower_lines if aspect in line]
+        for pattern, value in RATING_WORDS:
+            if any(pattern.search(tail) for tail in tails):
+                return value
+        return 0.5
+    
+    @cached_property
+    def quality_score(self) -> float:
+        """Stated quality score, a percentage, a qualitative score, or 0.7, in [0, 1]."""
+        for pattern in QUALITY_SCORE_VALUES:
+            match = pattern.search(self.lower)
+            if match:
+                scale = float(match.group(2)) if match.group(2) else None
+                return normalize_score(float(match.group(1)), scale, bool(match.group(3)))
+        match = PERCENTAGE.search(self.lower)
+        if match:
+            return normalize_score(float(match.group(1)), percent=True)
+        for pattern, value in QUALITY_WORDS:
+            if pattern.search(self.lower):
+                return value
+        return 0.7
+    
+    def _listed(self, label: str, sentences: re.Pattern) -> List[str]:
+        """Items of a section, or matching sentences when it has none."""
+        items = self.items(label) or sentences.findall(self.text)
+        return [item.strip() for item in items if item.strip()]
+    
+    @cached_property
+    def strengths(self) -> List[str]:
+        """Listed strengths, or sentences praising the prompt."""
+        return self._listed("strengths", STRENGTH_SENTENCE)
+    
+    @cached_property
+    def weaknesses(self) -> List[str]:
+        """Listed weaknesses, or sentences naming problems."""
+        return self._listed("weaknesses", WEAKNESS_SENTENCE)
+    
+    @cached_property
+    def improvements(self) -> List[str]:
+        """Listed changes, or sentences describing improvements."""
+        return self._listed("improvements", IMPROVEMENT_SENTENCE)
+    
+    @cached_property
+    def assessment(self) -> Optional[str]:
+        """The assessment section, or the first paragraph."""
+        return self.block("assessment") or (self.paragraphs[0].strip() or None)
+    
+    @cached_property
+    def refined_prompt(self) -> Optional[str]:
+        """The labeled refined prompt, a quoted line, or the last prompt-like paragraph."""
+        block = self.block("refined_prompt")
+        if block:
+            if block.startswith('"'):
+                return block[1:].split('"', 1)[0].strip()
+            return block
+        match = QUOTED_LINE.search(self.text)
+        if match:
+            return match.group(1).strip()
+        for paragraph in reversed(self.paragraphs):
+            if len(paragraph) >= 30 and not ANALYSIS_PARAGRAPH.search(paragraph.lower()):
+                return paragraph.strip()
+        return None
+
+def split_candidates(text: str, count: int) -> List[Optional[str]]:
+    """
+    Split a batched evaluation into each candidate's section.
+    
+    Args:
+        text: The raw batched response
+        count: Number of candidates
+    
+    Returns:
+        Each candidate's section, None where it is missing
+    """
+    sections: List[Optional[str]] = [None] * count
+    parts = CANDIDATE_HEADING.split(text)
+    for number, section in zip(parts[1::2], parts[2::2]):
+        index = int(number) - 1
+        if 0 <= index < count and sections[index] is None:
+            sections[index] = section.strip()
+    return sections
\ No newline at end of file
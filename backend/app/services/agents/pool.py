@@ -0,0 +1,159 @@
+"""
+Pool of prebuilt agents shared across requests.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Tuple
+
+from ...core.config import settings
+from ...core.agent_config import get_available_roles
+from .base import BaseAgent
+from .critic import CriticAgent
+from .refiner import RefinerAgent
+from .evaluator import EvaluatorAgent
+
+# Agent classes managed by the pool, keyed by agent type
+AGENT_CLASSES = {
+    "critic": CriticAgent,
+    "refiner": RefinerAgent,
+    "evaluator": EvaluatorAgent,
+}
+
+class AgentPool:
+    """
+    Per-(agent_type, role) pool of reusable agent instances.
+    
+    Agents hold no per-request state once reset, so each request checks one
+    out, runs it, and returns it instead of building a new one.
+    """
+    
+    def __init__(
+        self,
+        size: int = settings.AGENT_POOL_SIZE,
+        max_size: int = settings.AGENT_POOL_MAX_SIZE,
+    ):
+        """
+        Initialize the pool.
+        
+        Args:
+            size: Agents prebuilt per (agent_type, role) by warm()
+            max_size: Maximum agents per (agent_type, role); further checkouts wait
+        """
+        self.size = size
+        self.max_size = max(size, max_size)
+        self._idle: Dict[Tuple[str, str], asyncio.Queue] = {}
+        self._created: Dict[Tuple[str, str], int] = {}
+        self._in_use: Dict[Tuple[str, str], int] = {}
+        self.checkouts = 0
+        self.waits = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+    
+    def _queue(self, key: Tuple[str, str]) -> asyncio.Queue:
+        """Get the idle queue for a key, creating it on first use."""
+        queue = self._idle.get(key)
+        if queue is None:
+            queue = self._idle[key] = asyncio.Queue()
+        return queue
+    
+    def _create(self, agent_type: str, role: str) -> BaseAgent:
+        """Build a new agent and count it against the key's limit."""
+        if agent_type not in AGENT_CLASSES:
+            raise ValueError(f"Unknown agent type: {agent_type}")
+        
+        agent = AGENT_CLASSES[agent_type](role)
+        key = (agent_type, role)
+        self._created[key] = self._created.get(key, 0) + 1
+        return agent
+    
+    async def warm(self, roles: Optional[Iterable[str]] = None) -> int:
+        """
+        Prebuild agents for every agent type and role.
+        
+        Args:
+            roles: Roles to warm (defaults to all configured roles)
+        
+        Returns:
+            The number of agents created
+        """
+        created = 0
+        for role in roles or get_available_roles():
+            for agent_type in AGENT_CLASSES:
+                key = (agent_type, role)
+                queue = self._queue(key)
+                while self._created.get(key, 0) < self.size:
+                    queue.put_nowait(self._create(agent_type, role))
+                    created += 1
+        return created
+    
+    @asynccontextmanager
+    async def acquire(self, agent_type: str, role: str) -> AsyncIterator[BaseAgent]:
+        """
+        Check out an agent for the duration of the block.
+        
+        Args:
+            agent_type: Type of agent (critic, refiner, evaluator)
+            role: The role context (webdev, syseng, analyst, designer)
+        
+        Yields:
+            An agent that is reset and returned to the pool afterwards
+        
+        Raises:
+            ValueError: For an unknown agent type or role
+        """
+        # Check before creating the key's queue, so unknown roles leave nothing behind
+        if agent_type not in AGENT_CLASSES:
+            raise ValueError(f"Unknown agent type: {agent_type}")
+        if role not in get_available_roles():
+            raise ValueError(f"Unknown role: {role}")
+        
+        key = (agent_type, role)
+        queue = self._queue(key)
+        started = time.perf_counter()
+        
+        if not queue.empty():
+            agent = queue.get_nowait()
+        elif self._created.get(key, 0) < self.max_size:
+            agent = self._create(agent_type, role)
+        else:
+            self.waits += 1
+            agent = await queue.get()
+        
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.checkouts += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        
+        try:
+            yield agent
+        finally:
+            self._in_use[key] -= 1
+            agent.reset()
+            queue.put_nowait(agent)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get pool sizing and checkout wait-time metrics."""
+        return {
+            "size": self.size,
+            "max_size": self.max_size,
+            "agents": sum(self._created.values()),
+            "idle": sum(queue.qsize() for queue in self._idle.values()),
+            "in_use": sum(self._in_use.values()),
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "avg_wait_ms": self.total_wait_ms / self.checkouts if self.checkouts else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+            "pools": {
+                f"{agent_type}:{role}": {
+                    "agents": created,
+                    "idle": self._idle[(agent_type, role)].qsize(),
+                    "in_use": self._in_use.get((agent_type, role), 0),
+                }
+                for (agent_type, role), created in self._created.items()
+            },
+        }
+
+# Create a global agent pool instance
+agent_pool = AgentPool()
\ No newline at end of file
@@ -1,6 +1,7 @@
-from typing import Dict, Any, List, Optional
-import re
+from typing import Dict, Any, Optional
 from .base import BaseAgent
+from .parsing import ParsedResponse
+from .schemas import RefinerOutput
 
 class RefinerAgent(BaseAgent):
     """
@@ -8,19 +9,23 @@ class RefinerAgent(BaseAgent):
     This agent takes the original prompt and the Critic's analysis to create an enhanced version.
     """
     
-    def __init__(self, role: str):
+    output_schema = RefinerOutput
+    
+    def __init__(self, role: str, engine: Optional[str] = None):
         """
         Initialize the Refiner agent.
         
         Args:
             role: The role context (webdev, syseng, analyst, designer)
+            engine: Execution engine, "direct" or "autogen" (defaults to settings.AGENT_ENGINE)
         """
-        super().__init__("refiner", role)
+        super().__init__("refiner", role, engine)
     
     async def process(
         self, 
         prompt: str, 
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        temperature: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Process the prompt with critic feedback and return the refined prompt.
@@ -28,6 +33,8 @@ class RefinerAgent(BaseAgent):
         Args:
             prompt: The original prompt to refine
             context: Additional context, including the critic's feedback
+            temperature: Sampling temperature for this call (varied across
+                best-of-N candidates)
             
         Returns:
             A dictionary with the refined prompt
@@ -37,7 +44,7 @@ class RefinerAgent(BaseAgent):
             context = context or {}
             context["note"] = "No critic feedback provided. Proceeding with general refinement."
         
-        return await super().process(prompt, context)
+        return await super().process(prompt, context, temperature)
     
     def _prepare_message(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -56,9 +63,15 @@ class RefinerAgent(BaseAgent):
             if "critic_feedback" in context:
                 message += f"Critic's feedback:\n{context['critic_feedback']}\n\n"
             
+            if "reference_examples" in context:
+                message += (
+                    "Examples of similar prompts and how they were improved:\n"
+                    f"{context['reference_examples']}\n\n"
+                )
+            
             # Add any other context
             for key, value in context.items():
-                if key not in ["critic_feedback", "prompt"]:
+                if key not in ["critic_feedback", "reference_examples", "prompt"]:
                     message += f"{key}: {value}\n"
         
         message += (
@@ -84,23 +97,16 @@ class RefinerAgent(BaseAgent):
             A structured response with the refined prompt and confidence
         """
         try:
-            # Extract the refined prompt
-            refined_prompt = self._extract_refined_prompt(response)
-            
-            # Extract confidence level (default to 0.8 if not found)
-            confidence = self._extract_confidence(response)
-            
-            # Extract improvements made
-            improvements = self._extract_improvements(response)
+            parsed = ParsedResponse(response)
             
             # Create the structured response
             return {
-                "content": refined_prompt or response,
-                "confidence": confidence,
-                "suggestions": improvements,
+                "content": parsed.refined_prompt or response,
+                "confidence": parsed.confidence(0.8),
+                "suggestions": parsed.improvements,
                 "analysis": {
                     "raw_response": response,
-                    "improvement_count": len(improvements),
+                    "improvement_count": len(parsed.improvements),
                 }
             }
         except Exception as e:
@@ -115,80 +121,14 @@ class RefinerAgent(BaseAgent):
                 },
             }
     
-    def _extract_refined_prompt(self, text: str) -> Optional[str]:
-        """Extract the refined prompt from the response text."""
-        # Look for explicit refined prompt sections
-        refined_patterns = [
-            r"(?:^|\n)(?:Refined|Improved|Enhanced|Final) [Pp]rompt:?\s*\"?([^\"]+)\"?(?=\n|$)",
-            r"(?:^|\n)\"([^\"]+)\"(?=\n|$)",  # Quoted text that might be the prompt
-        ]
-        
-        for pattern in refined_patterns:
-            match = re.search(pattern, text, re.MULTILINE | re.DOTALL)
-            if match:
-                return match.group(1).strip()
-        
-        # If no explicit sections, look for the last paragraph that looks like a prompt
-        paragraphs = re.split(r"\n\s*\n", text)
-        for paragraph in reversed(paragraphs):
-            # Skip paragraphs that look like analysis or confidence statements
-            if re.search(r"(?:confidence|analysis|suggest|improv)", paragraph, re.IGNORECASE):
-                continue
-            
-            # Skip very short paragraphs
-            if len(paragraph) < 30:
-                continue
-                
-            # This might be the prompt
-            return paragraph.strip()
-        
-        return None
-    
-    def _extract_confidence(self, text: str) -> float:
-        """Extract the confidence level from the response text."""
-        # Look for explicit confidence indicators
-        confidence_match = re.search(r"[Cc]onfidence:?\s*(\d+(?:\.\d+)?)", text)
-        if confidence_match:
-            try:
-                return float(confidence_match.group(1))
-            except ValueError:
-                pass
-        
-        # Look for qualitative indicators
-        if re.search(r"(?:high confidence|very confident|certain)", text, re.IGNORECASE):
-            return 0.9
-        elif re.search(r"(?:moderate confidence|somewhat confident)", text, re.IGNORECASE):
-            return 0.7
-        elif re.search(r"(?:low confidence|not confident|uncertain)", text, re.IGNORECASE):
-            return 0.5
-            
-        # Default confidence
-        return 0.8
-    
-    def _extract_improvements(self, text: str) -> List[str]:
-        """Extract a list of improvements from the response text."""
-        improvements = []
-        
-        # Look for sections describing improvements
-        improvement_section = re.search(
-            r"(?:^|\n)(?:Changes|Improvements|Enhancements) made:?\s*\n((?:.+\n)+)", 
-            text, 
-            re.IGNORECASE
-        )
-        
-        if improvement_section:
-            section_text = improvement_section.group(1)
-            # Extract individual improvements
-            items = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", section_text, re.MULTILINE)
-            if items:
-                improvements.extend([item.strip() for item in items if item.strip()])
-        
-        # If no structured improvements found, look for sentences about improvements
-        if not improvements:
-            improve_sentences = re.findall(
-                r"(?:^|\n)([^.\n]+(?:improve|enhance|add|change|clarify|specify)[^.\n]+\.)", 
-                text
-            )
-            improvements.extend([sentence.strip() for sentence in improve_sentences if sentence.strip()])
-        
-        return improvements 
\ No newline at end of file
+    def _from_structured(self, output: RefinerOutput) -> Dict[str, Any]:
+        """Convert validated JSON output into the _process_response shape."""
+        return {
+            "content": output.refined_prompt,
+            "confidence": output.confidence,
+            "suggestions": output.improvements,
+            "analysis": {
+                "raw_response": output.model_dump_json(),
+                "improvement_count": len(output.improvements),
+            }
+        }
\ No newline at end of file
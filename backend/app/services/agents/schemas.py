@@ -0,0 +1,95 @@
+"""
+Structured output schemas for the agents' JSON mode.
+"""
+from typing import Any, Dict, List, Type
+
+from pydantic import BaseModel, Field
+
+class CriticOutput(BaseModel):
+    """Critic analysis of a prompt."""
+    feedback: str = Field(..., description="Analysis of the prompt for the refiner")
+    issues: List[str] = Field(default_factory=list, description="Issues found in the prompt")
+    primary_concerns: List[str] = Field(default_factory=list, description="The most important issues")
+    clarity: float = Field(..., ge=0, le=1, description="Clarity rating")
+    technical_accuracy: float = Field(..., ge=0, le=1, description="Technical accuracy rating")
+    completeness: float = Field(..., ge=0, le=1, description="Completeness rating")
+    confidence: float = Field(0.7, ge=0, le=1, description="Confidence in the analysis")
+
+class RefinerOutput(BaseModel):
+    """Refined prompt and the changes behind it."""
+    refined_prompt: str = Field(..., min_length=1, description="The improved prompt")
+    improvements: List[str] = Field(default_factory=list, description="Changes made to the prompt")
+    confidence: float = Field(0.8, ge=0, le=1, description="Confidence in the refinement")
+
+class EvaluatorOutput(BaseModel):
+    """Evaluation of a refined prompt."""
+    assessment: str = Field(..., description="Overall assessment")
+    strengths: List[str] = Field(default_factory=list, description="Strengths of the refined prompt")
+    weaknesses: List[str] = Field(default_factory=list, description="Remaining weaknesses or suggestions")
+    quality_score: float = Field(..., ge=0, le=1, description="Quality score of the refined prompt")
+
+def response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Build an OpenAI-style json_schema response format for a schema."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+    }
+
+def json_instructions(schema: Type[BaseModel]) -> str:
+    """Describe the expected JSON object in the message, for providers without JSON mode."""
+    fields = schema.model_json_schema()["properties"]
+    lines = [
+        f'- "{name}" ({field.get("type", "string")}): {field.get("description", "")}'
+        for name, field in fields.items()
+    ]
+    return (
+        "Respond with a single JSON object and nothing else, with these fields:\n"
+        + "\n".join(lines)
+        + "\nRatings and scores are numbers between 0 and 1."
+    )
+
+def parse_structured(schema: Type[BaseModel], text: str) -> BaseModel:
+    """
+    Validate a JSON response against a schema.
+    
+    Args:
+        schema: The expected schema
+        text: The raw response, optionally wrapped in a Markdown code fence
+    
+    Returns:
+        The validated object
+    
+    Raises:
+        ValueError: If the response is not valid JSON for the schema
+            (pydantic's ValidationError is a ValueError)
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    return schema.model_validate_json(text)
+
+def render_text(output: BaseModel) -> str:
+    """
+    Render validated output as labelled text sections ("Refined Prompt: ...").
+    
+    Args:
+        output: A validated schema instance
+    
+    Returns:
+        One "Label: value" line per field, with strings quoted and list
+        fields as bullets
+    """
+    lines = []
+    for name, value in output.model_dump().items():
+        label = name.replace("_", " ").title()
+        if isinstance(value, list):
+            lines.append(f"{label}:")
+            lines.extend(f"- {item}" for item in value)
+        elif isinstance(value, str):
+            # Quoted, so the text parsers know where a multi-word value ends
+            lines.append(f'{label}: "{value}"')
+        else:
+            lines.append(f"{label}: {value}")
+    return "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Cache for per-user API key records stored in the user_api_keys table.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..core.config import settings
+from ..utils.cache import TTLCache
+from ..utils.singleflight import SingleFlight
+
+# Marker distinguishing "not cached" from a cached "user has no keys"
+_NOT_CACHED = object()
+
+class ApiKeyCache:
+    """
+    Async-safe cache of per-user API key records.
+    
+    Users without a key record are cached too (with a shorter TTL), and
+    concurrent misses for one user share a single database query.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = settings.API_KEY_CACHE_MAX_SIZE,
+        ttl: float = settings.API_KEY_CACHE_TTL,
+        negative_ttl: float = settings.API_KEY_CACHE_NEGATIVE_TTL,
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of users kept in the cache
+            ttl: Seconds a key record is served from the cache
+            negative_ttl: Seconds a "no keys" result is served from the cache
+        """
+        self.negative_ttl = negative_ttl
+        self._records = TTLCache(max_size=max_size, ttl=ttl)
+        self._flights = SingleFlight()
+        # Invalidation generations and load counts, kept only for users with a
+        # load in flight, so neither grows with the number of users
+        self._generations: Dict[str, int] = {}
+        self._loading: Dict[str, int] = {}
+    
+    async def get(
+        self,
+        user_id: str,
+        loader: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's key record, loading it on a miss.
+        
+        Args:
+            user_id: The user's unique identifier
+            loader: Coroutine function that fetches the record from the database
+        
+        Returns:
+            The key record, or None if the user has no keys
+        """
+        record = self._records.get(user_id, _NOT_CACHED)
+        if record is not _NOT_CACHED:
+            return record
+        
+        # Key the flight by generation so lookups after an invalidation
+        # never join a query that started before it
+        flight_key = (user_id, self._generations.get(user_id, 0))
+        return await self._flights.do(flight_key, lambda: self._load(user_id, loader))
+    
+    async def _load(
+        self,
+        user_id: str,
+        loader: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """Load a record and cache it unless it was invalidated meanwhile."""
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        generation = self._generations.get(user_id, 0)
+        try:
+            record = await loader(user_id)
+            if self._generations.get(user_id, 0) == generation:
+                self._records.set(user_id, record, ttl=None if record else self.negative_ttl)
+        finally:
+            self._loading[user_id] -= 1
+            if not self._loading[user_id]:
+                del self._loading[user_id]
+                self._generations.pop(user_id, None)
+        
+        return record
+    
+    def invalidate(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Drop a user's cached record, e.g. after they update their keys.
+        
+        Args:
+            user_id: The user's unique identifier
+        
+        Returns:
+            The record that was cached, if any
+        """
+        # Bump the generation so a query already in flight is not cached
+        if user_id in self._loading:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        return self._records.pop(user_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache and query-coalescing counters."""
+        return {
+            **self._records.stats(),
+            "queries": self._flights.stats(),
+        }
+
+# Create a global API key cache instance
+api_key_cache = ApiKeyCache()
\ No newline at end of file
@@ -1,33 +1,127 @@
 """
 Authentication service for handling user authentication and authorization.
 """
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import heapq
+import itertools
+import time
 import jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 
 from ..core.config import settings
 from .supabase_client import supabase_service
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .password_hasher import password_hasher, PasswordHasherBusy
+from ..utils.cache import TTLCache
+from ..utils.singleflight import SingleFlight
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Same scheme for endpoints that also serve anonymous requests
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 class AuthService:
     """Service for handling user authentication and authorization."""
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a plain password against its hash."""
-        return pwd_context.verify(plain_password, hashed_password)
+    def __init__(
+        self,
+        cache_max_size: int = settings.AUTH_CACHE_MAX_SIZE,
+        cache_ttl: float = settings.AUTH_CACHE_TTL,
+    ):
+        """
+        Initialize the decoded-token and user-principal caches.
+        
+        Args:
+            cache_max_size: Maximum entries in each cache
+            cache_ttl: Upper bound in seconds on how long an entry is served;
+                entries never outlive the token they came from
+        """
+        self.cache_ttl = cache_ttl
+        self._tokens = TTLCache(max_size=cache_max_size, ttl=cache_ttl)
+        self._users = TTLCache(max_size=cache_max_size, ttl=cache_ttl)
+        self._user_flights = SingleFlight()
+        # Invalidation generation and time per user, oldest bump first; kept
+        # only for cache_ttl, after which no principal cached before it remains.
+        # Generations come from one process-wide counter, so a user whose entry
+        # was pruned never gets a generation their old principals were cached under
+        self._user_generations: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._generation_counter = itertools.count(1)
+        # Logged-out token hashes and their expiry, with a heap to prune them.
+        # The denylist is per process: other workers, and this one after a
+        # restart, accept a logged-out token until it expires
+        self._revoked: Dict[str, float] = {}
+        self._revoked_expiry: List[Tuple[float, str]] = []
+    
+    @staticmethod
+    def _token_key(token: str) -> str:
+        """Key the token cache by hash so raw tokens are not kept as keys."""
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+    
+    def _entry_ttl(self, payload: Dict[str, Any]) -> Optional[float]:
+        """Get the cache TTL for a token, capped by its remaining lifetime (None if expired)."""
+        expires_at = payload.get("exp")
+        if expires_at is None:
+            return self.cache_ttl
+        
+        remaining = float(expires_at) - time.time()
+        if remaining <= 0:
+            return None
+        return min(self.cache_ttl, remaining)
+    
+    def _generation(self, user_id: str) -> int:
+        """Get a user's invalidation generation (0 once no stale principal can remain)."""
+        self._prune_generations()
+        entry = self._user_generations.get(user_id)
+        return entry[0] if entry else 0
+    
+    def _prune_generations(self) -> None:
+        """Forget generations bumped longer than cache_ttl ago."""
+        cutoff = time.monotonic() - self.cache_ttl
+        while self._user_generations:
+            user_id, (_, bumped_at) = next(iter(self._user_generations.items()))
+            if bumped_at > cutoff:
+                break
+            del self._user_generations[user_id]
+    
+    def _principal_key(self, payload: Dict[str, Any]) -> Tuple[str, Any, int]:
+        """Key a user principal by subject, token expiry and invalidation generation."""
+        user_id = payload["sub"]
+        return user_id, payload.get("exp"), self._generation(user_id)
+    
+    def _is_revoked(self, token_key: str) -> bool:
+        """Check the logout denylist, dropping entries whose token has expired."""
+        now = time.time()
+        while self._revoked_expiry and self._revoked_expiry[0][0] <= now:
+            _, expired_key = heapq.heappop(self._revoked_expiry)
+            self._revoked.pop(expired_key, None)
+        return token_key in self._revoked
+    
+    @staticmethod
+    def _password_pool_busy() -> HTTPException:
+        """Build the 503 returned when the password pool sheds a request."""
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a plain password against its hash in the password worker pool."""
+        try:
+            return await password_hasher.verify(plain_password, hashed_password)
+        except PasswordHasherBusy:
+            raise self._password_pool_busy()
     
-    def get_password_hash(self, password: str) -> str:
-        """Generate a hash for a password."""
-        return pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        """Generate a hash for a password in the password worker pool."""
+        try:
+            return await password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise self._password_pool_busy()
     
     async def authenticate_user(self, email: str, password: str) -> Optional[Dict[str, Any]]:
         """
@@ -49,14 +143,12 @@ class AuthService:
         try:
             # In a real implementation, you'd use Supabase auth
             # For now, query the users table directly
-            response = supabase_service.client.table('users').select('*').eq('email', email).execute()
+            user = await supabase_service.get_user_by_email(email)
             
-            if not response.data or len(response.data) == 0:
+            if not user:
                 return None
-                
-            user = response.data[0]
             
-            if not self.verify_password(password, user.get("password_hash", "")):
+            if not await self.verify_password(password, user.get("password_hash", "")):
                 return None
                 
             # Remove sensitive data before returning
@@ -65,6 +157,8 @@ class AuthService:
                 
             return user
             
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error authenticating user: {e}")
             return None
@@ -104,25 +198,133 @@ class AuthService:
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-        try:
-            payload = jwt.decode(
-                token, 
-                settings.JWT_SECRET, 
-                algorithms=[settings.JWT_ALGORITHM]
-            )
+        # Logged-out tokens stay rejected until they expire
+        token_key = self._token_key(token)
+        if self._is_revoked(token_key):
+            raise credentials_exception
+        
+        # Repeat calls with the same token skip the signature check
+        payload = self._tokens.get(token_key)
+        if payload is None:
+            try:
+                payload = jwt.decode(
+                    token,
+                    settings.JWT_SECRET,
+                    algorithms=[settings.JWT_ALGORITHM]
+                )
+                
+                user_id: str = payload.get("sub")
+                if user_id is None:
+                    raise credentials_exception
             
-            user_id: str = payload.get("sub")
-            if user_id is None:
+            except (JWTError, jwt.PyJWTError):
                 raise credentials_exception
-                
-        except JWTError:
+            
+            ttl = self._entry_ttl(payload)
+            if ttl is None:
+                raise credentials_exception
+            self._tokens.set(token_key, payload, ttl=ttl)
+        
+        # ...and the users table lookup, until the token expires or the user is invalidated
+        ttl = self._entry_ttl(payload)
+        if ttl is None:
+            self._tokens.pop(token_key)
             raise credentials_exception
+        
+        principal_key = self._principal_key(payload)
+        user = self._users.get(principal_key)
+        if user is None:
+            user = await self._user_flights.do(
+                principal_key,
+                lambda: self._load_principal(principal_key, ttl)
+            )
             
-        user = await supabase_service.get_user(user_id)
         if user is None:
             raise credentials_exception
             
         return user
 
+    async def get_optional_user(self, token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[Dict[str, Any]]:
+        """
+        Get the current user if the request carries a valid token.
+        
+        Args:
+            token: JWT token, if one was sent
+        
+        Returns:
+            User data, or None for anonymous or invalid credentials
+        """
+        if not token:
+            return None
+        
+        try:
+            return await self.get_current_user(token)
+        except HTTPException:
+            return None
+    
+    async def _load_principal(self, principal_key: Tuple[str, Any, int], ttl: float) -> Optional[Dict[str, Any]]:
+        """Fetch a user and cache it under the principal key."""
+        user_id = principal_key[0]
+        user = await supabase_service.get_user(user_id)
+        if user is None:
+            return None
+        
+        # Never keep the password hash in memory
+        user = {key: value for key, value in user.items() if key != "password_hash"}
+        if self._generation(user_id) == principal_key[2]:
+            self._users.set(principal_key, user, ttl=ttl)
+        return user
+    
+    def invalidate_user(self, user_id: str) -> None:
+        """
+        Drop every cached principal for a user.
+        
+        Anything that changes a user's row (deactivation, role or profile
+        changes) must call this so the principal cache does not serve the old
+        state until its TTL runs out.
+        
+        Args:
+            user_id: The user's unique identifier
+        """
+        # Bumping the generation makes existing keys unreachable; they age out of the LRU
+        generation = next(self._generation_counter)
+        self._user_generations.pop(user_id, None)
+        self._user_generations[user_id] = (generation, time.monotonic())
+    
+    def logout(self, token: str) -> None:
+        """
+        Revoke a token until it expires.
+        
+        The revocation only holds in this process and is lost on restart;
+        with several workers, other workers keep accepting the token until it
+        expires. Keep JWT_EXPIRATION_MINUTES short where that matters.
+        
+        Args:
+            token: The JWT being logged out
+        """
+        token_key = self._token_key(token)
+        payload = self._tokens.pop(token_key)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+            except (JWTError, jwt.PyJWTError):
+                # Invalid or expired tokens are rejected anyway
+                return
+        
+        # Tokens without an expiry never lapse, so they stay revoked
+        expires_at = float(payload.get("exp", float("inf")))
+        if expires_at > time.time() and token_key not in self._revoked:
+            self._revoked[token_key] = expires_at
+            heapq.heappush(self._revoked_expiry, (expires_at, token_key))
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get token and principal cache counters."""
+        return {
+            "tokens": self._tokens.stats(),
+            "users": self._users.stats(),
+            "revoked_tokens": len(self._revoked),
+            "invalidated_users": len(self._user_generations),
+        }
+
 # Create a global auth service instance
 auth_service = AuthService() 
\ No newline at end of file
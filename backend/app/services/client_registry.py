@@ -0,0 +1,89 @@
+"""
+Registry of reusable provider clients for per-user API keys.
+"""
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from openai import AsyncOpenAI
+
+from ..core.config import settings
+from ..utils.cache import TTLCache
+from .llm_client import async_llm_client
+
+# Base URLs for the OpenAI-compatible providers we support
+PROVIDER_BASE_URLS: Dict[str, Optional[str]] = {
+    "deepseek": settings.DEEPSEEK_BASE_URL,
+    "openai": settings.OPENAI_BASE_URL,
+    "perplexity": settings.PERPLEXITY_BASE_URL,
+}
+
+class ClientRegistry:
+    """
+    Bounded registry of provider clients keyed by provider and hashed API key.
+    
+    All clients share one pooled HTTP client, so an evicted client holds no
+    connections of its own and can simply be dropped.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = settings.CLIENT_REGISTRY_MAX_SIZE,
+        idle_ttl: float = settings.CLIENT_REGISTRY_IDLE_TTL,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        """
+        Initialize the registry.
+        
+        Args:
+            max_size: Maximum number of clients kept alive
+            idle_ttl: Seconds an unused client is kept before it is dropped
+            http_client: Shared HTTP client (defaults to the LLM client's pool)
+        """
+        self.http_client = http_client or async_llm_client.http_client
+        self._clients = TTLCache(max_size=max_size, ttl=idle_ttl, refresh_on_access=True)
+    
+    @staticmethod
+    def _key(provider: str, api_key: str) -> Tuple[str, str]:
+        """Build the registry key without keeping the raw API key around."""
+        return provider, hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    
+    def get_client(self, provider: str, api_key: str) -> AsyncOpenAI:
+        """
+        Get a pooled client for a provider and API key, creating it on a miss.
+        
+        Args:
+            provider: Provider name (deepseek, openai, perplexity)
+            api_key: The API key to authenticate with
+        
+        Returns:
+            An AsyncOpenAI client bound to the shared connection pool
+        
+        Raises:
+            ValueError: If the provider is unknown
+        """
+        if provider not in PROVIDER_BASE_URLS:
+            raise ValueError(f"Unknown provider: {provider}")
+        
+        key = self._key(provider, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=PROVIDER_BASE_URLS[provider],
+                http_client=self.http_client,
+                max_retries=settings.LLM_MAX_RETRIES,
+            )
+            self._clients.set(key, client)
+        
+        return client
+    
+    def invalidate(self, provider: str, api_key: str) -> None:
+        """Drop the client for a provider and API key (e.g. after key rotation)."""
+        self._clients.pop(self._key(provider, api_key))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get registry size and hit/miss counters."""
+        return self._clients.stats()
+
+# Create a global client registry instance
+client_registry = ClientRegistry()
\ No newline at end of file
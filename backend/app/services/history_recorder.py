@@ -0,0 +1,413 @@
+"""
+Write-behind recorder that batches prompt history rows into bulk inserts.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from ..core.config import settings
+from ..utils.metrics import LatencyHistogram
+from .postgrest import PostgrestError
+from .supabase_client import supabase_service
+
+# Status codes that mean the database could not take the rows right now
+# (as opposed to rejecting the rows themselves)
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429})
+
+class HistoryRecorder:
+    """
+    Buffers prompt history rows in memory and writes them in the background.
+    
+    record() only appends to a bounded buffer, so requests never wait on the
+    database. A background task flushes the buffer as one bulk insert once it
+    holds batch_size rows or every flush_interval seconds. When the buffer is
+    full, or a flush fails because the database is unavailable, rows are
+    appended to a JSONL spill file and retried on later flushes, batch_size
+    rows at a time. Inserts skip rows whose id already exists, so a retried
+    batch that partly landed before a failure is not lost or duplicated.
+    """
+    
+    def __init__(
+        self,
+        service: Any = supabase_service,
+        batch_size: int = settings.HISTORY_BATCH_SIZE,
+        flush_interval: float = settings.HISTORY_FLUSH_INTERVAL,
+        max_pending: int = settings.HISTORY_MAX_PENDING,
+        spill_path: str = settings.HISTORY_SPILL_PATH,
+        table: str = "prompt_history",
+    ):
+        """
+        Initialize the recorder.
+        
+        Args:
+            service: Supabase service whose async PostgREST client does the inserts
+            batch_size: Maximum rows per bulk insert; a full batch triggers a flush
+            flush_interval: Seconds between background flushes
+            max_pending: Maximum rows held in memory before new rows are spilled
+            spill_path: JSONL file for rows that could not be written yet
+            table: Table the rows are inserted into
+        """
+        self.service = service
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.table = table
+        self._rows: Deque[Dict[str, Any]] = deque()
+        self._spill_lock = threading.Lock()
+        # Overflow rows being appended to the spill file off the event loop
+        self._spill_writes: Set[asyncio.Task] = set()
+        # Bytes of the draining file already written, so a failed drain resumes there
+        self._drain_offset = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.flush_latency = LatencyHistogram()
+        self.recorded = 0
+        self.written = 0
+        self.batches = 0
+        self.spilled = 0
+        self.overflowed = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+    
+    def is_enabled(self) -> bool:
+        """Check whether history can be written at all."""
+        return self.service.is_configured()
+    
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Call listener with every recorded row, e.g. to keep a local index current.
+        
+        Listeners run inline in record(), so they must be fast and must not block.
+        
+        Args:
+            listener: Function taking the row dict
+        """
+        self._listeners.append(listener)
+    
+    def record(
+        self,
+        user_id: str,
+        original_prompt: str,
+        enhanced_prompt: str,
+        role: str,
+        success: bool = True,
+        model: Optional[str] = None,
+    ) -> bool:
+        """
+        Queue a prompt history row without waiting for the database.
+        
+        Args:
+            user_id: The user's unique identifier
+            original_prompt: The original prompt text
+            enhanced_prompt: The enhanced prompt text
+            role: The role used for enhancement
+            success: Whether the enhancement was successful
+            model: The model that produced the enhancement
+        
+        Returns:
+            True if the row was queued or spilled, False if the database is not configured
+        """
+        row = {
+            # Assigned here so listeners and the database agree on the id, and a
+            # retried batch that already landed is rejected instead of duplicated
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "original_prompt": original_prompt,
+            "enhanced_prompt": enhanced_prompt,
+            "role": role,
+            "success": success,
+            "model": model,
+            # Stamp the row now so batching does not shift its timestamp
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for listener in self._listeners:
+            try:
+                listener(row)
+            except Exception as e:
+                print(f"Error in prompt history listener: {e}")
+        
+        if not self.is_enabled():
+            return False
+        self.recorded += 1
+        
+        if len(self._rows) >= self.max_pending:
+            # Back-pressure: memory stays bounded and the row is kept on disk instead
+            self.overflowed += 1
+            self._spill_later([row])
+            self._wake()
+            return True
+        
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._wake()
+        return True
+    
+    def _spill_later(self, rows: List[Dict[str, Any]]) -> None:
+        """Append rows to the spill file without blocking the event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to protect (e.g. a script), so write inline
+            self._append_spill(rows)
+            return
+        task = loop.create_task(self._append_spill_async(rows))
+        self._spill_writes.add(task)
+        task.add_done_callback(self._spill_writes.discard)
+    
+    async def _append_spill_async(self, rows: List[Dict[str, Any]]) -> None:
+        """Append rows to the spill file in a worker thread."""
+        try:
+            await asyncio.to_thread(self._append_spill, rows)
+        except OSError as e:
+            print(f"Error spilling {len(rows)} prompt history rows: {e}")
+    
+    def _wake(self) -> None:
+        """Ask the background task to flush now."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    def start(self) -> None:
+        """Start the background flush task on the running event loop."""
+        if self._task is not None or not self.is_enabled():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the background task and flush everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+    
+    async def _run(self) -> None:
+        """Flush whenever a batch fills up or the interval passes."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing prompt history: {e}")
+    
+    async def flush(self) -> int:
+        """
+        Write spilled rows and buffered rows as bulk inserts.
+        
+        Returns:
+            Number of rows written to the database
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        
+        async with self._flush_lock:
+            # Overflow rows still on their way to disk are part of this flush
+            if self._spill_writes:
+                await asyncio.gather(*list(self._spill_writes))
+            failed_flushes = self.failed_flushes
+            written = await self._drain_spill()
+            
+            rows = list(self._rows)
+            self._rows.clear()
+            if rows and self.failed_flushes != failed_flushes:
+                # The database just failed; do not wait on it a second time
+                await asyncio.to_thread(self._append_spill, rows)
+            elif rows:
+                written += await self._write(rows)
+            return written
+    
+    async def _write(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert rows in batches, spilling whatever cannot be written."""
+        written = 0
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            try:
+                written += await self._insert(batch)
+            except Exception as e:
+                print(f"Prompt history database unavailable, spilling {len(rows) - start} rows: {e}")
+                self.failed_flushes += 1
+                await asyncio.to_thread(self._append_spill, rows[start:])
+                break
+        return written
+    
+    async def _drain_spill(self) -> int:
+        """
+        Write the spill file one batch at a time.
+        
+        Only one batch is held in memory. If the database fails, the rest stays
+        in the draining file and the next flush resumes after the last written
+        batch (from the start after a restart; rows that already landed are
+        skipped as duplicates).
+        
+        Returns:
+            Number of rows written
+        """
+        path = await asyncio.to_thread(self._claim_spill)
+        if path is None:
+            return 0
+        
+        written = 0
+        while True:
+            rows, offset = await asyncio.to_thread(self._read_spill, path, self._drain_offset, self.batch_size)
+            if offset == self._drain_offset:
+                break
+            try:
+                written += await self._insert(rows)
+            except Exception as e:
+                print(f"Prompt history database unavailable, keeping spilled rows: {e}")
+                self.failed_flushes += 1
+                return written
+            self._drain_offset = offset
+        
+        await asyncio.to_thread(self._finish_drain, path)
+        return written
+    
+    async def _insert(self, batch: List[Dict[str, Any]]) -> int:
+        """
+        Insert one batch, dropping only rows the database rejects outright.
+        
+        Args:
+            batch: Rows to insert
+        
+        Returns:
+            Number of rows written
+        
+        Raises:
+            Exception: If the database is unavailable and the batch should be retried
+        """
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        try:
+            await self.service.rest.insert(self.table, batch, returning=False, ignore_duplicates_on="id")
+        except PostgrestError as e:
+            if e.status_code is None or e.status_code >= 500 or e.status_code in RETRYABLE_STATUS_CODES:
+                raise
+            if len(batch) > 1:
+                # Find the invalid rows so they do not take the rest of the batch with them
+                written = 0
+                for row in batch:
+                    written += await self._insert([row])
+                return written
+            # The row itself is invalid; retrying would fail forever
+            print(f"Dropping prompt history row {batch[0].get('id')}: {e}")
+            self.rejected += 1
+            return 0
+        finally:
+            self.flush_latency.observe((time.perf_counter() - started) * 1000)
+        
+        self.batches += 1
+        self.written += len(batch)
+        return len(batch)
+    
+    def _append_spill(self, rows: List[Dict[str, Any]]) -> None:
+        """Append rows to the spill file."""
+        with self._spill_lock:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+            self.spilled += len(rows)
+    
+    @property
+    def draining_path(self) -> str:
+        """File the spill is moved to while it is being written to the database."""
+        return self.spill_path + ".draining"
+    
+    def _claim_spill(self) -> Optional[str]:
+        """
+        Get the file to drain, moving the spill file aside if none is in progress.
+        
+        New spills go to a fresh spill file meanwhile, so draining never races
+        with appends.
+        
+        Returns:
+            The draining file's path, or None if nothing is spilled
+        """
+        with self._spill_lock:
+            if os.path.exists(self.draining_path):
+                return self.draining_path
+            if not os.path.exists(self.spill_path):
+                return None
+            os.replace(self.spill_path, self.draining_path)
+            self._drain_offset = 0
+            return self.draining_path
+        
+    @staticmethod
+    def _read_spill(path: str, offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Read up to limit rows from a spill file, starting at a byte offset.
+        
+        Returns:
+            The rows and the byte offset after them (unchanged at end of file)
+        """
+        rows = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while len(rows) < limit:
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    # A partial line from a crash mid-write
+                    continue
+            return rows, f.tell()
+    
+    def _finish_drain(self, path: str) -> None:
+        """Remove a fully written draining file."""
+        with self._spill_lock:
+            os.remove(path)
+            self._drain_offset = 0
+    
+    def spill_size(self) -> int:
+        """Get the size of the spill and draining files in bytes."""
+        size = 0
+        for path in (self.spill_path, self.draining_path):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get buffer occupancy, write counters and flush latency."""
+        return {
+            "enabled": self.is_enabled(),
+            "running": self._task is not None,
+            "pending": len(self._rows),
+            "max_pending": self.max_pending,
+            "batch_size": self.batch_size,
+            "recorded": self.recorded,
+            "written": self.written,
+            "batches": self.batches,
+            "spilled": self.spilled,
+            "overflowed": self.overflowed,
+            "rejected": self.rejected,
+            "failed_flushes": self.failed_flushes,
+            "spill_bytes": self.spill_size(),
+            "flush_latency": self.flush_latency.snapshot(),
+        }
+
+# Create the global history recorder instance
+history_recorder = HistoryRecorder()
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+In-process inverted index for searching prompt history.
+"""
+import math
+import re
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from ..core.config import settings
+from .history_recorder import history_recorder
+from .supabase_client import supabase_service
+
+# Characters of each prompt kept for result previews (matches the schema's preview columns)
+PREVIEW_LENGTH = 160
+
+# Words too common in prompts to help ranking
+SEARCH_STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "please", "that", "the", "this", "to",
+    "with", "you", "your",
+})
+
+def search_terms(text: str) -> List[str]:
+    """Lowercase words of text, without stop words and single characters."""
+    return [
+        word for word in re.findall(r"\w+", text.lower())
+        if len(word) > 1 and word not in SEARCH_STOP_WORDS
+    ]
+
+class UserHistoryIndex:
+    """Postings for one user's newest history rows."""
+    
+    def __init__(self, max_docs: int):
+        """
+        Initialize an empty index.
+        
+        Args:
+            max_docs: Rows kept before the oldest is evicted
+        """
+        self.max_docs = max_docs
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.order: Deque[str] = deque()
+        self.total_length = 0
+    
+    def add(self, doc_id: str, terms: Counter, doc: Dict[str, Any]) -> None:
+        """Index a row, evicting the oldest row when full."""
+        if doc_id in self.docs:
+            return
+        if len(self.order) >= self.max_docs:
+            self.remove(self.order.popleft())
+        
+        doc["length"] = sum(terms.values())
+        doc["terms"] = list(terms)
+        self.docs[doc_id] = doc
+        self.order.append(doc_id)
+        self.total_length += doc["length"]
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+    
+    def remove(self, doc_id: str) -> None:
+        """Drop a row and its postings."""
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in doc["terms"]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+class HistorySearchIndex:
+    """
+    Keyword search over prompt history without touching the database.
+    
+    Rows arrive from the history recorder as they are recorded, so the index
+    is always current for this process. A query returns rows containing every
+    term, ranked by BM25 with matches in the original prompt weighted above
+    matches in the enhancement. Only the newest max_docs_per_user rows of each
+    user are kept, and each worker process indexes only the rows it recorded.
+    """
+    
+    def __init__(
+        self,
+        max_docs_per_user: int = settings.HISTORY_SEARCH_MAX_DOCS_PER_USER,
+        original_weight: int = 2,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """
+        Initialize the index.
+        
+        Args:
+            max_docs_per_user: Newest rows kept per user
+            original_weight: How many times original-prompt terms are counted
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.max_docs_per_user = max_docs_per_user
+        self.original_weight = original_weight
+        self.k1 = k1
+        self.b = b
+        self._users: Dict[str, UserHistoryIndex] = {}
+    
+    def add(self, row: Dict[str, Any]) -> None:
+        """
+        Index a prompt history row.
+        
+        Args:
+            row: Row with id, user_id, prompts, role, success and created_at
+        """
+        terms = Counter()
+        for term in search_terms(row.get("original_prompt") or ""):
+            terms[term] += self.original_weight
+        terms.update(search_terms(row.get("enhanced_prompt") or ""))
+        if not terms:
+            return
+        
+        index = self._users.get(row["user_id"])
+        if index is None:
+            index = self._users[row["user_id"]] = UserHistoryIndex(self.max_docs_per_user)
+        index.add(row["id"], terms, {
+            "id": row["id"],
+            "created_at": row.get("created_at"),
+            "role": row.get("role"),
+            "success": row.get("success", True),
+            "original_preview": (row.get("original_prompt") or "")[:PREVIEW_LENGTH],
+            "enhanced_preview": (row.get("enhanced_prompt") or "")[:PREVIEW_LENGTH],
+        })
+    
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        role: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find a user's rows matching every query term, best matches first.
+        
+        Args:
+            user_id: The user's unique identifier
+            query: Search terms
+            limit: Maximum number of records to return
+            offset: Number of ranked records to skip
+            role: Only search history for this role
+        
+        Returns:
+            Preview records with their rank
+        """
+        index = self._users.get(user_id)
+        terms = list(dict.fromkeys(search_terms(query)))
+        if index is None or not terms:
+            return []
+        
+        postings = [index.postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+        
+        # Intersect starting from the rarest term
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for term_postings in postings[1:]:
+            candidates &= term_postings.keys()
+        if not candidates:
+            return []
+        
+        doc_count = len(index.docs)
+        avg_length = index.total_length / doc_count
+        idf = [math.log(1 + (doc_count - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+        
+        scored = []
+        for doc_id in candidates:
+            doc = index.docs[doc_id]
+            if role and doc["role"] != role:
+                continue
+            norm = self.k1 * (1 - self.b + self.b * doc["length"] / avg_length)
+            score = 0.0
+            for term_idf, term_postings in zip(idf, postings):
+                tf = term_postings[doc_id]
+                score += term_idf * tf * (self.k1 + 1) / (tf + norm)
+            scored.append((score, doc["created_at"] or "", doc_id))
+        
+        scored.sort(reverse=True)
+        results = []
+        for score, _, doc_id in scored[offset:offset + limit]:
+            doc = index.docs[doc_id]
+            result = {key: doc[key] for key in ("id", "created_at", "role", "success", "original_preview", "enhanced_preview")}
+            result["rank"] = round(score, 6)
+            results.append(result)
+        return results
+    
+    def clear(self) -> None:
+        """Remove every indexed row."""
+        self._users.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get index size."""
+        return {
+            "users": len(self._users),
+            "docs": sum(len(index.docs) for index in self._users.values()),
+            "terms": sum(len(index.postings) for index in self._users.values()),
+        }
+
+# Monotonic time before which "auto" skips Postgres full-text search after it failed
+_postgres_retry_at = 0.0
+
+def search_backend() -> str:
+    """
+    Get the history search backend to use now: "postgres" or "local".
+    
+    "auto" uses Postgres full-text search when Supabase is configured and the
+    search RPC has not failed in the last HISTORY_SEARCH_RETRY_INTERVAL
+    seconds, and the local index otherwise.
+    """
+    if settings.HISTORY_SEARCH_BACKEND == "auto":
+        if supabase_service.is_configured() and time.monotonic() >= _postgres_retry_at:
+            return "postgres"
+        return "local"
+    return settings.HISTORY_SEARCH_BACKEND
+
+def postgres_search_failed() -> None:
+    """Send "auto" searches to the local index until the retry interval passes."""
+    global _postgres_retry_at
+    _postgres_retry_at = time.monotonic() + settings.HISTORY_SEARCH_RETRY_INTERVAL
+
+def index_recorded_row(row: Dict[str, Any]) -> None:
+    """Add a recorded row to the global index while it may serve searches."""
+    if settings.HISTORY_SEARCH_BACKEND in ("local", "auto"):
+        history_search_index.add(row)
+
+# Create the global history search index; it is fed in "auto" mode too so it
+# can take over when Postgres search fails. The backend is checked per row, so
+# configuration changes after import are honoured
+history_search_index = HistorySearchIndex()
+history_recorder.subscribe(index_recorded_row)
\ No newline at end of file
@@ -1,6 +1,21 @@
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Any, Optional, TypeVar
+import httpx
+from openai import OpenAI, AsyncOpenAI
 from ..core.config import settings
+from ..utils.metrics import LatencyHistogram, PrefixCacheStats
+
+T = TypeVar("T")
+
+# Fine-grained latency buckets for hedge deadlines: 50ms growing 20% per bucket to ~60s
+HEDGE_LATENCY_BUCKETS_MS = tuple(round(50 * 1.2 ** i) for i in range(40))
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 class LLMClient:
     """Service for interacting with large language models."""
@@ -55,5 +70,414 @@ class LLMClient:
                 "error_type": str(type(e).__name__),
             }
 
+class _ReleasingByteStream(httpx.AsyncByteStream):
+    """Response stream wrapper that frees a per-host slot once the body is closed."""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+        self._released = False
+    
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+    
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that caps the number of in-flight requests per upstream host.
+    
+    httpx only limits connections pool-wide, so a single slow provider could
+    otherwise take every connection in the shared pool.
+    """
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self._max_per_host)
+        
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        
+        if response.is_closed:
+            # The body was already read by the transport (e.g. in tests)
+            semaphore.release()
+        else:
+            response.stream = _ReleasingByteStream(response.stream, semaphore.release)
+        return response
+    
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client used for all asynchronous LLM traffic.
+    
+    Returns:
+        An httpx.AsyncClient configured from the pool settings
+    """
+    http2 = settings.LLM_HTTP2 and HTTP2_AVAILABLE
+    limits = httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+    transport = HostLimitedTransport(
+        httpx.AsyncHTTPTransport(http2=http2, limits=limits),
+        max_per_host=settings.LLM_POOL_MAX_PER_HOST,
+    )
+    
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(
+            settings.LLM_REQUEST_TIMEOUT,
+            connect=settings.LLM_CONNECT_TIMEOUT,
+        ),
+    )
+
+def usage_from_response(response: Any) -> Optional[Dict[str, Any]]:
+    """
+    Read token usage, including prompt tokens served from the provider's prefix cache.
+    
+    OpenAI reports cached tokens in usage.prompt_tokens_details.cached_tokens
+    and DeepSeek in usage.prompt_cache_hit_tokens; cached_tokens is None when
+    the provider reports neither.
+    
+    Args:
+        response: A chat completion response
+    
+    Returns:
+        Prompt, completion and cached token counts, or None without usage
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached is None:
+        cached = (getattr(usage, "model_extra", None) or {}).get("prompt_cache_hit_tokens")
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "cached_tokens": cached,
+    }
+
+async def iter_completion_deltas(client: AsyncOpenAI, **create_kwargs: Any) -> AsyncIterator[str]:
+    """
+    Stream a chat completion and yield its content deltas as they arrive.
+    
+    Args:
+        client: The provider client to use
+        **create_kwargs: Arguments for chat.completions.create
+    
+    Yields:
+        Non-empty text deltas
+    """
+    stream = await client.chat.completions.create(stream=True, **create_kwargs)
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        # Release the connection even if the consumer stopped early
+        await stream.close()
+
+class HedgePolicy:
+    """
+    Races a backup call against calls that run past a latency percentile.
+    
+    Latencies are kept per kind of call (e.g. full completions and time to
+    first token), since each has its own distribution. A call still running
+    at the deadline gets a backup; whichever finishes first successfully wins
+    and the other is cancelled. Hedges are capped at a fraction of all calls,
+    so a provider-wide slowdown cannot multiply the load on it.
+    """
+    
+    def __init__(
+        self,
+        enabled: bool = settings.LLM_HEDGE_ENABLED,
+        percentile: float = settings.LLM_HEDGE_PERCENTILE,
+        budget: float = settings.LLM_HEDGE_BUDGET,
+        min_samples: int = settings.LLM_HEDGE_MIN_SAMPLES,
+    ):
+        """
+        Initialize the policy.
+        
+        Args:
+            enabled: Whether calls are hedged at all
+            percentile: Latency percentile after which a backup is sent, e.g. 0.95
+            budget: Most backups as a fraction of all calls
+            min_samples: Latencies needed per kind before its calls are hedged
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+        self._latencies: Dict[str, LatencyHistogram] = {}
+    
+    def _histogram(self, kind: str) -> LatencyHistogram:
+        """Get the latency histogram of a kind of call, creating it on first use."""
+        histogram = self._latencies.get(kind)
+        if histogram is None:
+            histogram = self._latencies[kind] = LatencyHistogram(HEDGE_LATENCY_BUCKETS_MS)
+        return histogram
+    
+    def deadline(self, kind: str) -> Optional[float]:
+        """
+        Get the seconds after which a call of a kind is hedged.
+        
+        Args:
+            kind: The kind of call
+        
+        Returns:
+            The deadline, or None until enough latencies have been seen
+        """
+        histogram = self._histogram(kind)
+        if histogram.count < self.min_samples:
+            return None
+        return histogram.percentile(self.percentile) / 1000
+    
+    async def _timed(self, kind: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a call and record its latency.
+        
+        Calls cancelled as the loser of a race are recorded too, at the time
+        they were cut off, so slow calls keep counting towards the tail.
+        """
+        started = time.perf_counter()
+        try:
+            return await call()
+        finally:
+            self._histogram(kind).observe((time.perf_counter() - started) * 1000)
+    
+    async def run(
+        self,
+        kind: str,
+        primary: Callable[[], Awaitable[T]],
+        backup: Callable[[], Awaitable[T]],
+        discard: Optional[Callable[[T], Awaitable[Any]]] = None,
+    ) -> T:
+        """
+        Run a call, racing a backup against it once it passes the deadline.
+        
+        Args:
+            kind: The kind of call, for the latency percentile
+            primary: Coroutine function making the call
+            backup: Coroutine function making the backup call (the same call,
+                or the same request to another provider)
+            discard: Coroutine function releasing the result of a call that
+                finished but lost (e.g. closing a stream)
+        
+        Returns:
+            The result of the first call to succeed
+        
+        Raises:
+            Exception: The primary call's error if no call succeeded
+        """
+        if not self.enabled:
+            return await primary()
+        
+        self.calls += 1
+        deadline = self.deadline(kind)
+        first = asyncio.ensure_future(self._timed(kind, primary))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=deadline)
+            if done:
+                return first.result()
+            if self.hedges >= self.budget * self.calls:
+                self.budget_exhausted += 1
+                return await first
+            
+            self.hedges += 1
+            tasks.append(asyncio.ensure_future(self._timed(kind, backup)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in tasks if task in done and task.exception() is None]
+                if winners:
+                    if winners[0] is not first:
+                        self.hedge_wins += 1
+                    if discard is not None:
+                        for task in winners[1:]:
+                            await discard(task.result())
+                    return winners[0].result()
+            return first.result()
+        finally:
+            await self._cancel([task for task in tasks if not task.done()], discard)
+    
+    @staticmethod
+    async def _cancel(tasks: List["asyncio.Future[T]"], discard: Optional[Callable[[T], Awaitable[Any]]]) -> None:
+        """Cancel losing calls, releasing any result that arrived before the cancellation."""
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if discard is not None:
+            for result in results:
+                if not isinstance(result, BaseException):
+                    await discard(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hedge counts, the hedge win rate and the current deadline per kind."""
+        deadlines = {kind: self.deadline(kind) for kind in self._latencies}
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": self.hedges / self.calls if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0,
+            "budget_exhausted": self.budget_exhausted,
+            "deadline_ms": {
+                kind: deadline * 1000 if deadline is not None else None
+                for kind, deadline in deadlines.items()
+            },
+        }
+
+class AsyncLLMClient:
+    """Asynchronous service for interacting with large language models."""
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        hedging: Optional[HedgePolicy] = None,
+    ):
+        """
+        Initialize the async LLM client on top of a pooled HTTP client.
+        
+        Args:
+            api_key: API key for the provider (defaults to OPENAI_API_KEY)
+            base_url: Base URL of the provider (defaults to PERPLEXITY_BASE_URL)
+            http_client: Shared HTTP client; a new pool is created if omitted
+            hedging: Hedge policy for completions (defaults to the global one)
+        """
+        self.http_client = http_client or create_http_client()
+        self.hedging = hedging or hedge_policy
+        self.client = AsyncOpenAI(
+            api_key=api_key or settings.OPENAI_API_KEY,
+            base_url=base_url or settings.PERPLEXITY_BASE_URL,
+            http_client=self.http_client,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+    
+    async def agenerate_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate a chat completion from the model without blocking the event loop.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: The model to use for completion
+            temperature: The temperature for sampling
+            max_tokens: The maximum number of tokens to generate
+            response_format: Provider JSON mode request (e.g. {"type": "json_object"})
+        
+        Returns:
+            The model response
+        """
+        try:
+            extra = {"response_format": response_format} if response_format is not None else {}
+            
+            def create():
+                return self.client.chat.completions.create(
+                    model=model or settings.DEFAULT_MODEL,
+                    messages=messages,
+                    temperature=temperature if temperature is not None else settings.DEFAULT_TEMPERATURE,
+                    max_tokens=max_tokens or settings.DEFAULT_MAX_TOKENS,
+                    **extra,
+                )
+            
+            # A slow call is raced by the same request when hedging is enabled
+            response = await self.hedging.run("completion", create, create)
+            
+            return {
+                "success": True,
+                "content": response.choices[0].message.content,
+                "model": response.model,
+                "metadata": {
+                    "finish_reason": response.choices[0].finish_reason,
+                    "model": response.model,
+                    "usage": usage_from_response(response),
+                }
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "error_type": str(type(e).__name__),
+            }
+    
+    def astream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion from the model.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: The model to use for completion
+            temperature: The temperature for sampling
+            max_tokens: The maximum number of tokens to generate
+        
+        Returns:
+            An async iterator of text deltas; provider errors are raised
+        """
+        return iter_completion_deltas(
+            self.client,
+            model=model or settings.DEFAULT_MODEL,
+            messages=messages,
+            temperature=temperature if temperature is not None else settings.DEFAULT_TEMPERATURE,
+            max_tokens=max_tokens or settings.DEFAULT_MAX_TOKENS,
+        )
+    
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self.http_client.aclose()
+
 # Create a global client instance
-llm_client = LLMClient() 
\ No newline at end of file
+llm_client = LLMClient() 
+
+# Create the global hedge policy; its budget covers every hedged call
+hedge_policy = HedgePolicy()
+
+# Create a global async client instance sharing one connection pool
+async_llm_client = AsyncLLMClient()
+
+# Provider prefix cache usage per role, recorded by callers that know the role
+prefix_cache_stats = PrefixCacheStats()
\ No newline at end of file
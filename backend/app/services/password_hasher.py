@@ -0,0 +1,117 @@
+"""
+Bounded worker pool for bcrypt password hashing and verification.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from passlib.context import CryptContext
+
+from ..core.config import settings
+from ..utils.metrics import LatencyHistogram
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password pool is saturated and the request is shed."""
+
+class PasswordHasher:
+    """
+    Runs bcrypt work in a dedicated thread pool.
+    
+    bcrypt releases the GIL, so hashing in threads keeps the event loop free
+    and still uses several cores. At most max_workers operations run at once
+    and max_queue more may wait; anything beyond that is rejected right away
+    instead of piling up behind a login storm.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_queue: int = settings.PASSWORD_HASH_MAX_QUEUE,
+        context: Optional[CryptContext] = None,
+    ):
+        """
+        Initialize the pool.
+        
+        Args:
+            max_workers: Threads doing password work
+            max_queue: Operations allowed to wait for a free thread
+            context: Passlib context to use (defaults to bcrypt)
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.context = context or CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password")
+        self._pending = 0
+        self.rejected = 0
+        self.latency = {"hash": LatencyHistogram(), "verify": LatencyHistogram()}
+        self.queue_wait = LatencyHistogram()
+    
+    async def _run(self, operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn in the pool, shedding the call if the pool is saturated."""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy(f"Password {operation} pool is saturated")
+        
+        submitted = time.perf_counter()
+        
+        def timed() -> Any:
+            started = time.perf_counter()
+            self.queue_wait.observe((started - submitted) * 1000)
+            return fn(*args)
+        
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+            self.latency[operation].observe((time.perf_counter() - submitted) * 1000)
+    
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password.
+        
+        Args:
+            password: The plain password
+        
+        Returns:
+            The bcrypt hash
+        
+        Raises:
+            PasswordHasherBusy: If the pool is saturated
+        """
+        return await self._run("hash", self.context.hash, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash.
+        
+        Args:
+            plain_password: The plain password
+            hashed_password: The stored hash
+        
+        Returns:
+            True if the password matches
+        
+        Raises:
+            PasswordHasherBusy: If the pool is saturated
+        """
+        return await self._run("verify", self.context.verify, plain_password, hashed_password)
+    
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get pool occupancy, shed count and latency histograms."""
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "queue_wait": self.queue_wait.snapshot(),
+            "latency": {operation: histogram.snapshot() for operation, histogram in self.latency.items()},
+        }
+
+# Create the global password hasher instance
+password_hasher = PasswordHasher()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Async DAG executor for multi-stage prompt processing.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+class Stage:
+    """One unit of pipeline work and the stages whose results it needs."""
+    
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Awaitable[Any]],
+        depends_on: Iterable[str] = (),
+        when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ):
+        """
+        Initialize the stage.
+        
+        Args:
+            name: Unique stage name
+            run: Coroutine function called with {dependency name: result}
+            depends_on: Names of stages that must finish first
+            when: Optional predicate over the dependency results; the stage is
+                skipped (its result is None) when it returns False
+        """
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.when = when
+
+class PipelineResult:
+    """Results, errors and timings of one pipeline run."""
+    
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.total_ms = 0.0
+    
+    def ran(self, name: str) -> bool:
+        """Check whether a stage ran to completion."""
+        return self.timings.get(name, {}).get("status") == "ok"
+    
+    def metadata(self) -> Dict[str, Any]:
+        """Get the per-stage timings for response metadata."""
+        return {
+            "stages": self.timings,
+            "total_ms": round(self.total_ms, 2),
+        }
+
+class Pipeline:
+    """
+    Runs stages as soon as their dependencies finish.
+    
+    Stages without a path between them run concurrently. A stage that raises
+    is recorded as an error and every stage depending on it is skipped; other
+    branches keep running.
+    """
+    
+    def __init__(self, stages: List[Stage]):
+        """
+        Initialize and validate the pipeline.
+        
+        Args:
+            stages: Stages in any order
+        
+        Raises:
+            ValueError: On duplicate names, unknown dependencies or cycles
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names")
+        for stage in stages:
+            unknown = [name for name in stage.depends_on if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(unknown)}")
+        self.order = self._topological_order()
+    
+    def _topological_order(self) -> List[str]:
+        """Order stages so each comes after its dependencies."""
+        order: List[str] = []
+        state: Dict[str, str] = {}
+        
+        def visit(name: str) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Pipeline has a cycle through {name}")
+            state[name] = "visiting"
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            state[name] = "done"
+            order.append(name)
+        
+        for name in self.stages:
+            visit(name)
+        return order
+    
+    async def run(self) -> PipelineResult:
+        """
+        Run every stage.
+        
+        Returns:
+            The stage results, errors and timings
+        """
+        result = PipelineResult()
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        
+        async def run_stage(stage: Stage) -> None:
+            if stage.depends_on:
+                await asyncio.wait([tasks[name] for name in stage.depends_on])
+            
+            offset_ms = (time.perf_counter() - started) * 1000
+            failed = [name for name in stage.depends_on if result.timings[name]["status"] != "ok"]
+            inputs = {name: result.results.get(name) for name in stage.depends_on}
+            if failed or (stage.when is not None and not stage.when(inputs)):
+                result.results[stage.name] = None
+                result.timings[stage.name] = {"status": "skipped", "start_ms": round(offset_ms, 2), "duration_ms": 0.0}
+                return
+            
+            status = "ok"
+            try:
+                result.results[stage.name] = await stage.run(inputs)
+            except Exception as e:
+                status = "error"
+                result.results[stage.name] = None
+                result.errors[stage.name] = e
+            result.timings[stage.name] = {
+                "status": status,
+                "start_ms": round(offset_ms, 2),
+                "duration_ms": round((time.perf_counter() - started) * 1000 - offset_ms, 2),
+            }
+        
+        for name in self.order:
+            tasks[name] = asyncio.create_task(run_stage(self.stages[name]))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        
+        result.timings = {name: result.timings[name] for name in self.order}
+        result.total_ms = (time.perf_counter() - started) * 1000
+        return result
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Minimal async PostgREST client built on a pooled httpx client.
+"""
+from typing import Any, Dict, List, Optional, Union
+import httpx
+
+from ..core.config import settings
+
+class PostgrestError(Exception):
+    """Raised when PostgREST returns an error response or cannot be reached."""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        """
+        Initialize the error.
+        
+        Args:
+            message: Error message from PostgREST or the transport
+            status_code: HTTP status code, if a response was received
+        """
+        super().__init__(message)
+        self.status_code = status_code
+
+def create_postgrest_http_client(
+    base_url: str,
+    api_key: str,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client used for all database calls.
+    
+    Args:
+        base_url: PostgREST base URL (e.g. https://<project>.supabase.co/rest/v1)
+        api_key: Supabase API key sent as apikey and bearer token
+        transport: Optional transport override (used in tests)
+    
+    Returns:
+        A configured httpx.AsyncClient
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers={
+            "apikey": api_key,
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "application/json",
+        },
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT),
+        transport=transport,
+    )
+
+class AsyncPostgrestClient:
+    """
+    Async PostgREST client exposing the table operations the services use.
+    
+    Every call shares one connection pool and is bounded by the configured
+    timeouts, so database I/O overlaps with LLM I/O instead of blocking the
+    event loop.
+    """
+    
+    def __init__(self, http_client: httpx.AsyncClient):
+        """
+        Initialize the client.
+        
+        Args:
+            http_client: Pooled client from create_postgrest_http_client
+        """
+        self.http_client = http_client
+    
+    async def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+        """Send a request and decode the JSON body, raising PostgrestError on failure."""
+        try:
+            response = await self.http_client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            raise PostgrestError(f"{type(e).__name__}: {e}") from e
+        
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise PostgrestError(message, status_code=response.status_code)
+        
+        return response.json() if response.content else None
+    
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        eq: Optional[Dict[str, Any]] = None,
+        filters: Optional[Dict[str, str]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Select rows from a table.
+        
+        Args:
+            table: Table name
+            columns: Columns to return
+            eq: Equality filters by column
+            filters: Raw PostgREST filters by parameter, e.g. {"or": "(a.lt.1,b.eq.2)"}
+            order: Column, or comma-separated columns, to order by
+            desc: Whether to order descending (applies to every order column)
+            limit: Maximum number of rows
+            timeout: Per-call timeout in seconds (defaults to the pool timeout)
+        
+        Returns:
+            The matching rows
+        """
+        params: Dict[str, Union[str, int]] = {"select": columns}
+        for column, value in (eq or {}).items():
+            params[column] = f"eq.{value}"
+        params.update(filters or {})
+        if order:
+            direction = "desc" if desc else "asc"
+            params["order"] = ",".join(f"{column.strip()}.{direction}" for column in order.split(","))
+        if limit is not None:
+            params["limit"] = limit
+        
+        kwargs: Dict[str, Any] = {"params": params}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return await self._request("GET", f"/{table}", **kwargs) or []
+    
+    async def insert(
+        self,
+        table: str,
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+        returning: bool = True,
+        timeout: Optional[float] = None,
+        ignore_duplicates_on: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert one or more rows.
+        
+        Args:
+            table: Table name
+            rows: A row or list of rows
+            returning: Whether to return the inserted rows
+            timeout: Per-call timeout in seconds (defaults to the pool timeout)
+            ignore_duplicates_on: Unique column(s); rows that conflict on them
+                are skipped instead of failing the whole insert
+        
+        Returns:
+            The inserted rows (empty when returning is False)
+        """
+        prefer = ["return=representation" if returning else "return=minimal"]
+        kwargs: Dict[str, Any] = {"json": rows}
+        if ignore_duplicates_on is not None:
+            prefer.append("resolution=ignore-duplicates")
+            kwargs["params"] = {"on_conflict": ignore_duplicates_on}
+        kwargs["headers"] = {"Prefer": ",".join(prefer)}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return await self._request("POST", f"/{table}", **kwargs) or []
+    
+    async def rpc(
+        self,
+        function: str,
+        params: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Call a database function.
+        
+        Args:
+            function: Function name
+            params: Named arguments
+            timeout: Per-call timeout in seconds (defaults to the pool timeout)
+        
+        Returns:
+            The decoded result
+        """
+        kwargs: Dict[str, Any] = {"json": params}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return await self._request("POST", f"/rpc/{function}", **kwargs)
+    
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        await self.http_client.aclose()
\ No newline at end of file
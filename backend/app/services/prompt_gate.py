@@ -0,0 +1,90 @@
+"""
+Early-exit gates that let well-formed prompts skip multi-agent stages.
+"""
+import re
+from typing import Any, Dict, Optional
+
+# Words that state requirements or limits on the answer
+CONSTRAINT_PATTERN = re.compile(
+    r"\b(?:must|should|shall|required?|at (?:least|most)|no more than|exactly|only|avoid|"
+    r"without|limit(?:ed)?|maximum|minimum|within|format|include|exclude|constraints?)\b",
+    re.IGNORECASE
+)
+# Words that give the model context about the goal or audience
+CONTEXT_PATTERN = re.compile(
+    r"\b(?:using|for|because|so that|audience|goal|context|given|assume|based on|target)\b",
+    re.IGNORECASE
+)
+# Lists, headings and labeled sections
+STRUCTURE_PATTERN = re.compile(r"(?m)^\s*(?:[-*•]|\d+[.)]|#+|[A-Z][\w ]{1,30}:)\s")
+NUMBER_PATTERN = re.compile(r"\d")
+
+# Critic ratings that must all clear the threshold for refinement to be skipped
+CRITIC_GATE_ASPECTS = ("clarity", "technical_accuracy", "completeness")
+
+def assess_prompt(prompt: str) -> Dict[str, Any]:
+    """
+    Score how ready a prompt is to use as-is, without calling a model.
+    
+    The score adds up cheap signals: enough length to carry detail, visible
+    structure, explicit constraints, stated context, and concrete numbers.
+    Very long prompts get no length credit since they often need tightening.
+    
+    Args:
+        prompt: The prompt to assess
+    
+    Returns:
+        The score in [0, 1] and the signals behind it
+    """
+    words = len(prompt.split())
+    constraints = len(CONSTRAINT_PATTERN.findall(prompt))
+    signals = {
+        "words": words,
+        "structured": bool(STRUCTURE_PATTERN.search(prompt)),
+        "constraints": constraints,
+        "context": bool(CONTEXT_PATTERN.search(prompt)),
+        "numbers": bool(NUMBER_PATTERN.search(prompt)),
+    }
+    
+    score = 0.0
+    if 40 <= words <= 400:
+        score += 0.3
+    elif 20 <= words < 40:
+        score += 0.15
+    if signals["structured"]:
+        score += 0.2
+    score += min(constraints, 3) * 0.1
+    if signals["context"]:
+        score += 0.1
+    if signals["numbers"]:
+        score += 0.1
+    return {"score": round(min(score, 1.0), 2), "signals": signals}
+
+def critic_scores(critic_result: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """
+    Get the critic's gate ratings.
+    
+    Args:
+        critic_result: A successful critic agent result
+    
+    Returns:
+        The rating per gate aspect, or None when the critic did not rate them
+    """
+    analysis = critic_result.get("metadata", {}).get("analysis", {})
+    if not all(aspect in analysis for aspect in CRITIC_GATE_ASPECTS):
+        return None
+    return {aspect: float(analysis[aspect]) for aspect in CRITIC_GATE_ASPECTS}
+
+def critic_approves(critic_result: Dict[str, Any], threshold: float) -> bool:
+    """
+    Check whether the critic rated a prompt good enough to skip refinement.
+    
+    Args:
+        critic_result: A successful critic agent result
+        threshold: Minimum rating every gate aspect must reach
+    
+    Returns:
+        True if every gate aspect is rated at or above the threshold
+    """
+    scores = critic_scores(critic_result)
+    return scores is not None and min(scores.values()) >= threshold
\ No newline at end of file
@@ -1,10 +1,32 @@
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 import uuid
 import asyncio
 from ..models.api_models import AgentMessage
-from .agents import CriticAgent, RefinerAgent, EvaluatorAgent
-from .llm_client import llm_client
+from .agents import agent_pool
+from .llm_client import async_llm_client, prefix_cache_stats
+from .response_cache import response_cache, make_cache_key, normalize_prompt
+from .semantic_cache import semantic_cache
+from .retrieval import few_shot_retriever, format_example_answer, format_examples
+from .pipeline import Pipeline, Stage
+from .prompt_gate import assess_prompt, critic_approves, critic_scores
 from ..core.config import settings
+from ..core.agent_config import ROLE_CONFIGS, AGENT_CONFIGS
+from ..core.prompt_templates import DIRECT, PromptTemplate, prompt_templates
+from ..utils.streaming import stream_enhancement_events
+from ..utils.singleflight import SingleFlight
+
+class AgentStageError(Exception):
+    """Raised inside a pipeline stage when its agent reports a failure."""
+    
+    def __init__(self, result: Dict[str, Any]):
+        """
+        Initialize the error.
+        
+        Args:
+            result: The failed agent result
+        """
+        super().__init__(result.get("error", "Unknown agent error"))
+        self.result = result
 
 class PromptProcessorService:
     """
@@ -12,34 +34,291 @@ class PromptProcessorService:
     Coordinates the three agents: Critic, Refiner, and Evaluator.
     """
     
+    def __init__(self, refine_concurrency: int = settings.AGENT_REFINE_CONCURRENCY):
+        """
+        Initialize the request coalescing table and the refinement budget.
+        
+        Args:
+            refine_concurrency: Extra best-of-N candidates allowed in flight process-wide
+        """
+        self._flights = SingleFlight()
+        self.refine_concurrency = refine_concurrency
+        self._extra_candidates_in_flight = 0
+        self.candidates_requested = 0
+        self.candidates_granted = 0
+        self.early_exits = {"pregate": 0, "critic": 0}
+        self.early_exit_stages_skipped = 0
+    
     async def process_with_agents(
         self, 
         prompt: str, 
         role: str,
         session_id: str,
+        candidates: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Process a prompt through the multi-agent system.
+        Duplicate requests from the same session that arrive while one is
+        in flight share its result.
         
         Args:
             prompt: The prompt to process
             role: The role context for the prompt
             session_id: Unique session identifier
+            candidates: Refinement candidates to generate and compare (defaults to
+                settings.AGENT_REFINE_CANDIDATES, capped by AGENT_REFINE_MAX_CANDIDATES)
             
         Returns:
             A dictionary with the processing results
         """
+        candidates = max(1, min(candidates or settings.AGENT_REFINE_CANDIDATES, settings.AGENT_REFINE_MAX_CANDIDATES))
+        flight_key = ("agents", session_id, role, normalize_prompt(prompt), candidates)
+        return await self._flights.do(
+            flight_key,
+            lambda: self._run_agents(prompt, role, session_id, candidates)
+        )
+    
+    async def _run_agent(
+        self,
+        agent_type: str,
+        role: str,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        temperature: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Check out a pooled agent and process one prompt with it."""
+        async with agent_pool.acquire(agent_type, role) as agent:
+            if temperature is None:
+                return await agent.process(prompt, context)
+            return await agent.process(prompt, context, temperature=temperature)
+    
+    def _reserve_candidates(self, wanted: int) -> int:
+        """
+        Reserve slots for extra best-of-N candidates without waiting.
+        
+        The first candidate is always allowed; extra candidates only get the
+        slots that are free, so a busy server degrades to fewer candidates
+        rather than queueing.
+        
+        Args:
+            wanted: Total candidates requested
+        
+        Returns:
+            Total candidates granted (at least 1)
+        """
+        extra = min(wanted - 1, max(0, self.refine_concurrency - self._extra_candidates_in_flight))
+        self._extra_candidates_in_flight += extra
+        self.candidates_requested += wanted
+        self.candidates_granted += extra + 1
+        return extra + 1
+    
+    def _release_candidates(self, granted: int) -> None:
+        """Release the slots taken by _reserve_candidates."""
+        self._extra_candidates_in_flight -= granted - 1
+    
+    async def _refine_candidates(
+        self,
+        role: str,
+        prompt: str,
+        context: Dict[str, Any],
+        wanted: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate refinement candidates concurrently at increasing temperatures.
+        
+        Args:
+            role: The role context for the prompt
+            prompt: The prompt to refine
+            context: Refiner context (critic feedback, examples)
+            wanted: Candidates requested
+        
+        Returns:
+            The successful refiner results
+        
+        Raises:
+            AgentStageError: If every candidate failed
+        """
+        granted = self._reserve_candidates(wanted)
+        try:
+            base_temperature = AGENT_CONFIGS["refiner"].get("temperature", 0.7)
+            results = await asyncio.gather(*[
+                self._run_agent(
+                    "refiner", role, prompt, context,
+                    temperature=min(1.0, base_temperature + i * settings.AGENT_REFINE_TEMPERATURE_STEP)
+                )
+                for i in range(granted)
+            ])
+        finally:
+            self._release_candidates(granted)
+        
+        successes = [result for result in results if result["success"]]
+        if not successes:
+            raise AgentStageError(results[0])
+        return successes
+    
+    async def _evaluate_candidates(
+        self,
+        role: str,
+        candidates: List[Dict[str, Any]],
+        context: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Score every candidate in one evaluator call."""
+        async with agent_pool.acquire("evaluator", role) as evaluator:
+            return await evaluator.evaluate_candidates([candidate["message"] for candidate in candidates], context)
+    
+    def _agent_pipeline(
+        self,
+        prompt: str,
+        role: str,
+        candidates: int = 1,
+        skip_critic: bool = False,
+    ) -> Pipeline:
+        """
+        Build the stage graph for one multi-agent request.
+        
+        The refiner needs the critic's feedback and the evaluator needs the
+        refinement, so those run in order; a speculative draft refinement (when
+        enabled) has no dependency on the critic and runs alongside it, and its
+        evaluation runs alongside the main evaluation.
+        
+        With more than one candidate, the refine stage becomes a concurrent
+        fan-out of refinements scored by a single batched evaluator call, and
+        the highest-scoring refinement is kept.
+        
+        With early exit enabled, every stage after the critic is skipped when
+        the critic rates the prompt highly enough, and skip_critic (set when
+        the local pre-gate passed) skips every stage.
+        
+        Args:
+            prompt: The prompt to process
+            role: The role context for the prompt
+            candidates: Refinement candidates to compare
+            skip_critic: Skip the whole pipeline
+        
+        Returns:
+            The pipeline to run
+        """
+        examples = few_shot_retriever.retrieve(prompt, role) if few_shot_retriever is not None else []
+        reference_examples = format_examples(examples) if examples else None
+        
+        async def critic(_: Dict[str, Any]) -> Dict[str, Any]:
+            return self._require(await self._run_agent("critic", role, prompt))
+        
+        async def refine(inputs: Dict[str, Any]) -> Dict[str, Any]:
+            context = {"critic_feedback": inputs["critic"]["message"]}
+            if reference_examples:
+                context["reference_examples"] = reference_examples
+            return self._require(await self._run_agent("refiner", role, prompt, context))
+        
+        async def draft(_: Dict[str, Any]) -> Dict[str, Any]:
+            context = {"reference_examples": reference_examples} if reference_examples else None
+            return self._require(await self._run_agent("refiner", role, prompt, context))
+        
+        def evaluate(candidate: str):
+            async def run(inputs: Dict[str, Any]) -> Dict[str, Any]:
+                # Evaluation failures are reported, not fatal
+                return await self._run_agent("evaluator", role, inputs[candidate]["message"], {
+                    "original_prompt": prompt,
+                    "critic_feedback": inputs["critic"]["message"],
+                })
+            return run
+        
+        async def refine_candidates(inputs: Dict[str, Any]) -> List[Dict[str, Any]]:
+            context = {"critic_feedback": inputs["critic"]["message"]}
+            if reference_examples:
+                context["reference_examples"] = reference_examples
+            return await self._refine_candidates(role, prompt, context, candidates)
+        
+        async def evaluate_candidates(inputs: Dict[str, Any]) -> Dict[str, Any]:
+            context = {"original_prompt": prompt, "critic_feedback": inputs["critic"]["message"]}
+            if len(inputs["refine_candidates"]) == 1:
+                return await self._run_agent("evaluator", role, inputs["refine_candidates"][0]["message"], context)
+            return await self._evaluate_candidates(role, inputs["refine_candidates"], context)
+        
+        async def select(inputs: Dict[str, Any]) -> Dict[str, Any]:
+            evaluation = inputs["evaluate"]
+            index = evaluation["metadata"].get("analysis", {}).get("selected_index", 0) if evaluation["success"] else 0
+            return inputs["refine_candidates"][index]
+        
+        def needed(_: Dict[str, Any]) -> bool:
+            return not skip_critic
+        
+        def critic_rejects(inputs: Dict[str, Any]) -> bool:
+            return not (
+                settings.AGENT_EARLY_EXIT
+                and critic_approves(inputs["critic"], settings.AGENT_CRITIC_EXIT_THRESHOLD)
+            )
+        
+        if candidates > 1:
+            stages = [
+                Stage("critic", critic, when=needed),
+                Stage("refine_candidates", refine_candidates, depends_on=["critic"], when=critic_rejects),
+                Stage("evaluate", evaluate_candidates, depends_on=["critic", "refine_candidates"]),
+                Stage("refine", select, depends_on=["refine_candidates", "evaluate"]),
+            ]
+        else:
+            stages = [
+                Stage("critic", critic, when=needed),
+                Stage("refine", refine, depends_on=["critic"], when=critic_rejects),
+                Stage("evaluate", evaluate("refine"), depends_on=["critic", "refine"]),
+            ]
+        if settings.AGENT_SPECULATIVE_DRAFT:
+            stages += [
+                Stage("draft", draft, when=needed),
+                Stage("evaluate_draft", evaluate("draft"), depends_on=["critic", "draft"], when=critic_rejects),
+            ]
+        return Pipeline(stages)
+    
+    @staticmethod
+    def _require(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Raise AgentStageError for a failed agent result so dependent stages are skipped."""
+        if not result["success"]:
+            raise AgentStageError(result)
+        return result
+    
+    @staticmethod
+    def _quality(evaluation: Optional[Dict[str, Any]]) -> float:
+        """Get the evaluator's quality score, or -1 when evaluation failed."""
+        if not evaluation or not evaluation["success"]:
+            return -1.0
+        return evaluation["metadata"]["confidence"]
+    
+    async def _run_agents(
+        self,
+        prompt: str,
+        role: str,
+        session_id: str,
+        candidates: int = 1,
+    ) -> Dict[str, Any]:
+        """Run the critic, refiner and evaluator pipeline for one request."""
         try:
             messages = []
             
             # Create a unique correlation ID for this request
             correlation_id = f"{session_id}-{uuid.uuid4()}"
             
-            # Step 1: Create and run critic agent
-            critic_agent = CriticAgent(role)
-            critic_result = await critic_agent.process(prompt)
+            gate = assess_prompt(prompt) if settings.AGENT_EARLY_EXIT else None
+            skip_critic = gate is not None and gate["score"] >= settings.AGENT_PREGATE_THRESHOLD
+            
+            run = await self._agent_pipeline(prompt, role, candidates, skip_critic).run()
+            metadata = {"pipeline": run.metadata()}
+            if gate is not None:
+                metadata["pregate"] = gate
+            if run.ran("refine_candidates"):
+                metadata["candidates"] = len(run.results["refine_candidates"])
+                if run.results["evaluate"]["success"]:
+                    metadata["candidate_scores"] = run.results["evaluate"]["metadata"].get("analysis", {}).get("candidate_scores")
+            
+            # Unexpected exceptions are handled like before the pipeline existed
+            for error in run.errors.values():
+                if not isinstance(error, AgentStageError):
+                    raise error
+            
+            if skip_critic:
+                return self._early_exit("pregate", prompt, [], run, metadata)
             
-            if not critic_result["success"]:
+            if "critic" in run.errors:
+                critic_result = run.errors["critic"].result
                 return {
                     "success": False,
                     "messages": [{
@@ -53,8 +332,11 @@ class PromptProcessorService:
                     }],
                     "final_prompt": prompt,
                     "error": critic_result.get("error", "Unknown error in critic agent"),
+                    "metadata": metadata,
                 }
             
+            critic_result = run.results["critic"]
+            
             # Add critic message
             messages.append(AgentMessage(
                 type="critique",
@@ -67,14 +349,24 @@ class PromptProcessorService:
                 }
             ))
             
-            # Step 2: Create and run refiner agent with critic feedback
-            refiner_agent = RefinerAgent(role)
-            refiner_result = await refiner_agent.process(
-                prompt,
-                {"critic_feedback": critic_result["message"]}
-            )
+            if settings.AGENT_EARLY_EXIT:
+                metadata["critic_scores"] = critic_scores(critic_result)
+                if critic_approves(critic_result, settings.AGENT_CRITIC_EXIT_THRESHOLD):
+                    return self._early_exit("critic", prompt, messages, run, metadata)
             
-            if not refiner_result["success"]:
+            # Keep the speculative draft only if the evaluator preferred it
+            candidate = "refine"
+            if run.ran("evaluate_draft") and (
+                not run.ran("refine")
+                or self._quality(run.results["evaluate_draft"]) > self._quality(run.results["evaluate"])
+            ):
+                candidate = "draft"
+            evaluation_stage = "evaluate" if candidate == "refine" else "evaluate_draft"
+            metadata["selected_candidate"] = candidate
+            
+            refine_error = run.errors.get("refine") or run.errors.get("refine_candidates")
+            if candidate == "refine" and refine_error is not None:
+                refiner_result = refine_error.result
                 return {
                     "success": False,
                     "messages": messages + [{
@@ -88,8 +380,11 @@ class PromptProcessorService:
                     }],
                     "final_prompt": prompt,
                     "error": refiner_result.get("error", "Unknown error in refiner agent"),
+                    "metadata": metadata,
                 }
             
+            refiner_result = run.results[candidate]
+            
             # Add refiner message
             messages.append(AgentMessage(
                 type="refinement",
@@ -105,16 +400,7 @@ class PromptProcessorService:
             
             # The refined prompt is the message from the refiner
             refined_prompt = refiner_result["message"]
-            
-            # Step 3: Create and run evaluator agent with original and refined prompts
-            evaluator_agent = EvaluatorAgent(role)
-            evaluator_result = await evaluator_agent.process(
-                refined_prompt,
-                {
-                    "original_prompt": prompt,
-                    "critic_feedback": critic_result["message"],
-                }
-            )
+            evaluator_result = run.results[evaluation_stage]
             
             # Add evaluator message
             messages.append(AgentMessage(
@@ -129,16 +415,12 @@ class PromptProcessorService:
                 }
             ))
             
-            # Clean up agents
-            critic_agent.terminate()
-            refiner_agent.terminate()
-            evaluator_agent.terminate()
-            
             return {
                 "success": True,
                 "messages": messages,
                 "final_prompt": refined_prompt,
                 "error": None,
+                "metadata": metadata,
             }
             
         except Exception as e:
@@ -156,11 +438,79 @@ class PromptProcessorService:
                 "error": str(e),
             }
     
+    def _early_exit(
+        self,
+        gate: str,
+        prompt: str,
+        messages: List[Any],
+        run: Any,
+        metadata: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Build the response for a prompt a gate judged good enough as-is.
+        
+        Args:
+            gate: The gate that passed, "pregate" or "critic"
+            prompt: The original prompt, returned unchanged
+            messages: Agent messages produced before the exit
+            run: The pipeline run
+            metadata: Response metadata collected so far
+        
+        Returns:
+            A successful result whose final prompt is the original prompt
+        """
+        skipped = sum(1 for timing in run.timings.values() if timing["status"] == "skipped")
+        self.early_exits[gate] += 1
+        self.early_exit_stages_skipped += skipped
+        metadata["early_exit"] = gate
+        return {
+            "success": True,
+            "messages": messages,
+            "final_prompt": prompt,
+            "error": None,
+            "metadata": metadata,
+        }
+    
+    def _build_direct_messages(
+        self,
+        prompt: str,
+        role: str,
+        template: Optional[PromptTemplate] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Build the system and user messages for direct enhancement.
+        
+        Args:
+            prompt: The prompt to process
+            role: A valid role context for the prompt
+            template: The compiled system prompt (looked up when not given)
+        
+        Returns:
+            The chat messages to send to the LLM
+        """
+        template = template or prompt_templates.get(DIRECT, role)
+        messages = [{"role": "system", "content": template.system_message}]
+        
+        # Show the model curated enhancements of similar prompts as prior turns
+        examples = few_shot_retriever.retrieve(prompt, role) if few_shot_retriever is not None else []
+        for example in examples:
+            messages.append({
+                "role": "user",
+                "content": f"Original prompt: {example['original']}\nRole context: I am asking as a {role}."
+            })
+            messages.append({"role": "assistant", "content": format_example_answer(example)})
+        
+        user_prompt = f"Original prompt: {prompt}\nRole context: I am asking as a {role}."
+        messages.append({"role": "user", "content": user_prompt})
+        
+        return messages
+    
     async def process_with_direct_api(
         self, 
         prompt: str, 
         role: str,
         model: str = None,
+        bypass_cache: bool = False,
     ) -> Dict[str, Any]:
         """
         Process a prompt directly with the LLM API.
@@ -169,13 +519,13 @@ class PromptProcessorService:
             prompt: The prompt to process
             role: The role context for the prompt
             model: The model to use (optional)
+            bypass_cache: Skip the response cache lookup (the fresh result is still stored)
             
         Returns:
-            A dictionary with the processing results
+            A dictionary with the processing results, including the cache status
+            (HIT, SEMANTIC, MISS, BYPASS, or None when caching is disabled)
         """
         try:
-            from ..core.agent_config import ROLE_CONFIGS
-            
             # Validate role
             if role not in ROLE_CONFIGS:
                 return {
@@ -184,54 +534,51 @@ class PromptProcessorService:
                     "error": f"Invalid role: {role}"
                 }
             
-            # Get the role config
-            role_config = ROLE_CONFIGS[role]
-            
-            # Create a clear system message that emphasizes prompt enhancement
-            system_message = f"""You are a prompt optimization expert specializing in {role} topics. Your task is to IMPROVE the given prompt, not to answer it. 
-            
-            Focus on making the original prompt:
-            1. More specific and detailed
-            2. Better structured
-            3. More likely to get a high-quality response
-            4. Include relevant context and constraints
+            template = prompt_templates.get(DIRECT, role)
+            messages = self._build_direct_messages(prompt, role, template)
+            model = model or settings.DEFAULT_MODEL
+            temperature = 0.7
             
-            Role-specific guidance for {role}:
-            {role_config.get('system_message', 'Optimize for clarity and specificity in this domain.')}
-            
-            DO NOT answer the prompt's question - instead, rewrite it to be a better prompt.
-            
-            Your response should be in this format:
-            "Enhanced prompt: [your improved version of the prompt]"
-            
-            Followed by a brief explanation of what you improved and why.
-            """
+            # Serve repeated prompts from the response cache
+            # The system prompt's content hash and the few-shot examples are part of the key
+            cache_key = make_cache_key(
+                prompt, role, settings.PERPLEXITY_BASE_URL, model, temperature,
+                "\n".join([template.content_hash] + [message["content"] for message in messages[1:-1]])
+            )
+            cache_status = None
+            if response_cache is not None:
+                if bypass_cache:
+                    cache_status = "BYPASS"
+                    response_cache.record_bypass()
+                else:
+                    cached = await response_cache.get(cache_key)
+                    if cached is not None:
+                        return {**cached, "cache": "HIT"}
+                    cache_status = "MISS"
             
-            user_prompt = f"Original prompt: {prompt}\nRole context: I am asking as a {role}."
+            # Then look for a near-duplicate prompt; sampled hits are re-run
+            # to measure how often the similarity threshold is wrong
+            semantic_scope = (role, model, template.content_hash)
+            semantic_match = None
+            if semantic_cache is not None and not bypass_cache:
+                semantic_match = semantic_cache.lookup(prompt, semantic_scope)
+                if semantic_match is not None and not semantic_match["sampled"]:
+                    return {**semantic_match["value"], "cache": "SEMANTIC"}
             
-            # Call the LLM API
-            response = llm_client.generate_completion(
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model=model or settings.DEFAULT_MODEL,
-                temperature=0.7,
-                max_tokens=1500
+            # Identical requests already in flight share one provider call
+            flight_key = ("direct", cache_key)
+            joined = self._flights.waiters(flight_key) > 0
+            result = await self._flights.do(
+                flight_key,
+                lambda: self._complete_direct(
+                    prompt, role, messages, model, temperature, cache_key, semantic_scope, semantic_match
+                )
             )
             
-            if not response["success"]:
-                return {
-                    "success": False,
-                    "response": "",
-                    "error": response.get("error", "Unknown error in API call")
-                }
+            if not result["success"]:
+                return result
             
-            return {
-                "success": True,
-                "response": response["content"],
-                "error": None
-            }
+            return {**result, "cache": "COALESCED" if joined else cache_status}
             
         except Exception as e:
             print(f"Error in direct API processing: {str(e)}")
@@ -240,6 +587,110 @@ class PromptProcessorService:
                 "response": "",
                 "error": str(e)
             }
+    
+    async def _complete_direct(
+        self,
+        prompt: str,
+        role: str,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        cache_key: str,
+        semantic_scope: Any,
+        semantic_match: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Call the LLM API for a direct enhancement and populate the caches.
+        
+        Args:
+            prompt: The prompt to process
+            role: The role context, for prefix cache metrics
+            messages: The chat messages to send
+            model: The model to use
+            temperature: The sampling temperature
+            cache_key: Response cache key for the request
+            semantic_scope: Semantic cache scope for the request
+            semantic_match: A sampled semantic hit to verify, if any
+        
+        Returns:
+            A dictionary with the processing results
+        """
+        response = await async_llm_client.agenerate_completion(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=1500
+        )
+        
+        if not response["success"]:
+            return {
+                "success": False,
+                "response": "",
+                "error": response.get("error", "Unknown error in API call")
+            }
+        
+        prefix_cache_stats.record(role, response.get("metadata", {}).get("usage"))
+        
+        result = {
+            "success": True,
+            "response": response["content"],
+            "error": None
+        }
+        
+        if response_cache is not None:
+            await response_cache.set(cache_key, result)
+        
+        if semantic_cache is not None:
+            if semantic_match is not None:
+                semantic_cache.verify(semantic_match, result["response"])
+            semantic_cache.store(prompt, semantic_scope, result)
+        
+        return result
+
+    async def stream_with_direct_api(
+        self,
+        prompt: str,
+        role: str,
+        model: str = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a prompt directly with the LLM API, streaming the result.
+        
+        Args:
+            prompt: The prompt to process
+            role: The role context for the prompt
+            model: The model to use (optional)
+        
+        Yields:
+            delta, section and summary events (or a single error event)
+        """
+        if role not in ROLE_CONFIGS:
+            yield {
+                "event": "error",
+                "data": {"success": False, "error": f"Invalid role: {role}"},
+            }
+            return
+        
+        deltas = async_llm_client.astream_completion(
+            messages=self._build_direct_messages(prompt, role),
+            model=model or settings.DEFAULT_MODEL,
+            temperature=0.7,
+            max_tokens=1500
+        )
+        
+        async for event in stream_enhancement_events(deltas):
+            yield event
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request coalescing and best-of-N refinement counters."""
+        return {
+            **self._flights.stats(),
+            "refine_candidates_requested": self.candidates_requested,
+            "refine_candidates_granted": self.candidates_granted,
+            "refine_candidates_in_flight": self._extra_candidates_in_flight,
+            "early_exits": dict(self.early_exits),
+            "early_exit_stages_skipped": self.early_exit_stages_skipped,
+        }
 
 # Create a global prompt processor instance
 prompt_processor = PromptProcessorService() 
\ No newline at end of file
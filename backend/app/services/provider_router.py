@@ -0,0 +1,242 @@
+"""
+Latency- and health-aware routing of completions across provider backends.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypeVar
+
+import httpx
+import openai
+
+from ..core.config import settings
+from ..utils.metrics import Ewma
+
+ROUTING_MODES = ("fixed", "failover", "latency")
+
+# Errors that say nothing about the request itself, so another backend may succeed
+FAILOVER_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.InternalServerError,
+    openai.RateLimitError,
+    httpx.TransportError,
+    asyncio.TimeoutError,
+)
+
+T = TypeVar("T")
+
+class Backend(NamedTuple):
+    """A provider and the model requested from it."""
+    provider: str
+    model: str
+
+def parse_backends(spec: str) -> List[Backend]:
+    """
+    Parse a comma-separated list of provider:model pairs.
+    
+    Args:
+        spec: e.g. "deepseek:deepseek-chat,openai:gpt-4o-mini"
+    
+    Returns:
+        The backends, in the order given
+    
+    Raises:
+        ValueError: If an entry is not a provider:model pair
+    """
+    backends = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        provider, sep, model = entry.partition(":")
+        if not sep or not provider.strip() or not model.strip():
+            raise ValueError(f"Invalid provider backend: {entry}")
+        backends.append(Backend(provider.strip(), model.strip()))
+    return backends
+
+class BackendHealth:
+    """Rolling latency and error rate of one backend."""
+    
+    def __init__(self, alpha: float):
+        """Initialize with no observations."""
+        self.latency = Ewma(alpha)
+        self.error_rate = Ewma(alpha)
+        self.successes = 0
+        self.failures = 0
+        self.last_failure: Optional[float] = None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the latency in milliseconds, error rate and call counts."""
+        return {
+            "latency_ms": self.latency.value * 1000 if self.latency.value is not None else None,
+            "error_rate": self.error_rate.value or 0.0,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+class ProviderRouter:
+    """
+    Orders a request's eligible backends and fails over between them.
+    
+    Eligible backends are the configured ones whose provider the caller can
+    authenticate with (e.g. the providers a user has keys for). A backend is
+    unhealthy while its error rate is at or above the threshold and its last
+    failure is within the cooldown; unhealthy backends are still tried, but
+    only after every healthy one. Backends without a latency sample sort as
+    fastest so they get measured.
+    """
+    
+    def __init__(
+        self,
+        backends: Optional[List[Backend]] = None,
+        mode: str = settings.PROVIDER_ROUTING,
+        alpha: float = settings.PROVIDER_EWMA_ALPHA,
+        error_threshold: float = settings.PROVIDER_ERROR_THRESHOLD,
+        cooldown: float = settings.PROVIDER_COOLDOWN,
+    ):
+        """
+        Initialize the router.
+        
+        Args:
+            backends: Configured backends (defaults to PROVIDER_BACKENDS)
+            mode: "fixed", "failover" or "latency"
+            alpha: EWMA weight of each new observation
+            error_threshold: Error rate at which a backend counts as unhealthy
+            cooldown: Seconds after its last failure an unhealthy backend is trusted again
+        
+        Raises:
+            ValueError: For an unknown mode
+        """
+        if mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown provider routing mode: {mode}")
+        self.backends = backends if backends is not None else parse_backends(settings.PROVIDER_BACKENDS)
+        self.mode = mode
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.failovers = 0
+        self._health: Dict[Backend, BackendHealth] = {}
+    
+    def _get_health(self, backend: Backend) -> BackendHealth:
+        """Get a backend's health record, creating it on first use."""
+        health = self._health.get(backend)
+        if health is None:
+            health = self._health[backend] = BackendHealth(self.alpha)
+        return health
+    
+    def is_healthy(self, backend: Backend) -> bool:
+        """Check whether a backend may be preferred over others."""
+        health = self._health.get(backend)
+        if health is None or (health.error_rate.value or 0.0) < self.error_threshold:
+            return True
+        return time.monotonic() - health.last_failure >= self.cooldown
+    
+    def record_success(self, backend: Backend, latency: Optional[float]) -> None:
+        """Record a completed call and its latency in seconds (None if not comparable)."""
+        health = self._get_health(backend)
+        if latency is not None:
+            health.latency.update(latency)
+        health.error_rate.update(0.0)
+        health.successes += 1
+    
+    def record_failure(self, backend: Backend) -> None:
+        """Record a call that failed with a failover error."""
+        health = self._get_health(backend)
+        health.error_rate.update(1.0)
+        health.failures += 1
+        health.last_failure = time.monotonic()
+    
+    def route(self, providers: Iterable[str], preferred: Optional[str] = None) -> List[Backend]:
+        """
+        Order the backends a request may use.
+        
+        Args:
+            providers: Providers the caller can authenticate with
+            preferred: The provider the request asked for
+        
+        Returns:
+            Backends to try in order (empty if none is eligible)
+        """
+        available = set(providers)
+        if self.mode == "fixed":
+            available &= {preferred}
+        eligible = [backend for backend in self.backends if backend.provider in available]
+        
+        def sort_key(backend: Backend) -> Tuple:
+            health = self._health.get(backend)
+            latency = health.latency.value if health is not None and health.latency.value is not None else 0.0
+            unhealthy = not self.is_healthy(backend)
+            not_preferred = backend.provider != preferred
+            if self.mode == "latency":
+                return (unhealthy, latency, not_preferred)
+            return (unhealthy, not_preferred, latency)
+        
+        return sorted(eligible, key=sort_key)
+    
+    async def call(
+        self,
+        backends: List[Backend],
+        attempt: Callable[[Backend, bool], Awaitable[T]],
+        record_latency: bool = True,
+    ) -> Tuple[T, Backend]:
+        """
+        Call backends in order until one succeeds.
+        
+        Only FAILOVER_ERRORS move on to the next backend; any other error
+        (e.g. a rejected API key or an invalid request) is raised as-is and
+        does not count against the backend's health.
+        
+        Args:
+            backends: Backends in the order to try them (see route)
+            attempt: Coroutine function called with a backend and whether it
+                is the last one to try
+            record_latency: Whether the call time is a comparable latency
+                sample (False e.g. when attempt only waits for a first token)
+        
+        Returns:
+            The result and the backend that produced it
+        
+        Raises:
+            ValueError: If no backend is given
+            Exception: The last backend's error when every backend failed
+        """
+        if not backends:
+            raise ValueError("No eligible provider backend")
+        
+        for index, backend in enumerate(backends):
+            final = index == len(backends) - 1
+            started = time.perf_counter()
+            try:
+                result = await attempt(backend, final)
+            except asyncio.CancelledError:
+                # A call cancelled as the loser of a hedged race took at least this
+                # long; without the sample a slow backend would keep its old latency
+                if record_latency:
+                    self._get_health(backend).latency.update(time.perf_counter() - started)
+                raise
+            except FAILOVER_ERRORS as e:
+                self.record_failure(backend)
+                if final:
+                    raise
+                self.failovers += 1
+                print(f"Provider {backend.provider}/{backend.model} failed ({type(e).__name__}), failing over")
+                continue
+            
+            self.record_success(backend, time.perf_counter() - started if record_latency else None)
+            return result, backend
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the routing mode, failover count and health of every backend seen."""
+        return {
+            "mode": self.mode,
+            "failovers": self.failovers,
+            "backends": {
+                f"{backend.provider}:{backend.model}": {
+                    **health.snapshot(),
+                    "healthy": self.is_healthy(backend),
+                }
+                for backend, health in self._health.items()
+            },
+        }
+
+# Create a global provider router
+provider_router = ProviderRouter()
\ No newline at end of file
@@ -0,0 +1,328 @@
+"""
+Exact-match cache for prompt enhancement responses.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+from ..utils.cache import TTLCache
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse runs of whitespace so trivially different prompts share an entry."""
+    return " ".join(prompt.split())
+
+def make_cache_key(
+    prompt: str,
+    role: str,
+    provider: str,
+    model: str,
+    temperature: float,
+    system_message: str,
+) -> str:
+    """
+    Build the cache key for an enhancement request.
+    
+    Args:
+        prompt: The user's prompt (whitespace-normalized before hashing)
+        role: The role context
+        provider: The provider serving the request
+        model: The provider model
+        temperature: The sampling temperature
+        system_message: The system message, hashed into a version so prompt
+            changes invalidate old entries
+    
+    Returns:
+        A hex digest identifying the request
+    """
+    system_version = hashlib.sha256(system_message.encode("utf-8")).hexdigest()[:16]
+    payload = json.dumps(
+        [normalize_prompt(prompt), role, provider, model, temperature, system_version],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MemoryResponseBackend:
+    """In-process LRU backend with size and TTL bounds."""
+    
+    # Operations are cheap enough to run on the event loop
+    blocking = False
+    
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Initialize the backend.
+        
+        Args:
+            max_size: Maximum number of cached responses
+            ttl: Seconds a response is served from the cache
+        """
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response."""
+        return self._entries.get(key)
+    
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response."""
+        self._entries.set(key, value)
+    
+    def clear(self) -> None:
+        """Remove every cached response."""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get backend size and counters."""
+        return {"backend": "memory", **self._entries.stats()}
+
+class SQLiteResponseBackend:
+    """
+    On-disk backend shared by every worker process on a host.
+    
+    Reads never write: the access time of each hit is kept in memory and
+    written in one batch when the table is pruned. Pruning runs at most once
+    per prune_interval and drops expired entries, then the least recently
+    accessed ones past max_size, so the table can briefly exceed max_size
+    between prunes.
+    """
+    
+    # sqlite3 calls block, so the cache runs them in a worker thread
+    blocking = True
+    
+    def __init__(
+        self,
+        path: str,
+        max_size: int,
+        ttl: float,
+        prune_interval: float = settings.RESPONSE_CACHE_PRUNE_INTERVAL,
+    ):
+        """
+        Initialize the backend and create its table.
+        
+        Args:
+            path: Path of the SQLite database file
+            max_size: Maximum number of cached responses
+            ttl: Seconds a response is served from the cache
+            prune_interval: Minimum seconds between prunes (0 prunes on every write)
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        # Access times of hits since the last prune, by key
+        self._accessed: Dict[str, float] = {}
+        self._next_prune = 0.0
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        # The prune filters on expiry and orders by access time
+        self._conn.execute("CREATE INDEX IF NOT EXISTS response_cache_expires_at ON response_cache (expires_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS response_cache_accessed_at ON response_cache (accessed_at)")
+        self._conn.commit()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response if it has not expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = now
+        return json.loads(row[0])
+    
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response and prune the table if the prune interval has passed."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            self._accessed.pop(key, None)
+            if now >= self._next_prune:
+                self._prune(now)
+                self._next_prune = now + self.prune_interval
+            self._conn.commit()
+    
+    def _prune(self, now: float) -> None:
+        """Write pending access times, then drop expired and least recently accessed entries."""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE response_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] - self.max_size
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+    
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+            self._accessed.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get backend size."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        return {"backend": "sqlite", "path": self.path, "size": size, "max_size": self.max_size}
+
+class ResponseCache:
+    """
+    Async front end over a response cache backend with hit/miss counters.
+    """
+    
+    def __init__(self, backend: Any, ttl: float = settings.RESPONSE_CACHE_TTL):
+        """
+        Initialize the cache.
+        
+        Args:
+            backend: A MemoryResponseBackend or SQLiteResponseBackend
+            ttl: Seconds a response is served from the cache (used for Cache-Control)
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypasses = 0
+    
+    async def _call(self, method: str, *args: Any) -> Any:
+        """Run a backend method, off the event loop if it blocks."""
+        fn = getattr(self.backend, method)
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached response.
+        
+        Args:
+            key: Key from make_cache_key
+        
+        Returns:
+            The cached response, or None on a miss
+        """
+        try:
+            value = await self._call("get", key)
+        except Exception as e:
+            print(f"Response cache read failed: {str(e)}")
+            value = None
+        
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Store a successful response.
+        
+        Args:
+            key: Key from make_cache_key
+            value: JSON-serializable response
+        """
+        try:
+            await self._call("set", key, value)
+            self.stores += 1
+        except Exception as e:
+            print(f"Response cache write failed: {str(e)}")
+    
+    def record_bypass(self) -> None:
+        """Count a request that skipped the cache."""
+        self.bypasses += 1
+    
+    def headers(self, status: str) -> Dict[str, str]:
+        """
+        Build cache headers for a response.
+        
+        Args:
+            status: HIT, MISS or BYPASS
+        
+        Returns:
+            X-Cache and Cache-Control headers
+        """
+        if status == "BYPASS":
+            return {"X-Cache": status, "Cache-Control": "no-store"}
+        return {"X-Cache": status, "Cache-Control": f"private, max-age={int(self.ttl)}"}
+    
+    def clear(self) -> None:
+        """Remove every cached response."""
+        self.backend.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters and backend stats."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "bypasses": self.bypasses,
+            **self.backend.stats(),
+        }
+
+def wants_cache_bypass(bypass_flag: bool, cache_control: Optional[str]) -> bool:
+    """
+    Check whether a request asked to skip the response cache.
+    
+    Args:
+        bypass_flag: The bypassCache field of the request body
+        cache_control: The request's Cache-Control header, if any
+    
+    Returns:
+        True if the cache should not be read
+    """
+    if bypass_flag:
+        return True
+    directives = (cache_control or "").lower()
+    return "no-cache" in directives or "no-store" in directives
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Create the response cache configured by RESPONSE_CACHE_BACKEND (None when disabled)."""
+    backend_name = settings.RESPONSE_CACHE_BACKEND
+    if backend_name == "none":
+        return None
+    if backend_name == "sqlite":
+        backend = SQLiteResponseBackend(
+            settings.RESPONSE_CACHE_SQLITE_PATH,
+            max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+            ttl=settings.RESPONSE_CACHE_TTL,
+        )
+    elif backend_name == "memory":
+        backend = MemoryResponseBackend(
+            max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+            ttl=settings.RESPONSE_CACHE_TTL,
+        )
+    else:
+        raise ValueError(f"Unknown response cache backend: {backend_name}")
+    return ResponseCache(backend, ttl=settings.RESPONSE_CACHE_TTL)
+
+# Create the global response cache instance
+response_cache = create_response_cache()
\ No newline at end of file
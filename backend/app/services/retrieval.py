@@ -0,0 +1,259 @@
+"""
+Retrieval of curated few-shot enhancement examples from rag_structure.json.
+"""
+import json
+import math
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..core.config import settings
+from .semantic_cache import HashedNgramEmbedder
+
+# Example domains that suit each role; matching examples get a small score boost
+ROLE_DOMAINS: Dict[str, frozenset] = {
+    "webdev": frozenset({"frontend_development", "backend_development", "technical_writing"}),
+    "syseng": frozenset({"backend_development", "machine_learning", "technical_writing"}),
+    "analyst": frozenset({"data_analysis", "market_research", "machine_learning"}),
+    "designer": frozenset({"frontend_development", "creative_writing", "education"}),
+}
+
+class ExampleIndex:
+    """
+    Immutable BM25 and dense-vector index over a set of examples.
+    
+    A new index is built on every (re)load and swapped in whole, so searches
+    never see a half-built index.
+    """
+    
+    def __init__(
+        self,
+        examples: List[Dict[str, Any]],
+        embedder: HashedNgramEmbedder,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """
+        Build the index.
+        
+        Args:
+            examples: Parsed examples (see FewShotRetriever.parse_examples)
+            embedder: Embedder for the dense vectors
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.examples = examples
+        self.k1 = k1
+        self.b = b
+        
+        # The original prompt is what incoming prompts resemble, so it counts double
+        self.term_counts: List[Counter] = []
+        for example in examples:
+            terms = Counter(embedder.tokens(example["original"]) * 2)
+            terms.update(embedder.tokens(example["domain"].replace("_", " ")))
+            terms.update(embedder.tokens(example["improved"]))
+            self.term_counts.append(terms)
+        
+        self.lengths = np.array([sum(terms.values()) for terms in self.term_counts], dtype=np.float64)
+        self.avg_length = float(self.lengths.mean()) if examples else 0.0
+        document_frequency = Counter(term for terms in self.term_counts for term in terms)
+        count = len(examples)
+        self.idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+        
+        self.vectors = (
+            np.stack([embedder.embed(f"{example['original']} {example['improved']}") for example in examples])
+            if examples else np.zeros((0, embedder.dim), dtype=np.float32)
+        )
+    
+    def bm25(self, terms: List[str]) -> np.ndarray:
+        """Score every example against the query terms."""
+        scores = np.zeros(len(self.examples), dtype=np.float64)
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, counts in enumerate(self.term_counts):
+                tf = counts.get(term, 0)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                    scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+class FewShotRetriever:
+    """
+    Finds the curated examples most similar to an incoming prompt.
+    
+    Scores blend BM25 keyword relevance with cosine similarity of hashed
+    n-gram vectors, plus a boost for examples from the role's domains. The
+    examples file is reloaded when its modification time changes.
+    """
+    
+    def __init__(
+        self,
+        path: str = settings.RAG_EXAMPLES_PATH,
+        top_k: int = settings.RAG_TOP_K,
+        min_score: float = settings.RAG_MIN_SCORE,
+        dense_weight: float = settings.RAG_DENSE_WEIGHT,
+        reload_interval: float = settings.RAG_RELOAD_INTERVAL,
+        role_boost: float = 0.1,
+    ):
+        """
+        Initialize the retriever; call load() to read the examples.
+        
+        Args:
+            path: Path of rag_structure.json
+            top_k: Examples returned per prompt
+            min_score: Minimum blended score for an example to be returned
+            dense_weight: Weight of vector similarity against BM25 (0 disables vectors)
+            reload_interval: Seconds between checks of the file's modification time
+            role_boost: Score added to examples from the role's domains
+        """
+        self.path = path
+        self.top_k = top_k
+        self.min_score = min_score
+        self.dense_weight = dense_weight
+        self.reload_interval = reload_interval
+        self.role_boost = role_boost
+        self.embedder = HashedNgramEmbedder(dim=256)
+        self._index = ExampleIndex([], self.embedder)
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.loads = 0
+        self.retrievals = 0
+        self.hits = 0
+    
+    @staticmethod
+    def parse_examples(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Flatten the training examples of rag_structure.json.
+        
+        Args:
+            data: The decoded file
+        
+        Returns:
+            Examples with original, domain, issues, improved and rationale fields
+        """
+        examples = []
+        for i, raw in enumerate(data.get("training_examples", [])):
+            original = raw.get("original_prompt", {})
+            improved = raw.get("improved_prompt", {})
+            if not original.get("text") or not improved.get("text"):
+                continue
+            examples.append({
+                "id": i,
+                "original": original["text"],
+                "domain": original.get("user_context", {}).get("domain", ""),
+                "issues": [issue.get("details", "") for issue in raw.get("analysis", {}).get("issues", [])],
+                "improved": improved["text"],
+                "rationale": [
+                    addition.get("purpose", "")
+                    for addition in raw.get("improvement_rationale", {}).get("additions", [])
+                ],
+            })
+        return examples
+    
+    def load(self) -> int:
+        """
+        Read the examples file and rebuild the index.
+        
+        Returns:
+            Number of examples loaded (the previous index is kept on error)
+        """
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                examples = self.parse_examples(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error loading few-shot examples from {self.path}: {e}")
+            return len(self._index.examples)
+        
+        self._index = ExampleIndex(examples, self.embedder)
+        self._mtime = mtime
+        self.loads += 1
+        return len(examples)
+    
+    def _maybe_reload(self) -> None:
+        """Reload the file if it changed since the last check."""
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
+    
+    def retrieve(self, prompt: str, role: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the examples most similar to a prompt.
+        
+        Args:
+            prompt: The incoming prompt
+            role: The role context for the prompt
+            k: Number of examples (defaults to top_k)
+        
+        Returns:
+            Up to k examples, best first, each with a "score"
+        """
+        self._maybe_reload()
+        index = self._index
+        self.retrievals += 1
+        if not index.examples:
+            return []
+        
+        bm25 = index.bm25(self.embedder.tokens(prompt))
+        # Squash BM25 into [0, 1) so it blends with cosine similarity
+        scores = (1 - self.dense_weight) * bm25 / (bm25 + 2.0)
+        if self.dense_weight:
+            scores += self.dense_weight * np.clip(index.vectors @ self.embedder.embed(prompt), 0.0, 1.0)
+        domains = ROLE_DOMAINS.get(role, frozenset())
+        scores += np.array([self.role_boost if ex["domain"] in domains else 0.0 for ex in index.examples])
+        
+        k = self.top_k if k is None else k
+        results = []
+        for i in np.argsort(-scores)[:k]:
+            if scores[i] < self.min_score:
+                break
+            results.append({**index.examples[i], "score": float(scores[i])})
+        if results:
+            self.hits += 1
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get index size and retrieval counters."""
+        return {
+            "examples": len(self._index.examples),
+            "loads": self.loads,
+            "retrievals": self.retrievals,
+            "hit_rate": self.hits / self.retrievals if self.retrievals else 0.0,
+        }
+
+def format_example_answer(example: Dict[str, Any]) -> str:
+    """Render an example's improvement in the direct path's response format."""
+    explanation = "; ".join(filter(None, example["issues"])) or "Added specifics."
+    return f"Enhanced prompt: {example['improved']}\n\nExplanation: Addressed {explanation[0].lower()}{explanation[1:]}."
+
+def format_examples(examples: List[Dict[str, Any]]) -> str:
+    """Render examples as a reference block for agent messages."""
+    blocks = []
+    for number, example in enumerate(examples, 1):
+        issues = "; ".join(filter(None, example["issues"]))
+        blocks.append(
+            f"Example {number}\n"
+            f"Original prompt: {example['original']}\n"
+            f"Issues: {issues}\n"
+            f"Improved prompt: {example['improved']}"
+        )
+    return "\n\n".join(blocks)
+
+# Create the global retriever instance (None when disabled); examples load at startup
+few_shot_retriever = FewShotRetriever() if settings.RAG_ENABLED else None
\ No newline at end of file
@@ -0,0 +1,362 @@
+"""
+Near-duplicate cache for prompt enhancements based on hashed n-gram vectors.
+"""
+import random
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+
+# Filler words that do not change what an enhancement should look like
+STOP_WORDS = frozenset({
+    "a", "an", "the", "this", "that", "my", "our", "your", "me", "i", "you", "we",
+    "please", "pls", "kindly", "can", "could", "would", "how", "do", "to", "of",
+    "for", "in", "on", "with", "is", "are", "some", "help", "make", "create", "write",
+})
+
+# Words that flip or narrow what a prompt asks for; "with"/"without" embed
+# almost identically, so prompts only match when these agree exactly
+NEGATION_WORDS = frozenset({
+    "no", "not", "never", "none", "nor", "neither", "without", "except", "excluding",
+    "exclude", "avoid", "cannot", "dont", "doesnt", "isnt", "arent", "wont", "shouldnt",
+})
+NEGATION_TOKEN = re.compile(r"[a-z]+(?:['’]t)?")
+# Quoted strings, inline code and numbers (versions, years, sizes) must match verbatim
+LITERAL_PATTERN = re.compile(r'"[^"\n]*"|`[^`\n]*`|\d+(?:[.,:/-]\d+)*')
+
+class PromptSignature(NamedTuple):
+    """The parts of a prompt a near-duplicate must share exactly."""
+    negations: Tuple[str, ...]
+    literals: Tuple[str, ...]
+    tokens: Tuple[str, ...]
+
+def prompt_signature(prompt: str, tokens: List[str]) -> PromptSignature:
+    """
+    Extract a prompt's negations, literals and content word order.
+    
+    Args:
+        prompt: The prompt
+        tokens: The prompt's content tokens (see HashedNgramEmbedder.tokens)
+    
+    Returns:
+        The signature
+    """
+    negations = []
+    for word in NEGATION_TOKEN.findall(prompt.lower()):
+        if word.endswith(("n't", "n’t")):
+            negations.append("not")
+        elif word in NEGATION_WORDS:
+            negations.append(word)
+    return PromptSignature(tuple(sorted(negations)), tuple(LITERAL_PATTERN.findall(prompt)), tuple(tokens))
+
+def signatures_match(a: PromptSignature, b: PromptSignature) -> bool:
+    """
+    Check that two similar prompts do not differ in meaning in ways the
+    embedding cannot see: negations, numbers and literals, or the order of
+    the words they share ("TCP and UDP" vs "UDP and TCP").
+    """
+    if a.negations != b.negations or a.literals != b.literals:
+        return False
+    shared = set(a.tokens) & set(b.tokens)
+    return [t for t in a.tokens if t in shared] == [t for t in b.tokens if t in shared]
+
+class HashedNgramEmbedder:
+    """
+    CPU-only text embedder using the hashing trick.
+    
+    Each word contributes a word feature and its character trigrams, so
+    spelling variants ("analyze"/"analyse") still land close together.
+    """
+    
+    def __init__(self, dim: int = settings.SEMANTIC_CACHE_DIM, word_weight: float = 2.0):
+        """
+        Initialize the embedder.
+        
+        Args:
+            dim: Number of hash buckets in each vector
+            word_weight: Weight of whole-word features relative to trigrams
+        """
+        self.dim = dim
+        self.word_weight = word_weight
+    
+    @staticmethod
+    def tokens(text: str) -> List[str]:
+        """Lowercase, drop filler words and fold British -ise/-yse spellings."""
+        tokens = []
+        for word in re.findall(r"\w+", text.lower()):
+            if word in STOP_WORDS:
+                continue
+            word = re.sub(r"ys(e|ed|es|ing)$", r"yz\1", word)
+            word = re.sub(r"is(e|ed|es|ing|ation)$", r"iz\1", word)
+            tokens.append(word)
+        return tokens
+    
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed text as an L2-normalized vector.
+        
+        Args:
+            text: The text to embed
+        
+        Returns:
+            A float32 vector of length dim (all zeros for empty text)
+        """
+        features = []
+        weights = []
+        for word in self.tokens(text):
+            features.append(f"w:{word}")
+            weights.append(self.word_weight)
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                features.append(f"c:{padded[i:i + 3]}")
+                weights.append(1.0)
+        
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+        
+        # crc32 is stable across processes, unlike hash()
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes >> 31, -1.0, 1.0) * np.asarray(weights)
+        np.add.at(vector, (hashes % self.dim).astype(np.int64), signs)
+        
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class SemanticIndex:
+    """
+    Fixed-capacity index of unit vectors for one cache scope.
+    
+    Vectors live in one matrix so a lookup is a single matrix-vector product.
+    The matrix starts small and doubles as entries arrive, up to capacity;
+    after that the oldest entry is overwritten.
+    """
+    
+    INITIAL_SIZE = 16
+    
+    def __init__(self, dim: int, capacity: int):
+        """
+        Initialize an empty index.
+        
+        Args:
+            dim: Vector dimension
+            capacity: Maximum number of entries
+        """
+        size = min(capacity, self.INITIAL_SIZE)
+        self.vectors = np.zeros((size, dim), dtype=np.float32)
+        self.expires_at = np.zeros(size, dtype=np.float64)
+        self.values: List[Optional[Dict[str, Any]]] = [None] * size
+        self.keys: List[Any] = [None] * size
+        self.capacity = capacity
+        self.count = 0
+        self._next = 0
+    
+    def search(
+        self,
+        vector: np.ndarray,
+        now: float,
+        threshold: float = -1.0,
+        accept: Optional[Callable[[Any], bool]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find the most similar unexpired entry that clears the threshold.
+        
+        Args:
+            vector: Unit query vector
+            now: Current time, used to skip expired entries
+            threshold: Minimum similarity
+            accept: Optional check of an entry's key; candidates it rejects
+                are skipped in favour of the next most similar
+        
+        Returns:
+            {"value": ..., "similarity": ...} or None if nothing qualifies
+        """
+        if self.count == 0:
+            return None
+        
+        similarities = self.vectors[:self.count] @ vector
+        similarities[self.expires_at[:self.count] <= now] = -1.0
+        candidates = np.flatnonzero((similarities >= threshold) & (similarities >= 0))
+        for slot in candidates[np.argsort(-similarities[candidates], kind="stable")]:
+            if accept is None or accept(self.keys[slot]):
+                return {"value": self.values[slot], "similarity": float(similarities[slot])}
+        return None
+    
+    def add(self, vector: np.ndarray, value: Dict[str, Any], expires_at: float, key: Any = None) -> None:
+        """Insert an entry, overwriting the oldest one when full."""
+        slot = self._next
+        if slot >= len(self.vectors):
+            self._grow()
+        self.vectors[slot] = vector
+        self.expires_at[slot] = expires_at
+        self.values[slot] = value
+        self.keys[slot] = key
+        self._next = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def _grow(self) -> None:
+        """Double the allocated rows, up to capacity."""
+        size = min(self.capacity, 2 * len(self.vectors))
+        extra = size - len(self.vectors)
+        self.vectors = np.vstack([self.vectors, np.zeros((extra, self.vectors.shape[1]), dtype=np.float32)])
+        self.expires_at = np.concatenate([self.expires_at, np.zeros(extra, dtype=np.float64)])
+        self.values.extend([None] * extra)
+        self.keys.extend([None] * extra)
+
+class SemanticCache:
+    """
+    Cache returning a stored enhancement for prompts that are worded differently
+    but mean the same thing.
+    
+    Besides clearing the similarity threshold, a hit must have the same
+    negations, numbers and literals as the stored prompt, and its shared
+    words in the same order (see signatures_match).
+    
+    A small sample of hits is re-run against the model anyway; when the fresh
+    enhancement differs too much from the cached one the hit is counted as false,
+    which tells us whether the threshold is too loose.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        capacity: int = settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: float = settings.SEMANTIC_CACHE_TTL,
+        sample_rate: float = settings.SEMANTIC_CACHE_SAMPLE_RATE,
+        verify_threshold: float = settings.SEMANTIC_CACHE_VERIFY_THRESHOLD,
+        max_scopes: int = settings.SEMANTIC_CACHE_MAX_SCOPES,
+        embedder: Optional[HashedNgramEmbedder] = None,
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            threshold: Minimum cosine similarity for a prompt to reuse a cached enhancement
+            capacity: Maximum entries per scope
+            ttl: Seconds an entry is served from the cache
+            sample_rate: Fraction of hits that are re-run to measure false hits
+            verify_threshold: Minimum similarity between a cached and fresh enhancement
+                for a sampled hit to count as correct
+            max_scopes: Maximum number of scopes; the least recently used one
+                is dropped when a new scope would exceed it
+            embedder: Embedder to use (defaults to a HashedNgramEmbedder)
+        """
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.sample_rate = sample_rate
+        self.verify_threshold = verify_threshold
+        self.max_scopes = max_scopes
+        self.embedder = embedder or HashedNgramEmbedder()
+        self._indexes: "OrderedDict[Hashable, SemanticIndex]" = OrderedDict()
+        self.evicted_scopes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.samples = 0
+        self.false_hits = 0
+        self._hit_similarity_total = 0.0
+    
+    def lookup(self, prompt: str, scope: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached enhancement for a near-duplicate prompt.
+        
+        Args:
+            prompt: The user's prompt
+            scope: Partition key, e.g. (role, model)
+        
+        Returns:
+            None on a miss, otherwise {"value", "similarity", "sampled"}; a sampled
+            hit should be re-run and passed to verify()
+        """
+        self.lookups += 1
+        index = self._indexes.get(scope)
+        if index is None:
+            return None
+        self._indexes.move_to_end(scope)
+        
+        signature = prompt_signature(prompt, self.embedder.tokens(prompt))
+        match = index.search(
+            self.embedder.embed(prompt),
+            time.time(),
+            self.threshold,
+            lambda stored: signatures_match(signature, stored),
+        )
+        if match is None:
+            return None
+        
+        self.hits += 1
+        self._hit_similarity_total += match["similarity"]
+        match["sampled"] = random.random() < self.sample_rate
+        return match
+    
+    def store(self, prompt: str, scope: Hashable, value: Dict[str, Any]) -> None:
+        """
+        Store an enhancement for a prompt.
+        
+        Args:
+            prompt: The user's prompt
+            scope: Partition key, e.g. (role, model)
+            value: The successful processing result
+        """
+        vector = self.embedder.embed(prompt)
+        if not vector.any():
+            return
+        
+        index = self._indexes.get(scope)
+        if index is None:
+            while len(self._indexes) >= max(self.max_scopes, 1):
+                self._indexes.popitem(last=False)
+                self.evicted_scopes += 1
+            index = self._indexes[scope] = SemanticIndex(self.embedder.dim, self.capacity)
+        else:
+            self._indexes.move_to_end(scope)
+        signature = prompt_signature(prompt, self.embedder.tokens(prompt))
+        index.add(vector, value, time.time() + self.ttl, signature)
+    
+    def verify(self, match: Dict[str, Any], fresh_response: str) -> bool:
+        """
+        Compare a sampled hit with the freshly generated enhancement.
+        
+        Args:
+            match: The sampled result from lookup()
+            fresh_response: The enhancement the model produced for the new prompt
+        
+        Returns:
+            True if the cached enhancement was a reasonable substitute
+        """
+        cached = self.embedder.embed(match["value"].get("response", ""))
+        fresh = self.embedder.embed(fresh_response)
+        correct = float(cached @ fresh) >= self.verify_threshold
+        
+        self.samples += 1
+        if not correct:
+            self.false_hits += 1
+        return correct
+    
+    def clear(self) -> None:
+        """Remove every cached enhancement."""
+        self._indexes.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit-rate and false-hit sampling metrics."""
+        return {
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "avg_hit_similarity": self._hit_similarity_total / self.hits if self.hits else 0.0,
+            "samples": self.samples,
+            "false_hits": self.false_hits,
+            "false_hit_rate": self.false_hits / self.samples if self.samples else 0.0,
+            "entries": sum(index.count for index in self._indexes.values()),
+            "scopes": len(self._indexes),
+            "evicted_scopes": self.evicted_scopes,
+        }
+
+# Create the global semantic cache instance (None when disabled)
+semantic_cache = SemanticCache() if settings.SEMANTIC_CACHE_ENABLED else None
\ No newline at end of file
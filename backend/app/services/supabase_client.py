@@ -1,31 +1,66 @@
 """
 Supabase client service for database and authentication operations.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Sequence
 import os
+import httpx
 from supabase import create_client, Client
 from ..core.config import settings
+from ..utils.pagination import encode_cursor, decode_keyset_cursor
+from .postgrest import AsyncPostgrestClient, create_postgrest_http_client
+
+# prompt_history columns callers may select; the previews are generated columns
+HISTORY_COLUMNS = (
+    "id",
+    "created_at",
+    "role",
+    "success",
+    "model",
+    "original_prompt",
+    "enhanced_prompt",
+    "original_preview",
+    "enhanced_preview",
+)
+HISTORY_PREVIEW_COLUMNS = ("id", "created_at", "role", "success", "original_preview", "enhanced_preview")
 
 class SupabaseService:
     """Service for interacting with Supabase for database and authentication."""
     
-    def __init__(self):
-        """Initialize the Supabase client with configuration."""
-        self.url = settings.SUPABASE_URL
-        self.key = settings.SUPABASE_KEY
+    def __init__(
+        self,
+        url: Optional[str] = settings.SUPABASE_URL,
+        key: Optional[str] = settings.SUPABASE_KEY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Initialize the Supabase clients with configuration.
+        
+        Args:
+            url: Supabase project URL
+            key: Supabase API key
+            transport: Optional HTTP transport for the async data layer (used in tests)
+        """
+        self.url = url
+        self.key = key
         self.client = None
+        self.rest = None
         
         if self.url and self.key:
             try:
                 self.client = create_client(self.url, self.key)
             except Exception as e:
                 print(f"Error initializing Supabase client: {e}")
+            
+            # Table reads and writes go through the async PostgREST client
+            self.rest = AsyncPostgrestClient(
+                create_postgrest_http_client(f"{self.url.rstrip('/')}/rest/v1", self.key, transport)
+            )
         else:
             print("Supabase URL or Key not configured")
     
     def is_configured(self) -> bool:
         """Check if Supabase is properly configured."""
-        return self.client is not None
+        return self.rest is not None
     
     async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -41,14 +76,52 @@ class SupabaseService:
             return None
             
         try:
-            response = self.client.table('users').select('*').eq('id', user_id).execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]
+            rows = await self.rest.select('users', eq={'id': user_id}, limit=1)
+            if rows:
+                return rows[0]
             return None
         except Exception as e:
             print(f"Error fetching user: {e}")
             return None
     
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """
+        Get user information by email.
+        
+        Args:
+            email: The user's email
+        
+        Returns:
+            User data or None if not found
+        
+        Raises:
+            PostgrestError: If the query fails
+        """
+        if not self.is_configured():
+            return None
+        
+        rows = await self.rest.select('users', eq={'email': email}, limit=1)
+        return rows[0] if rows else None
+    
+    async def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Insert a user record.
+        
+        Args:
+            user_data: Column values for the new user
+        
+        Returns:
+            The created user, or None if nothing was returned
+        
+        Raises:
+            PostgrestError: If the insert fails
+        """
+        if not self.is_configured():
+            return None
+        
+        rows = await self.rest.insert('users', user_data)
+        return rows[0] if rows else None
+    
     async def save_prompt_history(
         self, 
         user_id: str, 
@@ -83,11 +156,11 @@ class SupabaseService:
                 "created_at": "now()",
             }
             
-            response = self.client.table('prompt_history').insert(data).execute()
+            rows = await self.rest.insert('prompt_history', data)
             
             return {
                 "success": True,
-                "data": response.data[0] if response.data else None
+                "data": rows[0] if rows else None
             }
         except Exception as e:
             print(f"Error saving prompt history: {e}")
@@ -108,20 +181,140 @@ class SupabaseService:
             return {"success": False, "error": "Supabase not configured"}
             
         try:
-            response = self.client.table('prompt_history') \
-                .select('*') \
-                .eq('user_id', user_id) \
-                .order('created_at', desc=True) \
-                .limit(limit) \
-                .execute()
+            rows = await self.rest.select(
+                'prompt_history',
+                eq={'user_id': user_id},
+                order='created_at',
+                desc=True,
+                limit=limit,
+            )
             
             return {
                 "success": True,
-                "data": response.data if response.data else []
+                "data": rows
             }
         except Exception as e:
             print(f"Error fetching prompt history: {e}")
             return {"success": False, "error": str(e)}
 
+    async def get_prompt_history_page(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        columns: Sequence[str] = HISTORY_PREVIEW_COLUMNS,
+        role: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get one page of a user's prompt history, newest first.
+        
+        Pages are keyed on (created_at, id) rather than an offset, so each page is
+        a single index range scan however deep the user pages.
+        
+        Args:
+            user_id: The user's unique identifier
+            limit: Maximum number of records to return
+            cursor: next_cursor from the previous page
+            columns: Columns to return (id and created_at are always included)
+            role: Only return history for this role
+        
+        Returns:
+            The records and the cursor for the next page (None on the last page)
+        
+        Raises:
+            ValueError: If the cursor or a column is invalid
+        """
+        unknown = [column for column in columns if column not in HISTORY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown history columns: {', '.join(unknown)}")
+        filters = {}
+        if cursor:
+            # Only a parsed timestamp and UUID reach the filter string
+            created_at, row_id = decode_keyset_cursor(cursor)
+            filters["or"] = (
+                f'(created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt."{row_id}"))'
+            )
+        
+        if not self.is_configured():
+            return {"success": False, "error": "Supabase not configured"}
+        
+        selected = ["created_at", "id"] + [column for column in columns if column not in ("created_at", "id")]
+        eq = {'user_id': user_id}
+        if role:
+            eq['role'] = role
+        
+        try:
+            # One extra row tells us whether another page exists
+            rows = await self.rest.select(
+                'prompt_history',
+                columns=",".join(selected),
+                eq=eq,
+                filters=filters,
+                order='created_at,id',
+                desc=True,
+                limit=limit + 1,
+            )
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor([rows[-1]["created_at"], rows[-1]["id"]])
+            
+            return {
+                "success": True,
+                "data": rows,
+                "next_cursor": next_cursor
+            }
+        except Exception as e:
+            print(f"Error fetching prompt history page: {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def search_prompt_history(
+        self,
+        user_id: str,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        role: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Full-text search a user's prompt history, best matches first.
+        
+        Args:
+            user_id: The user's unique identifier
+            query: Search terms (websearch syntax: quotes, OR, -term)
+            limit: Maximum number of records to return
+            offset: Number of ranked records to skip
+            role: Only search history for this role
+        
+        Returns:
+            Matching preview records with their rank
+        """
+        if not self.is_configured():
+            return {"success": False, "error": "Supabase not configured"}
+        
+        try:
+            rows = await self.rest.rpc('search_prompt_history', {
+                'p_user_id': user_id,
+                'p_query': query,
+                'p_role': role,
+                'p_limit': limit,
+                'p_offset': offset,
+            })
+            
+            return {
+                "success": True,
+                "data": rows or []
+            }
+        except Exception as e:
+            print(f"Error searching prompt history: {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def aclose(self) -> None:
+        """Close the async data layer's connection pool."""
+        if self.rest is not None:
+            await self.rest.aclose()
+
 # Create a global supabase service instance
 supabase_service = SupabaseService() 
\ No newline at end of file
@@ -2,9 +2,21 @@
 Utility functions and classes for the application.
 """
 from .logging import app_logger, get_logger, setup_fastapi_logging
+from .cache import TTLCache
+from .singleflight import SingleFlight
+from .metrics import LatencyHistogram, Ewma, PrefixCacheStats
+from .pagination import encode_cursor, decode_cursor, decode_keyset_cursor
 
 __all__ = [
     "app_logger",
     "get_logger",
     "setup_fastapi_logging",
+    "TTLCache",
+    "SingleFlight",
+    "LatencyHistogram",
+    "Ewma",
+    "PrefixCacheStats",
+    "encode_cursor",
+    "decode_cursor",
+    "decode_keyset_cursor",
 ] 
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+In-process caching primitives shared by the services.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry expiry and hit/miss counters.
+    
+    Entries expire `ttl` seconds after they were stored, or after they were
+    last read when `refresh_on_access` is set (idle expiry). When the cache is
+    full the least recently used entry is evicted.
+    """
+    
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        refresh_on_access: bool = False,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of entries
+            ttl: Default time-to-live in seconds
+            refresh_on_access: Whether a read extends the entry's lifetime
+            on_evict: Callback invoked with (key, value) when an entry is dropped
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.refresh_on_access = refresh_on_access
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        now = time.monotonic()
+        dropped = None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            value, expires_at, ttl = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                dropped = value
+            else:
+                self._data.move_to_end(key)
+                if self.refresh_on_access:
+                    self._data[key] = (value, now + ttl, ttl)
+                self.hits += 1
+                return value
+        
+        self._notify_evict(key, dropped)
+        return default
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, optionally with a TTL that overrides the default."""
+        ttl = self.ttl if ttl is None else ttl
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (value, time.monotonic() + ttl, ttl)
+            
+            while len(self._data) > self.max_size:
+                old_key, (old_value, _, _) = self._data.popitem(last=False)
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+        
+        for old_key, old_value in evicted:
+            self._notify_evict(old_key, old_value)
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry explicitly and return its value."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        
+        if entry is None:
+            return default
+        
+        self._notify_evict(key, entry[0])
+        return entry[0]
+    
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            entries = list(self._data.items())
+            self._data.clear()
+        
+        for key, (value, _, _) in entries:
+            self._notify_evict(key, value)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get size and hit/miss counters for the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+    
+    def _notify_evict(self, key: Hashable, value: Any) -> None:
+        """Run the eviction callback outside the lock."""
+        if self.on_evict is not None and value is not None:
+            try:
+                self.on_evict(key, value)
+            except Exception as e:
+                print(f"Error in cache eviction callback: {e}")
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Lightweight in-process metrics.
+"""
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+# Default latency bucket upper bounds in milliseconds
+DEFAULT_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram.
+    
+    Each observation is counted in the first bucket whose upper bound it does
+    not exceed, and percentiles are estimated from the bucket bounds.
+    """
+    
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        """
+        Initialize an empty histogram.
+        
+        Args:
+            buckets_ms: Sorted bucket upper bounds in milliseconds
+        """
+        self.buckets_ms: List[float] = sorted(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+    
+    def observe(self, value_ms: float) -> None:
+        """Record one observation in milliseconds."""
+        index = bisect.bisect_left(self.buckets_ms, value_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_ms += value_ms
+            self.max_ms = max(self.max_ms, value_ms)
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Estimate a percentile as the upper bound of the bucket containing it.
+        
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.95
+        
+        Returns:
+            The estimate in milliseconds, or None without observations
+        """
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = fraction * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self._counts):
+                seen += bucket_count
+                if seen >= rank and bucket_count:
+                    return self.buckets_ms[index] if index < len(self.buckets_ms) else self.max_ms
+            return self.max_ms
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get count, mean, percentiles and per-bucket counts."""
+        with self._lock:
+            buckets = {
+                f"le_{bound:g}": count
+                for bound, count in zip(self.buckets_ms, self._counts)
+            }
+            buckets["le_inf"] = self._counts[-1]
+            count = self.count
+            total_ms = self.total_ms
+            max_ms = self.max_ms
+        
+        return {
+            "count": count,
+            "avg_ms": total_ms / count if count else 0.0,
+            "max_ms": max_ms,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": buckets,
+        }
+
+class Ewma:
+    """
+    Exponentially weighted moving average.
+    
+    The first observation seeds the average; each later one moves it by
+    alpha times the difference, so older observations fade geometrically.
+    """
+    
+    def __init__(self, alpha: float):
+        """
+        Initialize an empty average.
+        
+        Args:
+            alpha: Weight of each new observation, in (0, 1]
+        """
+        self.alpha = alpha
+        self.value: Optional[float] = None
+        self.count = 0
+    
+    def update(self, value: float) -> float:
+        """Add an observation and return the new average."""
+        self.value = value if self.value is None else self.value + self.alpha * (value - self.value)
+        self.count += 1
+        return self.value
+
+class PrefixCacheStats:
+    """
+    Provider prompt-prefix cache usage, per scope (e.g. role).
+    
+    Providers that cache repeated prompt prefixes report how many prompt
+    tokens were served from the cache. A call counts as a hit when any were.
+    """
+    
+    def __init__(self):
+        """Initialize empty counters."""
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, Dict[str, int]] = {}
+    
+    def record(self, scope: str, usage: Optional[Dict[str, Any]]) -> None:
+        """
+        Record the token usage of one completion.
+        
+        Args:
+            scope: Scope to attribute the call to
+            usage: Usage with prompt_tokens and cached_tokens (None when the
+                provider reported no usage)
+        """
+        with self._lock:
+            counts = self._scopes.setdefault(scope, {
+                "calls": 0, "reported": 0, "hits": 0, "prompt_tokens": 0, "cached_tokens": 0,
+            })
+            counts["calls"] += 1
+            if not usage or usage.get("cached_tokens") is None:
+                return
+            counts["reported"] += 1
+            counts["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            counts["cached_tokens"] += usage["cached_tokens"]
+            if usage["cached_tokens"] > 0:
+                counts["hits"] += 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get counters, hit rate and cached token share per scope."""
+        with self._lock:
+            scopes = {scope: dict(counts) for scope, counts in self._scopes.items()}
+        for counts in scopes.values():
+            counts["hit_rate"] = counts["hits"] / counts["reported"] if counts["reported"] else 0.0
+            counts["cached_token_ratio"] = (
+                counts["cached_tokens"] / counts["prompt_tokens"] if counts["prompt_tokens"] else 0.0
+            )
+        return scopes
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Opaque cursors for keyset pagination.
+"""
+import base64
+import json
+import re
+import uuid
+from datetime import datetime
+from typing import Any, List, Sequence, Tuple
+
+# Fractional seconds, which Postgres prints without trailing zeros but
+# datetime.fromisoformat before Python 3.11 only reads as 3 or 6 digits
+FRACTION = re.compile(r"\.(\d{1,6})(?=\D|$)")
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort key of the last row on a page as an opaque cursor.
+    
+    Args:
+        values: JSON-serializable key values, e.g. (created_at, id)
+    
+    Returns:
+        A URL-safe cursor string
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Args:
+        cursor: The cursor string
+        size: Number of key values the cursor must hold
+    
+    Returns:
+        The key values
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+def decode_keyset_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a (created_at, id) cursor into values safe to put in a filter.
+    
+    The cursor comes from the client, so both values are parsed and
+    re-serialized rather than trusted: anything that is not a timestamp and
+    a UUID is rejected.
+    
+    Args:
+        cursor: The cursor string
+    
+    Returns:
+        The timestamp in ISO 8601 form and the id in canonical UUID form
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    created_at, row_id = decode_cursor(cursor, 2)
+    try:
+        if not isinstance(created_at, str) or not isinstance(row_id, str):
+            raise TypeError("Cursor values must be strings")
+        timestamp = FRACTION.sub(lambda match: "." + match.group(1).ljust(6, "0"), created_at, count=1)
+        if timestamp.endswith("Z"):
+            timestamp = timestamp[:-1] + "+00:00"
+        return datetime.fromisoformat(timestamp).isoformat(), str(uuid.UUID(row_id))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Request coalescing for concurrent calls that share a key.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+    
+    The first caller for a key runs the coroutine; callers arriving while it
+    is in flight await the same future instead of starting their own.
+    """
+    
+    def __init__(self):
+        """Initialize the in-flight table and counters."""
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self.max_waiters = 0
+        # Completed executions bucketed by how many callers awaited them
+        self.waiter_counts: Dict[int, int] = {}
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn for key, or join the execution already in flight for it.
+        
+        Args:
+            key: The coalescing key
+            fn: Zero-argument coroutine function producing the result
+        
+        Returns:
+            The result of the (possibly shared) execution
+        """
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+            self._waiters[key] += 1
+            self.max_waiters = max(self.max_waiters, self._waiters[key])
+            # Shield so a cancelled waiter does not cancel the shared call
+            return await asyncio.shield(future)
+        
+        self.executions += 1
+        future = asyncio.ensure_future(fn())
+        future.add_done_callback(lambda done: self._forget(key, done))
+        self._in_flight[key] = future
+        self._waiters[key] = 1
+        return await asyncio.shield(future)
+    
+    def waiters(self, key: Hashable) -> int:
+        """Get the number of callers currently waiting on a key."""
+        return self._waiters.get(key, 0)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get coalescing counters."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": self.shared,
+            "in_flight": len(self._in_flight),
+            "max_waiters": self.max_waiters,
+            "waiter_counts": dict(sorted(self.waiter_counts.items())),
+        }
+    
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        """Remove a finished execution from the in-flight table."""
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+            waiters = self._waiters.pop(key, 1)
+            self.waiter_counts[waiters] = self.waiter_counts.get(waiters, 0) + 1
+        
+        # Mark the exception as retrieved even if every waiter went away
+        if not future.cancelled():
+            future.exception()
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Helpers for streaming prompt enhancements to the client as Server-Sent Events.
+"""
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Section markers the enhancement prompts ask the model to emit
+ENHANCED_PROMPT_MARKER = re.compile(r"enhanced\s+prompt\s*:", re.IGNORECASE)
+EXPLANATION_MARKER = re.compile(r"explanation\s*:", re.IGNORECASE)
+
+# How far back to rescan so a marker split across two deltas is still found
+MARKER_LOOKBACK = 32
+
+class SectionTracker:
+    """
+    Incrementally split a streamed enhancement into its sections.
+    
+    Only the tail of the accumulated text is rescanned on each delta, so
+    tracking stays linear in the length of the response.
+    """
+    
+    def __init__(self):
+        """Initialize an empty tracker."""
+        self.text = ""
+        self.section: Optional[str] = None
+        self._enhanced_start: Optional[int] = None
+        self._explanation_marker: Optional[int] = None
+        self._explanation_start: Optional[int] = None
+    
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        """
+        Add a delta and report any section transitions it completes.
+        
+        Args:
+            delta: The next chunk of generated text
+        
+        Returns:
+            Section events, e.g. {"section": "explanation", "previous": "enhanced_prompt"}
+        """
+        scan_from = max(0, len(self.text) - MARKER_LOOKBACK)
+        self.text += delta
+        text = self.text
+        events = []
+        
+        if self.section is None:
+            match = ENHANCED_PROMPT_MARKER.search(text, scan_from)
+            if match:
+                self.section = "enhanced_prompt"
+                self._enhanced_start = match.end()
+                scan_from = match.end()
+                events.append({"section": "enhanced_prompt", "previous": None})
+        
+        if self.section != "explanation":
+            match = EXPLANATION_MARKER.search(text, max(scan_from, self._enhanced_start or 0))
+            if match:
+                events.append({"section": "explanation", "previous": self.section})
+                self.section = "explanation"
+                self._explanation_marker = match.start()
+                self._explanation_start = match.end()
+        
+        return events
+    
+    def sections(self) -> Dict[str, Optional[str]]:
+        """Get the enhanced prompt and explanation parsed so far."""
+        text = self.text
+        enhanced_prompt = None
+        explanation = None
+        
+        if self._enhanced_start is not None:
+            end = self._explanation_marker if self._explanation_marker is not None else len(text)
+            enhanced_prompt = text[self._enhanced_start:end].strip().strip('"').strip()
+        
+        if self._explanation_start is not None:
+            explanation = text[self._explanation_start:].strip()
+        
+        return {
+            "enhanced_prompt": enhanced_prompt,
+            "explanation": explanation,
+        }
+
+async def stream_enhancement_events(deltas: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Turn completion deltas into delta, section and summary events.
+    
+    Args:
+        deltas: Async iterator of generated text chunks
+    
+    Yields:
+        Event dictionaries with "event" and "data" keys
+    """
+    tracker = SectionTracker()
+    started = time.perf_counter()
+    first_token_ms = None
+    chunks = 0
+    
+    try:
+        async for delta in deltas:
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - started) * 1000
+            chunks += 1
+            
+            yield {"event": "delta", "data": {"text": delta}}
+            
+            for section_event in tracker.feed(delta):
+                yield {"event": "section", "data": section_event}
+    except Exception as e:
+        yield {
+            "event": "error",
+            "data": {
+                "success": False,
+                "error": str(e),
+                "error_type": str(type(e).__name__),
+            },
+        }
+        return
+    
+    yield {
+        "event": "summary",
+        "data": {
+            "success": True,
+            "response": tracker.text,
+            **tracker.sections(),
+            "chunks": chunks,
+            "time_to_first_token_ms": first_token_ms,
+            "duration_ms": (time.perf_counter() - started) * 1000,
+        },
+    }
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serialize an event dictionary as a Server-Sent Events frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+# Headers that keep proxies from buffering the event stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
\ No newline at end of file
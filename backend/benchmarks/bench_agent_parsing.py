@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of agent response parsing: ParsedResponse against the
+previous per-field regex extractors, over recorded agent responses.
+
+Run from the backend directory:
+
+    python benchmarks/bench_agent_parsing.py [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Importing the services package builds the LLM clients; no request is made
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from app.services.agents.parsing import ParsedResponse
+from legacy_parsing import LegacyCriticParser, LegacyEvaluatorParser, LegacyRefinerParser
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "agent_responses.json")
+
+def parse_critic(response):
+    parsed = ParsedResponse(response)
+    return {
+        "confidence": parsed.confidence(0.7),
+        "issues": parsed.issues,
+        "primary_concerns": parsed.primary_concerns,
+        "technical_accuracy": parsed.rating("technical accuracy"),
+        "clarity": parsed.rating("clarity"),
+        "completeness": parsed.rating("completeness"),
+    }
+
+def parse_refiner(response):
+    parsed = ParsedResponse(response)
+    return {
+        "refined_prompt": parsed.refined_prompt,
+        "confidence": parsed.confidence(0.8),
+        "improvements": parsed.improvements,
+    }
+
+def parse_evaluator(response):
+    parsed = ParsedResponse(response)
+    return {
+        "quality_score": parsed.quality_score,
+        "strengths": parsed.strengths,
+        "weaknesses": parsed.weaknesses,
+        "assessment": parsed.assessment,
+    }
+
+PARSERS = {
+    "critic": (LegacyCriticParser().parse, parse_critic),
+    "refiner": (LegacyRefinerParser().parse, parse_refiner),
+    "evaluator": (LegacyEvaluatorParser().parse, parse_evaluator),
+}
+
+def time_parser(parse, responses, repeat):
+    """Microseconds per response, best of three runs."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for response in responses:
+                parse(response)
+        best = min(best, time.perf_counter() - started)
+    return best / (repeat * len(responses)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent response parsing")
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the corpus per run")
+    args = parser.parse_args()
+    
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    
+    print(f"{'agent':<10} {'legacy us':>10} {'parsed us':>10} {'speedup':>8}  differing fields")
+    for agent_type, (legacy, current) in PARSERS.items():
+        responses = corpus[agent_type]
+        legacy_us = time_parser(legacy, responses, args.repeat)
+        current_us = time_parser(current, responses, args.repeat)
+        differing = sorted({
+            field
+            for response in responses
+            for field, value in current(response).items()
+            if legacy(response)[field] != value
+        })
+        print(
+            f"{agent_type:<10} {legacy_us:>10.1f} {current_us:>10.1f} {legacy_us / current_us:>7.1f}x  "
+            f"{', '.join(differing) or '-'}"
+        )
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
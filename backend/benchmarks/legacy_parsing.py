@@ -0,0 +1,342 @@
+"""
+Frozen copy of the regex extractors the agents used before ParsedResponse,
+kept only as the baseline for bench_agent_parsing.py.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+class LegacyCriticParser:
+    """Critic extraction as of the previous release."""
+    
+    def parse(self, response: str) -> Dict[str, Any]:
+        issues = self._extract_issues(response)
+        return {
+            "confidence": self._extract_confidence(response),
+            "issues": issues,
+            "primary_concerns": self._extract_primary_concerns(response),
+            "technical_accuracy": self._extract_rating(response, "technical accuracy"),
+            "clarity": self._extract_rating(response, "clarity"),
+            "completeness": self._extract_rating(response, "completeness"),
+        }
+    
+    def _extract_issues(self, text: str) -> List[str]:
+        """Extract a list of issues from the response text."""
+        issues = []
+        
+        # Look for numbered lists, bullet points, or "Issues:" sections
+        patterns = [
+            r"(?:^|\n)\s*\d+\.\s*(.+?)(?=\n\s*\d+\.|\n\s*\n|$)",  # Numbered list
+            r"(?:^|\n)\s*[-*•]\s*(.+?)(?=\n\s*[-*•]|\n\s*\n|$)",  # Bullet points
+            r"(?:^|\n)Issues:\s*\n\s*(.+?)(?=\n\s*\n|$)",         # Issues section
+        ]
+        
+        for pattern in patterns:
+            matches = re.findall(pattern, text, re.MULTILINE)
+            if matches:
+                issues.extend([match.strip() for match in matches if match.strip()])
+        
+        # If no structured issues found, extract sentences that mention issues/problems
+        if not issues:
+            issue_sentences = re.findall(r"(?:^|\n)([^.\n]+(?:issue|problem|lacks|missing|unclear)[^.\n]+\.)", text)
+            issues.extend([sentence.strip() for sentence in issue_sentences if sentence.strip()])
+        
+        return issues
+    
+    def _extract_confidence(self, text: str) -> float:
+        """Extract the confidence level from the response text."""
+        # Look for explicit confidence indicators
+        confidence_match = re.search(r"[Cc]onfidence:?\s*(\d+(?:\.\d+)?)", text)
+        if confidence_match:
+            try:
+                return float(confidence_match.group(1))
+            except ValueError:
+                pass
+        
+        # Look for qualitative indicators
+        if re.search(r"(?:high confidence|very confident|certain)", text, re.IGNORECASE):
+            return 0.9
+        elif re.search(r"(?:moderate confidence|somewhat confident)", text, re.IGNORECASE):
+            return 0.7
+        elif re.search(r"(?:low confidence|not confident|uncertain)", text, re.IGNORECASE):
+            return 0.5
+        
+        # Default confidence
+        return 0.7
+    
+    def _extract_primary_concerns(self, text: str) -> List[str]:
+        """Extract the primary concerns from the response text."""
+        # Look for explicit primary concerns
+        primary_concerns_section = re.search(r"(?:^|\n)(?:Primary|Main|Key) [Cc]oncerns?:?\s*\n(.+?)(?=\n\s*\n|$)", text, re.DOTALL)
+        if primary_concerns_section:
+            concerns_text = primary_concerns_section.group(1).strip()
+            # Extract individual concerns
+            concerns = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", concerns_text, re.MULTILINE)
+            if concerns:
+                return [concern.strip() for concern in concerns if concern.strip()]
+        
+        # Fallback: use the first 1-2 issues as primary concerns
+        issues = self._extract_issues(text)
+        return issues[:min(2, len(issues))]
+    
+    def _extract_rating(self, text: str, aspect: str) -> float:
+        """Extract a numeric rating for a specific aspect."""
+        # Look for ratings in the format "Aspect: X/Y" or "Aspect: X out of Y"
+        rating_match = re.search(
+            rf"{aspect}:?\s*(\d+(?:\.\d+)?)\s*(?:\/|out of)\s*(\d+(?:\.\d+)?)",
+            text,
+            re.IGNORECASE
+        )
+        
+        if rating_match:
+            try:
+                numerator = float(rating_match.group(1))
+                denominator = float(rating_match.group(2))
+                if denominator > 0:
+                    return numerator / denominator
+            except (ValueError, ZeroDivisionError):
+                pass
+        
+        # Look for percentage ratings
+        percentage_match = re.search(
+            rf"{aspect}:?\s*(\d+(?:\.\d+)?)\s*%",
+            text,
+            re.IGNORECASE
+        )
+        
+        if percentage_match:
+            try:
+                return float(percentage_match.group(1)) / 100.0
+            except ValueError:
+                pass
+        
+        # Default ratings based on positive/negative language for this aspect
+        text_lower = text.lower()
+        aspect_lower = aspect.lower()
+        
+        if re.search(rf"{aspect_lower}.*(?:excellent|great|very good|strong)", text_lower):
+            return 0.9
+        elif re.search(rf"{aspect_lower}.*(?:good|solid)", text_lower):
+            return 0.8
+        elif re.search(rf"{aspect_lower}.*(?:adequate|acceptable|fair)", text_lower):
+            return 0.6
+        elif re.search(rf"{aspect_lower}.*(?:poor|weak|inadequate|low)", text_lower):
+            return 0.4
+        elif re.search(rf"{aspect_lower}.*(?:very poor|very weak|terrible)", text_lower):
+            return 0.2
+        
+        # Default to a neutral rating
+        return 0.5
+
+class LegacyRefinerParser:
+    """Refiner extraction as of the previous release."""
+    
+    def parse(self, response: str) -> Dict[str, Any]:
+        return {
+            "refined_prompt": self._extract_refined_prompt(response),
+            "confidence": self._extract_confidence(response),
+            "improvements": self._extract_improvements(response),
+        }
+    
+    def _extract_refined_prompt(self, text: str) -> Optional[str]:
+        """Extract the refined prompt from the response text."""
+        # Look for explicit refined prompt sections
+        refined_patterns = [
+            r"(?:^|\n)(?:Refined|Improved|Enhanced|Final) [Pp]rompt:?\s*\"?([^\"]+)\"?(?=\n|$)",
+            r"(?:^|\n)\"([^\"]+)\"(?=\n|$)",  # Quoted text that might be the prompt
+        ]
+        
+        for pattern in refined_patterns:
+            match = re.search(pattern, text, re.MULTILINE | re.DOTALL)
+            if match:
+                return match.group(1).strip()
+        
+        # If no explicit sections, look for the last paragraph that looks like a prompt
+        paragraphs = re.split(r"\n\s*\n", text)
+        for paragraph in reversed(paragraphs):
+            # Skip paragraphs that look like analysis or confidence statements
+            if re.search(r"(?:confidence|analysis|suggest|improv)", paragraph, re.IGNORECASE):
+                continue
+            
+            # Skip very short paragraphs
+            if len(paragraph) < 30:
+                continue
+            
+            # This might be the prompt
+            return paragraph.strip()
+        
+        return None
+    
+    def _extract_confidence(self, text: str) -> float:
+        """Extract the confidence level from the response text."""
+        # Look for explicit confidence indicators
+        confidence_match = re.search(r"[Cc]onfidence:?\s*(\d+(?:\.\d+)?)", text)
+        if confidence_match:
+            try:
+                return float(confidence_match.group(1))
+            except ValueError:
+                pass
+        
+        # Look for qualitative indicators
+        if re.search(r"(?:high confidence|very confident|certain)", text, re.IGNORECASE):
+            return 0.9
+        elif re.search(r"(?:moderate confidence|somewhat confident)", text, re.IGNORECASE):
+            return 0.7
+        elif re.search(r"(?:low confidence|not confident|uncertain)", text, re.IGNORECASE):
+            return 0.5
+        
+        # Default confidence
+        return 0.8
+    
+    def _extract_improvements(self, text: str) -> List[str]:
+        """Extract a list of improvements from the response text."""
+        improvements = []
+        
+        # Look for sections describing improvements
+        improvement_section = re.search(
+            r"(?:^|\n)(?:Changes|Improvements|Enhancements) made:?\s*\n((?:.+\n)+)",
+            text,
+            re.IGNORECASE
+        )
+        
+        if improvement_section:
+            section_text = improvement_section.group(1)
+            # Extract individual improvements
+            items = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", section_text, re.MULTILINE)
+            if items:
+                improvements.extend([item.strip() for item in items if item.strip()])
+        
+        # If no structured improvements found, look for sentences about improvements
+        if not improvements:
+            improve_sentences = re.findall(
+                r"(?:^|\n)([^.\n]+(?:improve|enhance|add|change|clarify|specify)[^.\n]+\.)",
+                text
+            )
+            improvements.extend([sentence.strip() for sentence in improve_sentences if sentence.strip()])
+        
+        return improvements
+
+class LegacyEvaluatorParser:
+    """Evaluator extraction as of the previous release."""
+    
+    def parse(self, response: str) -> Dict[str, Any]:
+        return {
+            "quality_score": self._extract_quality_score(response),
+            "strengths": self._extract_strengths(response),
+            "weaknesses": self._extract_weaknesses(response),
+            "assessment": self._extract_assessment(response),
+        }
+    
+    def _extract_quality_score(self, text: str) -> float:
+        """Extract the quality score from the response text."""
+        # Look for explicit quality score indicators
+        score_patterns = [
+            r"[Qq]uality [Ss]core:?\s*(\d+(?:\.\d+)?)",
+            r"[Ss]core:?\s*(\d+(?:\.\d+)?)",
+            r"[Rr]ating:?\s*(\d+(?:\.\d+)?)\s*\/\s*1",
+        ]
+        
+        for pattern in score_patterns:
+            score_match = re.search(pattern, text)
+            if score_match:
+                try:
+                    return float(score_match.group(1))
+                except ValueError:
+                    pass
+        
+        # Look for percentage scores
+        percentage_match = re.search(r"(\d+(?:\.\d+)?)\s*%", text)
+        if percentage_match:
+            try:
+                return float(percentage_match.group(1)) / 100.0
+            except ValueError:
+                pass
+        
+        # Analyze qualitative assessment
+        if re.search(r"(?:excellent|outstanding|exceptional)", text, re.IGNORECASE):
+            return 0.9
+        elif re.search(r"(?:good|strong|solid)", text, re.IGNORECASE):
+            return 0.8
+        elif re.search(r"(?:adequate|satisfactory|acceptable)", text, re.IGNORECASE):
+            return 0.7
+        elif re.search(r"(?:moderate|fair|average)", text, re.IGNORECASE):
+            return 0.6
+        elif re.search(r"(?:weak|poor|inadequate)", text, re.IGNORECASE):
+            return 0.4
+        
+        # Default quality score
+        return 0.7
+    
+    def _extract_strengths(self, text: str) -> List[str]:
+        """Extract a list of strengths from the response text."""
+        strengths = []
+        
+        # Look for strengths section
+        strengths_section = re.search(
+            r"(?:^|\n)(?:Strengths|Positive aspects|Pros|What works well):?\s*\n((?:.+\n)+)",
+            text,
+            re.IGNORECASE | re.MULTILINE
+        )
+        
+        if strengths_section:
+            section_text = strengths_section.group(1)
+            # Extract individual strengths
+            items = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", section_text, re.MULTILINE)
+            if items:
+                strengths.extend([item.strip() for item in items if item.strip()])
+        
+        # If no structured strengths found, look for sentences about strengths
+        if not strengths:
+            strength_sentences = re.findall(
+                r"(?:^|\n)([^.\n]+(?:strength|positive|good|excellent|well done)[^.\n]+\.)",
+                text
+            )
+            strengths.extend([sentence.strip() for sentence in strength_sentences if sentence.strip()])
+        
+        return strengths
+    
+    def _extract_weaknesses(self, text: str) -> List[str]:
+        """Extract a list of weaknesses from the response text."""
+        weaknesses = []
+        
+        # Look for weaknesses section
+        weaknesses_section = re.search(
+            r"(?:^|\n)(?:Weaknesses|Negative aspects|Cons|Areas for improvement|Suggestions):?\s*\n((?:.+\n)+)",
+            text,
+            re.IGNORECASE | re.MULTILINE
+        )
+        
+        if weaknesses_section:
+            section_text = weaknesses_section.group(1)
+            # Extract individual weaknesses
+            items = re.findall(r"(?:^|\n)\s*[-*•\d.]\s*(.+?)(?=\n\s*[-*•\d.]|\n\s*\n|$)", section_text, re.MULTILINE)
+            if items:
+                weaknesses.extend([item.strip() for item in items if item.strip()])
+        
+        # If no structured weaknesses found, look for sentences about weaknesses
+        if not weaknesses:
+            weakness_sentences = re.findall(
+                r"(?:^|\n)([^.\n]+(?:weakness|negative|issue|problem|improve|suggest)[^.\n]+\.)",
+                text
+            )
+            weaknesses.extend([sentence.strip() for sentence in weakness_sentences if sentence.strip()])
+        
+        return weaknesses
+    
+    def _extract_assessment(self, text: str) -> Optional[str]:
+        """Extract the overall assessment from the response text."""
+        # Look for assessment section
+        assessment_section = re.search(
+            r"(?:^|\n)(?:Overall [Aa]ssessment|[Aa]ssessment|[Ee]valuation|[Ss]ummary):?\s*\n((?:.+\n)+?)(?=\n\s*\n|$)",
+            text,
+            re.IGNORECASE | re.MULTILINE
+        )
+        
+        if assessment_section:
+            return assessment_section.group(1).strip()
+        
+        # If no structured assessment found, use the first paragraph
+        paragraphs = re.split(r"\n\s*\n", text)
+        if paragraphs:
+            return paragraphs[0].strip()
+        
+        return None
\ No newline at end of file
@@ -1,11 +1,12 @@
 import os
 import uuid
+import asyncio
 import traceback
 import uvicorn
 from typing import Dict, List, Optional, Union, Any
 from pydantic import BaseModel, Field
-from fastapi import FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from openai import OpenAI
@@ -14,6 +15,13 @@ from agents.refiner import RefinerAgent
 from agents.evaluator import EvaluatorAgent
 from agents.config import ROLE_CONFIGS, BASE_CONFIG
 from supabase import create_client
+from app.services.client_registry import client_registry
+from app.services.api_key_cache import api_key_cache
+from app.services.llm_client import iter_completion_deltas, hedge_policy
+from app.services.provider_router import provider_router
+from app.services.response_cache import response_cache, make_cache_key, wants_cache_bypass
+from app.utils.singleflight import SingleFlight
+from app.utils.streaming import stream_enhancement_events, format_sse, SSE_HEADERS
 
 # Load environment variables from root .env file explicitly
 root_env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
@@ -47,6 +55,53 @@ openai_client = OpenAI(
     # Use default OpenAI base URL
 )
 
+# Providers users can store keys for in user_api_keys, with display names
+PROVIDER_NAMES = {"deepseek": "DeepSeek", "openai": "OpenAI"}
+
+# Process-wide Supabase client, created on first use
+supabase_client = None
+
+def get_supabase_client():
+    """Return the shared Supabase client, creating it on first use."""
+    global supabase_client
+    if supabase_client is not None:
+        return supabase_client
+    
+    supabase_url = os.getenv('VITE_SUPABASE_URL')
+    supabase_key = os.getenv('VITE_SUPABASE_ANON_KEY')
+    
+    if not supabase_url or not supabase_key:
+        print(f"ERROR: Missing Supabase configuration - URL: {supabase_url}, Key: {supabase_key[:10] if supabase_key else None}")
+        return None
+    
+    print(f"Creating Supabase client with URL: {supabase_url}")
+    # Check if we have a service role key for higher privileges (recommended for accessing sensitive data)
+    service_role_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    if service_role_key:
+        print("Using service role key for database access (higher privileges)")
+        supabase_client = create_client(supabase_url, service_role_key)
+    else:
+        print("WARNING: Using anon key for database access - service role key recommended for API key retrieval")
+        # Fall back to anon key if service role key not available
+        supabase_client = create_client(supabase_url, supabase_key)
+    
+    return supabase_client
+
+async def fetch_user_api_keys(user_id: str) -> Optional[Dict[str, Any]]:
+    """Load a user's API key record from Supabase without blocking the event loop."""
+    client = get_supabase_client()
+    api_keys_result = await asyncio.to_thread(
+        lambda: client.table('user_api_keys').select(
+            'openai_api_key, deepseek_api_key'
+        ).eq('user_id', user_id).execute()
+    )
+    
+    print(f"API keys query returned {len(api_keys_result.data or [])} row(s) for user ID: {user_id}")
+    
+    if api_keys_result.data and len(api_keys_result.data) > 0:
+        return api_keys_result.data[0]
+    return None
+
 app = FastAPI(
     title="Prompt Engineering Multi-Agent API",
     description="API for processing prompts through a multi-agent system using AutoGen",
@@ -100,7 +155,8 @@ async def root():
         "status": "online",
         "endpoints": {
             "process-prompt": "/process-prompt (POST)",
-            "normal-prompt": "/normal-prompt (POST)"
+            "normal-prompt": "/normal-prompt (POST)",
+            "normal-prompt-stream": "/normal-prompt/stream (POST, text/event-stream)"
         },
         "available_roles": list(ROLE_CONFIGS.keys())
     }
@@ -179,18 +235,34 @@ async def test_api(provider: str = "deepseek"):
             "api_key_configured": bool(deepseek_api_key if provider == "deepseek" else openai_api_key)
         }
 
+@app.get("/metrics")
+async def metrics():
+    """Expose in-process cache and pool counters."""
+    return {
+        "client_registry": client_registry.stats(),
+        "api_key_cache": api_key_cache.stats(),
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "normal_prompt_coalescing": normal_prompt_flights.stats(),
+        "provider_router": provider_router.stats(),
+        "hedging": hedge_policy.stats(),
+    }
+
 class PromptRequest(BaseModel):
     prompt: str
     role: str
     model: str
     sessionId: str
     provider: str = "deepseek"  # Add provider field with default value
+    bypassCache: bool = False  # Skip the response cache and fetch a fresh enhancement
 
 class AgentMessage(BaseModel):
     type: str
     content: str
     metadata: dict
 
+class ApiKeyInvalidationRequest(BaseModel):
+    sessionId: str
+
 class PromptResponse(BaseModel):
     success: bool
     messages: List[AgentMessage]
@@ -202,15 +274,116 @@ class NormalPromptResponse(BaseModel):
     response: str
     error: Optional[str] = None
 
+async def verify_access_token(authorization: Optional[str]) -> Optional[str]:
+    """Return the Supabase user ID for a bearer access token, or None if it is missing or invalid."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    client = get_supabase_client()
+    if client is None:
+        return None
+    
+    try:
+        response = await asyncio.to_thread(client.auth.get_user, authorization[7:].strip())
+    except Exception as e:
+        print(f"Access token verification failed: {str(e)}")
+        return None
+    user = getattr(response, "user", None)
+    return user.id if user else None
+
+@app.post("/api-keys/invalidate")
+async def invalidate_api_keys(
+    request: ApiKeyInvalidationRequest,
+    authorization: Optional[str] = Header(None)
+):
+    """Drop the signed-in user's cached API keys after they update them in settings."""
+    user_id = await verify_access_token(authorization)
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid access token")
+    if user_id != request.sessionId:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot invalidate another user's API keys")
+    
+    previous_keys = api_key_cache.invalidate(request.sessionId)
+    
+    # Drop the pooled clients bound to the old keys as well
+    if previous_keys:
+        for provider in PROVIDER_NAMES:
+            old_key = previous_keys.get(f"{provider}_api_key")
+            if old_key:
+                client_registry.invalidate(provider, old_key)
+    
+    return {"success": True, "invalidated": previous_keys is not None}
+
 # Add an OPTIONS route handler to explicitly handle preflight requests
 @app.options("/normal-prompt")
 async def normal_prompt_options():
     """Handle OPTIONS preflight requests for normal-prompt endpoint."""
     return {}  # FastAPI will automatically add CORS headers
 
-@app.post("/normal-prompt")
-async def normal_prompt(request: PromptRequest) -> NormalPromptResponse:
-    """Process a prompt directly using the specified AI model."""
+# Coalesces identical /normal-prompt completions that are in flight at the same time
+normal_prompt_flights = SingleFlight()
+
+def backend_client(prepared: Dict[str, Any], backend, final: bool):
+    """Get the user's client for a backend, without retries when another backend can take over."""
+    client = prepared["clients"][backend.provider]
+    return client if final else client.with_options(max_retries=0)
+
+def alternate_order(backends):
+    """Backend order for a hedge: start on the next backend, or the same one if it is the only one."""
+    return backends[1:] + backends[:1]
+
+async def routed_completion(prepared: Dict[str, Any]):
+    """
+    Create the completion on the first of the request's backends that answers.
+    When hedging is enabled, a slow call is raced by one on the next backend.
+    """
+    async def attempt(backend, final):
+        client = backend_client(prepared, backend, final)
+        return await client.chat.completions.create(model=backend.model, **prepared["completion"])
+    
+    backends = prepared["backends"]
+    return await hedge_policy.run(
+        "normal_prompt",
+        lambda: provider_router.call(backends, attempt),
+        lambda: provider_router.call(alternate_order(backends), attempt)
+    )
+
+async def routed_deltas(prepared: Dict[str, Any]):
+    """
+    Stream the completion from the first backend that produces a token.
+    Failover and hedging are only possible before the first token reaches the client.
+    """
+    async def attempt(backend, final):
+        deltas = iter_completion_deltas(
+            backend_client(prepared, backend, final), model=backend.model, **prepared["completion"]
+        )
+        try:
+            return await deltas.__anext__(), deltas
+        except StopAsyncIteration:
+            return None, deltas
+    
+    async def close_stream(opened):
+        await opened[0][1].aclose()
+    
+    backends = prepared["backends"]
+    (first, deltas), _ = await hedge_policy.run(
+        "normal_prompt_first_token",
+        lambda: provider_router.call(backends, attempt, record_latency=False),
+        lambda: provider_router.call(alternate_order(backends), attempt, record_latency=False),
+        discard=close_stream
+    )
+    try:
+        if first is not None:
+            yield first
+        async for delta in deltas:
+            yield delta
+    finally:
+        await deltas.aclose()
+
+async def prepare_normal_prompt(request: PromptRequest) -> Union[NormalPromptResponse, Dict[str, Any]]:
+    """
+    Resolve the user's provider client and build the completion request.
+    Returns a failed NormalPromptResponse if the request cannot be served.
+    """
     try:
         # Validate role
         if request.role not in ROLE_CONFIGS:
@@ -230,79 +403,38 @@ async def normal_prompt(request: PromptRequest) -> NormalPromptResponse:
         print(f"Using provider: {provider}")
         print(f"Selected model for prompt optimization: {request.model}")
         
-        # Initialize provider clients to None
-        user_deepseek_client = None
-        user_openai_client = None
+        # Provider clients for the keys the user has, keyed by provider
+        user_clients = {}
         
         # Get user ID from session if available
         user_id = None
         if request.sessionId:
             try:
-                # Try to extract user ID from session
-                supabase_url = os.getenv('VITE_SUPABASE_URL')
-                supabase_key = os.getenv('VITE_SUPABASE_ANON_KEY')
-                
-                if not supabase_url or not supabase_key:
-                    print(f"ERROR: Missing Supabase configuration - URL: {supabase_url}, Key: {supabase_key[:10] if supabase_key else None}")
+                # Reuse the process-wide Supabase client
+                if get_supabase_client() is None:
                     return NormalPromptResponse(
                         success=False,
                         response="",
                         error="Server configuration error: Missing Supabase credentials"
                     )
                 
-                print(f"Creating Supabase client with URL: {supabase_url}")
-                # Check if we have a service role key for higher privileges (recommended for accessing sensitive data)
-                service_role_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-                if service_role_key:
-                    print("Using service role key for database access (higher privileges)")
-                    supabase_client = create_client(supabase_url, service_role_key)
-                else:
-                    print("WARNING: Using anon key for database access - service role key recommended for API key retrieval")
-                    # Fall back to anon key if service role key not available
-                    supabase_client = create_client(supabase_url, supabase_key)
-                
                 # Use the session ID directly as the user ID
                 user_id = request.sessionId
                 print(f"Using session ID as user_id: {user_id}")
                 
-                # Retrieve the user's API keys
+                # Retrieve the user's API keys (served from the per-user cache when fresh)
                 try:
-                    api_keys_result = supabase_client.table('user_api_keys').select(
-                        'openai_api_key, deepseek_api_key'
-                    ).eq('user_id', user_id).execute()
-                    
-                    print(f"API keys query result: {api_keys_result}")
+                    user_api_keys = await api_key_cache.get(user_id, fetch_user_api_keys)
                     
-                    if api_keys_result.data and len(api_keys_result.data) > 0:
-                        user_api_keys = api_keys_result.data[0]
+                    if user_api_keys:
                         print(f"Found user API keys: OpenAI: {'Yes' if user_api_keys.get('openai_api_key') else 'No'}, DeepSeek: {'Yes' if user_api_keys.get('deepseek_api_key') else 'No'}")
                         
-                        # Use the user's API key based on the provider
-                        if provider == "deepseek":
-                            if user_api_keys.get('deepseek_api_key'):
-                                user_deepseek_key = user_api_keys.get('deepseek_api_key')
-                                user_deepseek_client = OpenAI(api_key=user_deepseek_key, base_url="https://api.deepseek.com/v1")
-                                print(f"Using user's DeepSeek API key: {user_deepseek_key[:5]}...")
-                            else:
-                                print("User has no DeepSeek API key")
-                                return NormalPromptResponse(
-                                    success=False,
-                                    response="",
-                                    error="You need to add your DeepSeek API key in settings to use DeepSeek models"
-                                )
-                                
-                        elif provider == "openai":
-                            if user_api_keys.get('openai_api_key'):
-                                user_openai_key = user_api_keys.get('openai_api_key')
-                                user_openai_client = OpenAI(api_key=user_openai_key)
-                                print(f"Using user's OpenAI API key: {user_openai_key[:5]}...")
-                            else:
-                                print("User has no OpenAI API key")
-                                return NormalPromptResponse(
-                                    success=False,
-                                    response="",
-                                    error="You need to add your OpenAI API key in settings to use OpenAI models"
-                                )
+                        # Bind a pooled client to every key the user has
+                        for name in PROVIDER_NAMES:
+                            user_key = user_api_keys.get(f"{name}_api_key")
+                            if user_key:
+                                user_clients[name] = client_registry.get_client(name, user_key)
+                                print(f"Using user's {PROVIDER_NAMES[name]} API key: {user_key[:5]}...")
                     else:
                         print(f"No API keys found for user ID: {user_id}")
                         return NormalPromptResponse(
@@ -335,26 +467,25 @@ async def normal_prompt(request: PromptRequest) -> NormalPromptResponse:
                 error="No session ID provided. Please log in to use this feature."
             )
         
-        # Select the appropriate client based on provider
-        client = None
-        if provider == "deepseek":
-            # Use user's client (we've validated it exists above)
-            client = user_deepseek_client
-            api_model = "deepseek-chat"  # Model to use with DeepSeek API
-            print(f"Using DeepSeek client with model: {api_model}")
-        elif provider == "openai":
-            # Use user's client (we've validated it exists above)
-            client = user_openai_client
-            api_model = "gpt-4o-mini"  # Model to use with OpenAI API
-            print(f"Using OpenAI client with model: {api_model}")
-        else:
+        if provider not in PROVIDER_NAMES:
             return NormalPromptResponse(
                 success=False,
                 response="",
                 error=f"Unknown provider: {provider}"
             )
         
-        print(f"Using {provider.upper()} for this request")
+        # Order the user's backends by health and latency (only the requested
+        # provider when routing is "fixed")
+        backends = provider_router.route(user_clients, preferred=provider)
+        if not backends:
+            print(f"User has no {PROVIDER_NAMES[provider]} API key")
+            return NormalPromptResponse(
+                success=False,
+                response="",
+                error=f"You need to add your {PROVIDER_NAMES[provider]} API key in settings to use {PROVIDER_NAMES[provider]} models"
+            )
+        
+        print(f"Routing {provider.upper()} request to: {', '.join(f'{b.provider}/{b.model}' for b in backends)}")
         
         # Construct system message from role config
         system_message = role_config.get("system_message", "")
@@ -368,11 +499,12 @@ async def normal_prompt(request: PromptRequest) -> NormalPromptResponse:
         print(f"System message: {system_message[:50]}...")
         print(f"User prompt: {user_prompt[:50]}...")
         
-        try:
-            # Create the completion using the selected client
-            response = client.chat.completions.create(
-                model=api_model,
-                messages=[
+        return {
+            "clients": user_clients,
+            "backends": backends,
+            "provider": provider,
+            "completion": {
+                "messages": [
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": f"""Please enhance the following prompt:
 
@@ -380,30 +512,10 @@ async def normal_prompt(request: PromptRequest) -> NormalPromptResponse:
 
 Remember to strictly follow the format specified in your instructions, with separate 'Enhanced Prompt:' and 'Explanation:' sections."""}
                 ],
-                temperature=0.5,  # Lower temperature for more consistent formatting
-                max_tokens=1500
-            )
-            
-            # Extract the response
-            response_text = response.choices[0].message.content
-            
-            print(f"Received response from {provider} (first 100 chars): {response_text[:100]}...")
-            
-            return NormalPromptResponse(
-                success=True,
-                response=response_text,
-                error=None
-            )
-        except Exception as api_error:
-            # Log detailed API error
-            print(f"ERROR in {provider} API call: {str(api_error)}")
-            print(f"API error type: {type(api_error).__name__}")
-            
-            return NormalPromptResponse(
-                success=False,
-                response="",
-                error=f"{provider.upper()} API Error: {str(api_error)}"
-            )
+                "temperature": 0.5,  # Lower temperature for more consistent formatting
+                "max_tokens": 1500
+            }
+        }
     except Exception as e:
         print(f"General error in normal_prompt: {str(e)}")
         return NormalPromptResponse(
@@ -412,6 +524,107 @@ Remember to strictly follow the format specified in your instructions, with sepa
             error=f"Error: {str(e)}"
         )
 
+@app.post("/normal-prompt")
+async def normal_prompt(
+    request: PromptRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None)
+) -> NormalPromptResponse:
+    """Process a prompt directly using the specified AI model."""
+    prepared = await prepare_normal_prompt(request)
+    if isinstance(prepared, NormalPromptResponse):
+        return prepared
+    
+    provider = prepared["provider"]
+    completion = prepared["completion"]
+    
+    # Serve repeated prompts from the response cache unless the client opted out;
+    # the key names every backend the request may be routed to, so it does not
+    # change with the latency order
+    cache_key = make_cache_key(
+        request.prompt,
+        request.role,
+        provider,
+        ",".join(sorted(f"{b.provider}:{b.model}" for b in prepared["backends"])),
+        completion["temperature"],
+        completion["messages"][0]["content"]
+    )
+    if response_cache is not None:
+        if wants_cache_bypass(request.bypassCache, cache_control):
+            response_cache.record_bypass()
+            response.headers.update(response_cache.headers("BYPASS"))
+        else:
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                print(f"Serving {provider} response from cache")
+                response.headers.update(response_cache.headers("HIT"))
+                return NormalPromptResponse(**cached)
+            response.headers.update(response_cache.headers("MISS"))
+    
+    try:
+        # Create the completion on the fastest healthy backend, failing over on errors
+        # Identical requests with the same provider clients share one in-flight call
+        clients = tuple(sorted(id(client) for client in prepared["clients"].values()))
+        completion_response, backend = await normal_prompt_flights.do(
+            (cache_key, clients),
+            lambda: routed_completion(prepared)
+        )
+        
+        # Extract the response
+        response_text = completion_response.choices[0].message.content
+        
+        print(f"Received response from {backend.provider} (first 100 chars): {response_text[:100]}...")
+        
+        result = NormalPromptResponse(
+            success=True,
+            response=response_text,
+            error=None
+        )
+        
+        if response_cache is not None:
+            await response_cache.set(cache_key, result.dict())
+        
+        return result
+    except Exception as api_error:
+        # Log detailed API error
+        print(f"ERROR in {provider} API call: {str(api_error)}")
+        print(f"API error type: {type(api_error).__name__}")
+        
+        return NormalPromptResponse(
+            success=False,
+            response="",
+            error=f"{provider.upper()} API Error: {str(api_error)}"
+        )
+
+@app.options("/normal-prompt/stream")
+async def normal_prompt_stream_options():
+    """Handle OPTIONS preflight requests for the streaming normal-prompt endpoint."""
+    return {}
+
+@app.post("/normal-prompt/stream")
+async def normal_prompt_stream(request: PromptRequest):
+    """
+    Stream a prompt enhancement as Server-Sent Events.
+    Emits `delta` events with token chunks, a `section` event when the response
+    moves from 'Enhanced Prompt:' to 'Explanation:', and a final `summary` event.
+    """
+    prepared = await prepare_normal_prompt(request)
+    
+    async def event_stream():
+        if isinstance(prepared, NormalPromptResponse):
+            yield format_sse({"event": "error", "data": prepared.dict()})
+            return
+        
+        deltas = routed_deltas(prepared)
+        async for event in stream_enhancement_events(deltas):
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @app.post("/process-prompt")
 async def process_prompt(request: PromptRequest) -> PromptResponse:
     """Process a prompt through the multi-agent system."""
@@ -36,8 +36,27 @@ CREATE TABLE IF NOT EXISTS public.prompt_history (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
 );
 
--- Create index on user_id for faster queries
-CREATE INDEX IF NOT EXISTS prompt_history_user_id_idx ON public.prompt_history(user_id);
+-- Short previews so history lists do not transfer full prompt bodies
+ALTER TABLE public.prompt_history
+    ADD COLUMN IF NOT EXISTS original_preview TEXT GENERATED ALWAYS AS (left(original_prompt, 160)) STORED,
+    ADD COLUMN IF NOT EXISTS enhanced_preview TEXT GENERATED ALWAYS AS (left(enhanced_prompt, 160)) STORED;
+
+-- Keyset pagination of a user's history, newest first, with and without a
+-- role filter; the first index also serves plain user_id lookups
+CREATE INDEX IF NOT EXISTS prompt_history_user_created_idx
+    ON public.prompt_history(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS prompt_history_user_role_created_idx
+    ON public.prompt_history(user_id, role, created_at DESC, id DESC);
+DROP INDEX IF EXISTS public.prompt_history_user_id_idx;
+
+-- Full-text search over both prompts; original prompt matches rank higher
+ALTER TABLE public.prompt_history
+    ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(original_prompt, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(enhanced_prompt, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS prompt_history_search_idx
+    ON public.prompt_history USING GIN (search_vector);
 CREATE INDEX IF NOT EXISTS user_api_keys_user_id_idx ON public.user_api_keys(user_id);
 
 -- Enable RLS on tables
@@ -117,6 +136,40 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
+-- Create a function to search prompt history, best matches first
+CREATE OR REPLACE FUNCTION public.search_prompt_history(
+    p_user_id UUID,
+    p_query TEXT,
+    p_role TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+) RETURNS TABLE (
+    id UUID,
+    created_at TIMESTAMP WITH TIME ZONE,
+    role TEXT,
+    success BOOLEAN,
+    original_preview TEXT,
+    enhanced_preview TEXT,
+    rank REAL
+) AS $$
+    SELECT
+        h.id,
+        h.created_at,
+        h.role,
+        h.success,
+        h.original_preview,
+        h.enhanced_preview,
+        ts_rank_cd(h.search_vector, q) AS rank
+    FROM public.prompt_history h,
+        websearch_to_tsquery('english', p_query) q
+    WHERE h.user_id = p_user_id
+        AND h.search_vector @@ q
+        AND (p_role IS NULL OR h.role = p_role)
+    ORDER BY rank DESC, h.created_at DESC, h.id DESC
+    LIMIT p_limit
+    OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
 -- Create a function to save user API keys
 CREATE OR REPLACE FUNCTION public.save_user_api_keys(
     p_user_id UUID,
@@ -13,6 +13,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.main import app
 from app.core.config import settings
 from app.services import llm_client
+from app.services.response_cache import response_cache
+from app.services.semantic_cache import semantic_cache
 
 # Create a test client fixture
 @pytest.fixture
@@ -20,6 +22,16 @@ def client():
     """Create a test client for FastAPI."""
     return TestClient(app)
 
+# Start every test with empty response caches
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Clear the global response caches so cached results do not leak between tests."""
+    if response_cache is not None:
+        response_cache.clear()
+    if semantic_cache is not None:
+        semantic_cache.clear()
+    yield
+
 # Mock LLM client fixture
 @pytest.fixture
 def mock_llm_client(monkeypatch):
@@ -47,12 +59,36 @@ def mock_llm_client(monkeypatch):
                 }
             }
         
+        async def agenerate_completion(self, messages, model=None, temperature=None, max_tokens=None):
+            """Async variant of the mock completion used by the async LLM client."""
+            return self.generate_completion(messages, model, temperature, max_tokens)
+        
+        async def astream_completion(self, messages, model=None, temperature=None, max_tokens=None):
+            """Mock streaming completion that yields a formatted enhancement in small chunks."""
+            self.calls.append({
+                "messages": messages,
+                "model": model,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            })
+            
+            text = "Enhanced prompt: Build a responsive CSS grid layout.\nExplanation: Added specifics."
+            for i in range(0, len(text), 7):
+                yield text[i:i + 7]
+        
         def get_calls(self):
             """Get the list of recorded calls."""
             return self.calls
 
     mock_client = MockLLMClient()
     monkeypatch.setattr("app.services.llm_client", mock_client)
+    # The services package re-exports instances under the module names, so
+    # patch the modules themselves via sys.modules
+    monkeypatch.setattr(sys.modules["app.services.prompt_processor"], "async_llm_client", mock_client)
+    monkeypatch.setattr("app.api.endpoints.async_llm_client", mock_client)
+    monkeypatch.setattr("app.services.agents.base.async_llm_client", mock_client)
+    # Agents only reach the async client on the direct engine
+    monkeypatch.setattr(settings, "AGENT_ENGINE", "direct")
     return mock_client
 
 # Test roles fixture
@@ -0,0 +1,79 @@
+"""
+Unit tests for the shared agent response tokenizer.
+"""
+from app.services.agents.parsing import ParsedResponse, split_candidates
+
+def test_sections_are_read_from_their_headings():
+    """Lists come from their own section, not from every list in the response."""
+    parsed = ParsedResponse(
+        "**Issues:**\n"
+        "- No framework named\n"
+        "- No audience\n"
+        "\n"
+        "**Key Concerns:**\n"
+        "- No framework named\n"
+        "\n"
+        "Clarity: 4/10\n"
+        "Technical accuracy: 80%\n"
+        "Completeness is weak overall.\n"
+        "\n"
+        "Confidence: 0.85"
+    )
+    
+    assert parsed.issues == ["No framework named", "No audience"]
+    assert parsed.primary_concerns == ["No framework named"]
+    assert parsed.rating("clarity") == 0.4
+    assert parsed.rating("technical accuracy") == 0.8
+    assert parsed.rating("completeness") == 0.4
+    assert parsed.confidence(0.7) == 0.85
+
+def test_refined_prompt_stops_at_the_next_section():
+    """A labeled refined prompt should not swallow the lines after it."""
+    parsed = ParsedResponse(
+        "## Final Prompt:\n"
+        "Reduce the p95 latency of the nightly ETL job to under one hour.\n"
+        "Confidence: 0.8\n"
+        "\n"
+        "Changes made:\n"
+        "1. Named the metric\n"
+        "2. Added a target"
+    )
+    
+    assert parsed.refined_prompt == "Reduce the p95 latency of the nightly ETL job to under one hour."
+    assert parsed.improvements == ["Named the metric", "Added a target"]
+    assert parsed.confidence(0.8) == 0.8
+
+def test_evaluation_fields_and_fallbacks():
+    """Evaluations read their sections, and fall back to sentences and words."""
+    parsed = ParsedResponse(
+        "Overall assessment:\nClear and specific.\n\nStrengths:\n1. Names the stack\n\n"
+        "Weaknesses:\n1. No accessibility target\n\nQuality score: 0.88"
+    )
+    
+    assert parsed.assessment == "Clear and specific."
+    assert parsed.strengths == ["Names the stack"]
+    assert parsed.weaknesses == ["No accessibility target"]
+    assert parsed.quality_score == 0.88
+    
+    fallback = ParsedResponse("The refined prompt is good and it would improve with metrics.")
+    
+    assert fallback.quality_score == 0.8
+    assert fallback.weaknesses == ["The refined prompt is good and it would improve with metrics."]
+
+def test_quality_scores_are_read_before_words_and_normalized():
+    """Stated scores win over verdict words and headings, on any scale, clamped to [0, 1]."""
+    weaknesses = "Weaknesses:\n- Vague\n\n"
+    
+    assert ParsedResponse(weaknesses + "Quality score (0-1): 0.92").quality_score == 0.92
+    assert ParsedResponse(weaknesses + "Quality score: 8/10").quality_score == 0.8
+    assert ParsedResponse(weaknesses + "Score: 8").quality_score == 0.8
+    assert ParsedResponse("Quality score: 85%").quality_score == 0.85
+    assert ParsedResponse("Rating: 4 out of 5").quality_score == 0.8
+    assert ParsedResponse("Quality score: 12/10").quality_score == 1.0
+    assert ParsedResponse(weaknesses + "Overall a solid prompt.").quality_score == 0.8
+
+def test_split_candidates_marks_missing_sections():
+    """Each candidate gets its own section, and skipped candidates are None."""
+    sections = split_candidates("Candidate 1\nScore: 0.6\n\n### Candidate 3\nScore: 0.9", 3)
+    
+    assert sections == ["Score: 0.6", None, "Score: 0.9"]
\ No newline at end of file
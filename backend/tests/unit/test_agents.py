@@ -0,0 +1,259 @@
+"""
+Unit tests for the agent execution engines.
+"""
+import asyncio
+import pytest
+
+from app.core.agent_config import get_agent_config
+from app.services.agents import AgentPool, CriticAgent, EvaluatorAgent, RefinerAgent
+
+def test_direct_engine_sends_one_completion(mock_llm_client):
+    """The direct engine should make exactly one call with the agent's system message."""
+    agent = CriticAgent("webdev", engine="direct")
+    
+    result = asyncio.run(agent.process("Build a landing page"))
+    
+    calls = mock_llm_client.get_calls()
+    assert result["success"] is True
+    assert result["message"] == "This is a mock response from the LLM client."
+    assert len(calls) == 1
+    assert calls[0]["messages"][0] == {
+        "role": "system",
+        "content": get_agent_config("critic", "webdev")["system_message"],
+    }
+    assert "Build a landing page" in calls[0]["messages"][1]["content"]
+    assert not hasattr(agent, "user_proxy")
+
+def test_direct_engine_reports_client_errors(mock_llm_client, monkeypatch):
+    """A failed completion should surface as an agent error result."""
+    async def failing_completion(messages, model=None, temperature=None, max_tokens=None):
+        return {"success": False, "error": "rate limited", "error_type": "RateLimitError"}
+    
+    monkeypatch.setattr(mock_llm_client, "agenerate_completion", failing_completion)
+    agent = RefinerAgent("webdev", engine="direct")
+    
+    result = asyncio.run(agent.process("Build a landing page", {"critic_feedback": "Too vague"}))
+    
+    assert result["success"] is False
+    assert "rate limited" in result["error"]
+
+def test_unknown_engine_is_rejected():
+    """Unknown engine names should raise a ValueError."""
+    with pytest.raises(ValueError):
+        CriticAgent("webdev", engine="unknown")
+
+def test_agent_pool_reuses_warmed_agents(mock_llm_client):
+    """Checkouts should reuse prebuilt agents instead of constructing new ones."""
+    async def run():
+        pool = AgentPool(size=1, max_size=1)
+        await pool.warm(roles=["webdev"])
+        async with pool.acquire("critic", "webdev") as first:
+            await first.process("Build a landing page")
+        async with pool.acquire("critic", "webdev") as second:
+            pass
+        return pool, first, second
+    
+    pool, first, second = asyncio.run(run())
+    
+    stats = pool.stats()
+    assert first is second
+    assert stats["agents"] == 3
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 0
+    assert stats["pools"]["critic:webdev"] == {"agents": 1, "idle": 1, "in_use": 0}
+
+def test_agent_pool_waits_when_exhausted():
+    """Checkouts beyond max_size should wait for an agent to be returned."""
+    async def hold(pool, started):
+        async with pool.acquire("critic", "webdev"):
+            started.set()
+            await asyncio.sleep(0.02)
+    
+    async def run():
+        pool = AgentPool(size=1, max_size=1)
+        started = asyncio.Event()
+        holder = asyncio.create_task(hold(pool, started))
+        await started.wait()
+        async with pool.acquire("critic", "webdev"):
+            pass
+        await holder
+        return pool.stats()
+    
+    stats = asyncio.run(run())
+    
+    assert stats["agents"] == 1
+    assert stats["waits"] == 1
+    assert stats["max_wait_ms"] > 0
+
+def test_agent_pool_rejects_unknown_roles_without_keeping_state():
+    """Checkouts for an unknown role or agent type fail and leave no queue behind."""
+    async def checkout(agent_type, role):
+        async with pool.acquire(agent_type, role):
+            pass
+    
+    pool = AgentPool(size=1, max_size=1)
+    for agent_type, role in (("critic", "bogus-1"), ("critic", "bogus-2"), ("bogus", "webdev")):
+        with pytest.raises(ValueError):
+            asyncio.run(checkout(agent_type, role))
+    
+    assert pool._idle == {}
+    assert pool.stats()["agents"] == 0
+
+def test_json_output_mode_validates_structured_replies(mock_llm_client, monkeypatch):
+    """JSON mode should request the agent's schema and read fields without regex scraping."""
+    from app.services.agents import base
+    monkeypatch.setattr(base.settings, "AGENT_OUTPUT_MODE", "json")
+    requests = []
+    
+    async def json_completion(messages, model=None, temperature=None, max_tokens=None, response_format=None):
+        requests.append(response_format)
+        return {"success": True, "content": (
+            '```json\n{"feedback": "Needs a stack and scope.", "issues": ["No framework", "No pages"],'
+            ' "clarity": 0.4, "technical_accuracy": 0.6, "completeness": 0.3, "confidence": 0.9}\n```'
+        )}
+    
+    monkeypatch.setattr(mock_llm_client, "agenerate_completion", json_completion)
+    before = base.structured_output_stats().get("critic", {"structured": 0})["structured"]
+    
+    result = asyncio.run(CriticAgent("webdev", engine="direct").process("Build a landing page"))
+    
+    assert requests[0]["type"] == "json_schema"
+    assert requests[0]["json_schema"]["name"] == "CriticOutput"
+    assert result["success"] is True
+    assert result["message"].startswith("Needs a stack and scope.")
+    assert result["metadata"]["confidence"] == 0.9
+    assert result["metadata"]["analysis"]["clarity"] == 0.4
+    assert result["metadata"]["analysis"]["primary_concerns"] == ["No framework", "No pages"]
+    assert base.structured_output_stats()["critic"]["structured"] == before + 1
+
+def test_json_output_mode_falls_back_to_text_extraction(mock_llm_client, monkeypatch):
+    """Replies that are not valid JSON should be parsed by the text extractors and counted."""
+    from app.services.agents import base
+    monkeypatch.setattr(base.settings, "AGENT_OUTPUT_MODE", "json")
+    
+    async def text_completion(messages, model=None, temperature=None, max_tokens=None, response_format=None):
+        return {"success": True, "content": "Refined prompt: \"Build a React landing page with a pricing table\"\nConfidence: 0.75"}
+    
+    monkeypatch.setattr(mock_llm_client, "agenerate_completion", text_completion)
+    before = base.structured_output_stats().get("refiner", {"fallback": 0})["fallback"]
+    
+    result = asyncio.run(RefinerAgent("webdev", engine="direct").process("Build a landing page", {"critic_feedback": "Too vague"}))
+    
+    assert result["success"] is True
+    assert result["message"] == "Build a React landing page with a pricing table"
+    assert result["metadata"]["confidence"] == 0.75
+    stats = base.structured_output_stats()["refiner"]
+    assert stats["fallback"] == before + 1
+    assert stats["fallback_rate"] > 0
+
+def test_json_output_mode_without_field_mapping_uses_text_parser(mock_llm_client, monkeypatch):
+    """An agent that does not map its schema's fields still works in JSON mode."""
+    from app.services.agents import base
+    monkeypatch.setattr(base.settings, "AGENT_OUTPUT_MODE", "json")
+    
+    class PlainRefiner(RefinerAgent):
+        _from_structured = base.BaseAgent._from_structured
+    
+    async def json_completion(messages, model=None, temperature=None, max_tokens=None, response_format=None):
+        return {"success": True, "content": (
+            '{"refined_prompt": "Build a React landing page with a pricing table",'
+            ' "improvements": ["Named the framework"], "confidence": 0.9}'
+        )}
+    
+    monkeypatch.setattr(mock_llm_client, "agenerate_completion", json_completion)
+    
+    result = asyncio.run(PlainRefiner("webdev", engine="direct").process("Build a landing page", {"critic_feedback": "Too vague"}))
+    
+    assert result["success"] is True
+    assert result["message"] == "Build a React landing page with a pricing table"
+    assert result["metadata"]["confidence"] == 0.9
+
+def test_json_output_mode_sends_provider_json_mode_on_autogen(monkeypatch):
+    """The AutoGen engine should send the same provider JSON mode as the direct engine."""
+    import autogen
+    from app.services.agents import base
+    monkeypatch.setattr(base.settings, "AGENT_OUTPUT_MODE", "json")
+    formats = []
+    
+    def fake_initiate_chat(self, recipient, message=None, **kwargs):
+        formats.append(recipient.client._config_list[0].get("response_format"))
+    
+    reply = {"content": '{"feedback": "Needs a stack.", "issues": [], "clarity": 0.4,'
+                        ' "technical_accuracy": 0.6, "completeness": 0.3, "confidence": 0.9}'}
+    monkeypatch.setattr(autogen.UserProxyAgent, "initiate_chat", fake_initiate_chat)
+    monkeypatch.setattr(autogen.UserProxyAgent, "last_message", lambda self, agent=None: reply)
+    agent = CriticAgent("webdev", engine="autogen")
+    default_client = agent.agent.client
+    
+    result = asyncio.run(agent.process("Build a landing page"))
+    
+    assert formats[0]["type"] == "json_schema"
+    assert formats[0]["json_schema"]["name"] == "CriticOutput"
+    assert result["metadata"]["confidence"] == 0.9
+    assert agent.agent.client is default_client
+
+def test_autogen_engine_follows_reloaded_templates(monkeypatch):
+    """Pooled AutoGen agents should use the current template, not the one they were built with."""
+    import autogen
+    from app.core.prompt_templates import PromptTemplate
+    from app.services.agents import base
+    seen = []
+    
+    def fake_initiate_chat(self, recipient, message=None, **kwargs):
+        seen.append((recipient.system_message, recipient.client._config_list[0]["temperature"]))
+    
+    monkeypatch.setattr(autogen.UserProxyAgent, "initiate_chat", fake_initiate_chat)
+    monkeypatch.setattr(autogen.UserProxyAgent, "last_message", lambda self, agent=None: {"content": "Looks fine."})
+    agent = CriticAgent("webdev", engine="autogen")
+    reloaded = PromptTemplate("critic", "webdev", "Reloaded critic prompt.", 0.1, "hash", 2)
+    monkeypatch.setattr(base.prompt_templates, "get", lambda kind, role: reloaded)
+    
+    asyncio.run(agent.process("Build a landing page"))
+    
+    assert seen == [("Reloaded critic prompt.", 0.1)]
+
+def test_autogen_engine_records_prefix_cache_usage(monkeypatch):
+    """Completions made inside an AutoGen conversation should count toward the prefix cache stats."""
+    import autogen
+    from types import SimpleNamespace
+    from app.services.agents import base
+    from app.utils.metrics import PrefixCacheStats
+    stats = PrefixCacheStats()
+    usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=50,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+    
+    def fake_initiate_chat(self, recipient, message=None, **kwargs):
+        recipient.client.create(messages=[{"role": "user", "content": message}])
+    
+    monkeypatch.setattr(base, "prefix_cache_stats", stats)
+    monkeypatch.setattr(autogen.OpenAIWrapper, "create", lambda self, **params: SimpleNamespace(usage=usage))
+    monkeypatch.setattr(autogen.UserProxyAgent, "initiate_chat", fake_initiate_chat)
+    monkeypatch.setattr(autogen.UserProxyAgent, "last_message", lambda self, agent=None: {"content": "Looks fine."})
+    
+    asyncio.run(CriticAgent("webdev", engine="autogen").process("Build a landing page"))
+    
+    webdev = stats.snapshot()["webdev"]
+    assert (webdev["calls"], webdev["hits"], webdev["cached_tokens"]) == (1, 1, 1024)
+
+def test_evaluate_candidates_picks_the_highest_stated_score(mock_llm_client, monkeypatch):
+    """A batched evaluation is scored per candidate from its stated quality score."""
+    async def batch_reply(messages, model=None, temperature=None, max_tokens=None):
+        return {"success": True, "content": (
+            "Candidate 1\nOverall assessment: Generic.\nStrengths:\n- Short\n"
+            "Weaknesses:\n- No stack named\nQuality score (0-1): 0.55\n\n"
+            "Candidate 2\nOverall assessment: Specific and scoped.\nStrengths:\n- Names React\n"
+            "Weaknesses:\n- Minor wording\nQuality score: 9/10\n\n"
+            "Candidate 3\nOverall assessment: Good but long.\nStrengths:\n- Detailed\n"
+            "Weaknesses:\n- Too long\nQuality score: 0.7"
+        )}
+    
+    monkeypatch.setattr(mock_llm_client, "agenerate_completion", batch_reply)
+    evaluator = EvaluatorAgent("webdev", engine="direct")
+    
+    result = asyncio.run(evaluator.evaluate_candidates(["A", "B", "C"], {"original_prompt": "Build a landing page"}))
+    
+    analysis = result["metadata"]["analysis"]
+    assert result["success"] is True
+    assert analysis["candidate_scores"] == [0.55, 0.9, 0.7]
+    assert analysis["selected_index"] == 1
+    assert result["message"] == "Specific and scoped."
\ No newline at end of file
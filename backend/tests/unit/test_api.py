@@ -69,8 +69,11 @@ def test_normal_prompt_endpoint(client, mock_llm_client, test_roles, test_prompt
     calls = mock_llm_client.get_calls()
     assert len(calls) == 1
     assert calls[0]["model"] == "sonar"
-    assert len(calls[0]["messages"]) == 2  # System and user messages
-    assert calls[0]["messages"][1]["content"].startswith(f"Original prompt: {prompt}")
+    # System message, retrieved few-shot user/assistant pairs, then the user's prompt
+    messages = calls[0]["messages"]
+    assert messages[0]["role"] == "system"
+    assert [message["role"] for message in messages[1:-1]] == ["user", "assistant"] * ((len(messages) - 2) // 2)
+    assert messages[-1]["content"].startswith(f"Original prompt: {prompt}")
 
 def test_invalid_role(client, test_prompts, test_session_id):
     """Test that invalid roles return an appropriate error."""
@@ -94,7 +97,7 @@ def test_process_prompt_endpoint(client, mock_llm_client, test_roles, test_promp
     """Test the multi-agent prompt processing endpoint."""
     # Mock the prompt processor service
     class MockPromptProcessor:
-        async def process_with_agents(self, prompt, role, session_id):
+        async def process_with_agents(self, prompt, role, session_id, candidates=None):
             return {
                 "success": True,
                 "messages": [
@@ -0,0 +1,108 @@
+"""
+Unit tests for the authenticated-user caches in AuthService.
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.auth import AuthService
+
+@pytest.fixture
+def auth_module(monkeypatch):
+    """Stub the users table and count token decodes and user lookups."""
+    module = sys.modules["app.services.auth"]
+    counts = {"decode": 0, "get_user": 0}
+    real_decode = jwt.decode
+    
+    def counting_decode(*args, **kwargs):
+        counts["decode"] += 1
+        return real_decode(*args, **kwargs)
+    
+    async def get_user(user_id):
+        counts["get_user"] += 1
+        return {"id": user_id, "email": "user@example.com", "password_hash": "secret"}
+    
+    monkeypatch.setattr(module.jwt, "decode", counting_decode)
+    monkeypatch.setattr(module.supabase_service, "get_user", get_user)
+    return counts
+
+def test_repeat_calls_skip_decode_and_user_lookup(auth_module):
+    """The second call with the same token should be served from the caches."""
+    service = AuthService(cache_max_size=10, cache_ttl=60)
+    token = service.create_access_token({"sub": "user-1"})
+    
+    async def run():
+        return await service.get_current_user(token), await service.get_current_user(token)
+    
+    first, second = asyncio.run(run())
+    
+    assert first == second == {"id": "user-1", "email": "user@example.com"}
+    assert auth_module == {"decode": 1, "get_user": 1}
+
+def test_logout_revokes_token_until_it_expires(auth_module):
+    """A logged-out token is rejected even though its signature is still valid."""
+    service = AuthService(cache_max_size=10, cache_ttl=60)
+    token = service.create_access_token({"sub": "user-1"})
+    other = service.create_access_token({"sub": "user-1", "device": "phone"})
+    
+    async def run():
+        await service.get_current_user(token)
+        service.logout(token)
+        service.logout(token)
+        with pytest.raises(HTTPException) as error:
+            await service.get_current_user(token)
+        return error.value.status_code, await service.get_current_user(other)
+    
+    status_code, user = asyncio.run(run())
+    
+    assert status_code == 401
+    assert user["id"] == "user-1"
+    assert service.cache_stats()["revoked_tokens"] == 1
+    
+    # Entries are dropped once the token would have expired anyway
+    service._revoked_expiry[0] = (0, service._revoked_expiry[0][1])
+    assert service._is_revoked(service._token_key(token)) is False
+    assert service.cache_stats()["revoked_tokens"] == 0
+
+def test_invalidate_user_refetches_and_generations_are_pruned(auth_module):
+    """Invalidation forces a fresh user lookup and its bookkeeping expires with the cache TTL."""
+    service = AuthService(cache_max_size=10, cache_ttl=60)
+    token = service.create_access_token({"sub": "user-1"})
+    
+    async def run():
+        await service.get_current_user(token)
+        service.invalidate_user("user-1")
+        await service.get_current_user(token)
+        await service.get_current_user(token)
+    
+    asyncio.run(run())
+    
+    assert auth_module["get_user"] == 2
+    assert service.cache_stats()["invalidated_users"] == 1
+    
+    service.cache_ttl = 0
+    assert service._generation("user-1") == 0
+    assert service.cache_stats()["invalidated_users"] == 0
+
+    # A later invalidation must not reuse generation 1, whose principal may still be cached
+    service.invalidate_user("user-1")
+    assert service._user_generations["user-1"][0] == 2
+
+def test_expired_token_is_rejected(auth_module):
+    """Expired tokens should raise a 401 rather than a server error."""
+    service = AuthService(cache_max_size=10, cache_ttl=60)
+    token = jwt.encode(
+        {"sub": "user-1", "exp": datetime.utcnow() - timedelta(minutes=1)},
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(service.get_current_user(token))
+    
+    assert error.value.status_code == 401
+    assert auth_module["get_user"] == 0
\ No newline at end of file
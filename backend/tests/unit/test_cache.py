@@ -0,0 +1,131 @@
+"""
+Unit tests for the in-process caches and the provider client registry.
+"""
+import asyncio
+import time
+import pytest
+
+from app.utils.cache import TTLCache
+from app.services.client_registry import ClientRegistry
+from app.services.api_key_cache import ApiKeyCache
+
+def test_ttl_cache_evicts_least_recently_used():
+    """The least recently used entry should be evicted when full."""
+    evicted = []
+    cache = TTLCache(max_size=2, ttl=60, on_evict=lambda key, value: evicted.append(key))
+    
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert "a" in cache
+    assert "b" not in cache
+    assert evicted == ["b"]
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_expires_entries():
+    """Entries should expire after their TTL and count as misses."""
+    cache = TTLCache(max_size=10, ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    
+    time.sleep(0.02)
+    
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+
+def test_client_registry_reuses_clients_per_key():
+    """The same provider and key should return the same client instance."""
+    registry = ClientRegistry(max_size=10, idle_ttl=60)
+    
+    first = registry.get_client("deepseek", "sk-user-1")
+    second = registry.get_client("deepseek", "sk-user-1")
+    other = registry.get_client("openai", "sk-user-1")
+    
+    assert first is second
+    assert other is not first
+    assert str(first.base_url).startswith("https://api.deepseek.com")
+    assert registry.stats()["hits"] == 1
+    assert registry.stats()["misses"] == 2
+
+def test_client_registry_rejects_unknown_provider():
+    """Unknown providers should raise a ValueError."""
+    registry = ClientRegistry(max_size=10, idle_ttl=60)
+    
+    with pytest.raises(ValueError):
+        registry.get_client("unknown", "sk-user-1")
+
+def test_api_key_cache_coalesces_concurrent_misses():
+    """Concurrent lookups for one user should issue a single query."""
+    queries = []
+    
+    async def loader(user_id):
+        queries.append(user_id)
+        await asyncio.sleep(0.01)
+        return {"openai_api_key": "sk-openai"}
+    
+    async def run():
+        cache = ApiKeyCache(max_size=10, ttl=60, negative_ttl=60)
+        results = await asyncio.gather(*[cache.get("user-1", loader) for _ in range(5)])
+        results.append(await cache.get("user-1", loader))
+        return results
+    
+    results = asyncio.run(run())
+    
+    assert queries == ["user-1"]
+    assert all(result == {"openai_api_key": "sk-openai"} for result in results)
+
+def test_api_key_cache_negative_caching_and_invalidation():
+    """Users without keys are cached until invalidated."""
+    queries = []
+    
+    async def loader(user_id):
+        queries.append(user_id)
+        return None if len(queries) == 1 else {"deepseek_api_key": "sk-deepseek"}
+    
+    async def run():
+        cache = ApiKeyCache(max_size=10, ttl=60, negative_ttl=60)
+        first = await cache.get("user-1", loader)
+        second = await cache.get("user-1", loader)
+        cache.invalidate("user-1")
+        third = await cache.get("user-1", loader)
+        return first, second, third
+    
+    first, second, third = asyncio.run(run())
+    
+    assert first is None
+    assert second is None
+    assert third == {"deepseek_api_key": "sk-deepseek"}
+    assert len(queries) == 2
+
+def test_api_key_cache_invalidation_during_load_is_not_cached_and_not_retained():
+    """A load overlapping an invalidation is not cached; no per-user state outlives the load."""
+    started = []
+    
+    async def loader(user_id):
+        started.append(user_id)
+        await asyncio.sleep(0.01)
+        return {"openai_api_key": f"sk-{len(started)}"}
+    
+    async def run():
+        cache = ApiKeyCache(max_size=10, ttl=60, negative_ttl=60)
+        for i in range(100):
+            cache.invalidate(f"idle-{i}")
+        pending = asyncio.ensure_future(cache.get("user-1", loader))
+        while not started:
+            await asyncio.sleep(0)
+        cache.invalidate("user-1")
+        stale = await pending
+        fresh = await cache.get("user-1", loader)
+        return cache, stale, fresh
+    
+    cache, stale, fresh = asyncio.run(run())
+    
+    assert stale == {"openai_api_key": "sk-1"}
+    assert fresh == {"openai_api_key": "sk-2"}
+    assert cache._generations == {} and cache._loading == {}
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Unit tests for the write-behind prompt history recorder.
+"""
+import asyncio
+import json
+
+from app.services.history_recorder import HistoryRecorder
+from app.services.postgrest import PostgrestError
+
+class FakeRest:
+    """Records bulk inserts, skips duplicate ids and fails on demand."""
+    
+    def __init__(self):
+        self.batches = []
+        self.ids = set()
+        self.error = None
+        # Prompts whose rows the database refuses
+        self.invalid = set()
+        # Fail after this many more successful inserts
+        self.fail_after = None
+    
+    async def insert(self, table, rows, returning=True, timeout=None, ignore_duplicates_on=None):
+        if self.fail_after is not None:
+            if self.fail_after == 0:
+                raise PostgrestError("ConnectError: refused")
+            self.fail_after -= 1
+        if self.error is not None:
+            raise self.error
+        if any(row["original_prompt"] in self.invalid for row in rows):
+            raise PostgrestError("violates foreign key constraint", status_code=409)
+        assert ignore_duplicates_on == "id"
+        new = [row for row in rows if row["id"] not in self.ids]
+        self.ids.update(row["id"] for row in new)
+        self.batches.append((table, new, returning))
+        return []
+
+class FakeService:
+    def __init__(self):
+        self.rest = FakeRest()
+    
+    def is_configured(self):
+        return True
+
+def _recorder(tmp_path, **kwargs):
+    service = FakeService()
+    options = {"batch_size": 3, "flush_interval": 60, "max_pending": 10}
+    options.update(kwargs)
+    recorder = HistoryRecorder(service=service, spill_path=str(tmp_path / "spill.jsonl"), **options)
+    return recorder, service.rest
+
+def _record(recorder, count, start=0):
+    for i in range(start, start + count):
+        assert recorder.record("user-1", f"prompt {i}", f"enhanced {i}", "webdev")
+
+def test_full_batch_triggers_one_bulk_insert(tmp_path):
+    """Rows are written together, in order, as soon as a batch fills up."""
+    async def scenario():
+        recorder, rest = _recorder(tmp_path)
+        recorder.start()
+        _record(recorder, 3)
+        assert rest.batches == []
+        for _ in range(50):
+            if rest.batches:
+                break
+            await asyncio.sleep(0.01)
+        await recorder.stop()
+        return recorder, rest
+    
+    recorder, rest = asyncio.run(scenario())
+    
+    assert len(rest.batches) == 1
+    table, rows, returning = rest.batches[0]
+    assert table == "prompt_history" and returning is False
+    assert [row["original_prompt"] for row in rows] == ["prompt 0", "prompt 1", "prompt 2"]
+    assert all(row["created_at"] for row in rows)
+    assert recorder.stats()["written"] == 3
+
+def test_unavailable_database_spills_and_retries(tmp_path):
+    """Rows survive a database outage in the spill file and are written later."""
+    async def scenario():
+        recorder, rest = _recorder(tmp_path)
+        rest.error = PostgrestError("ConnectError: refused")
+        _record(recorder, 4)
+        assert await recorder.flush() == 0
+        spilled = [json.loads(line) for line in open(recorder.spill_path)]
+        
+        rest.error = None
+        _record(recorder, 1, start=4)
+        written = await recorder.flush()
+        return recorder, rest, spilled, written
+    
+    recorder, rest, spilled, written = asyncio.run(scenario())
+    
+    assert [row["original_prompt"] for row in spilled] == [f"prompt {i}" for i in range(4)]
+    assert written == 5
+    assert [row["original_prompt"] for _, batch, _ in rest.batches for row in batch] == [f"prompt {i}" for i in range(5)]
+    assert recorder.spill_size() == 0
+    assert recorder.stats()["failed_flushes"] == 1
+
+def test_full_buffer_spills_instead_of_growing(tmp_path):
+    """Rows beyond max_pending go to disk off the event loop and are still flushed on shutdown."""
+    async def scenario():
+        recorder, rest = _recorder(tmp_path, batch_size=100, max_pending=2)
+        _record(recorder, 5)
+        assert recorder.stats()["pending"] == 2
+        assert recorder.stats()["overflowed"] == 3
+        # record() only schedules the file writes
+        assert len(recorder._spill_writes) == 3
+        await recorder.stop()
+        return rest
+    
+    rest = asyncio.run(scenario())
+    
+    written = sorted(row["original_prompt"] for _, batch, _ in rest.batches for row in batch)
+    assert written == [f"prompt {i}" for i in range(5)]
+
+def test_rejected_rows_are_dropped_without_their_batch(tmp_path):
+    """Rows the database refuses outright are not retried forever, and do not sink the rest of the batch."""
+    async def scenario():
+        recorder, rest = _recorder(tmp_path)
+        rest.invalid = {"prompt 1"}
+        _record(recorder, 3)
+        await recorder.flush()
+        return recorder, rest
+    
+    recorder, rest = asyncio.run(scenario())
+    
+    assert sorted(row["original_prompt"] for _, batch, _ in rest.batches for row in batch) == ["prompt 0", "prompt 2"]
+    assert recorder.stats()["rejected"] == 1
+    assert recorder.spill_size() == 0
+
+def test_spill_drains_in_batches_and_resumes_after_failure(tmp_path):
+    """Spilled rows are read one batch at a time; a failed drain resumes without losing or repeating rows."""
+    async def scenario():
+        recorder, rest = _recorder(tmp_path, batch_size=2, max_pending=0)
+        _record(recorder, 5)
+        await asyncio.gather(*list(recorder._spill_writes))
+        
+        rest.fail_after = 1
+        first = await recorder.flush()
+        # The failed batch's first row landed anyway; the retry must skip it, not drop the batch
+        pending, _ = recorder._read_spill(recorder.draining_path, recorder._drain_offset, 1)
+        rest.ids.add(pending[0]["id"])
+        rest.fail_after = None
+        second = await recorder.flush()
+        return recorder, rest, first, second
+    
+    recorder, rest, first, second = asyncio.run(scenario())
+    
+    assert (first, second) == (2, 3)
+    assert [len(batch) for _, batch, _ in rest.batches] == [2, 1, 1]
+    assert sorted(row["original_prompt"] for _, batch, _ in rest.batches for row in batch) == [f"prompt {i}" for i in (0, 1, 3, 4)]
+    assert recorder.stats()["rejected"] == 0
+    assert recorder.spill_size() == 0
\ No newline at end of file
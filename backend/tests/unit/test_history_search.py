@@ -0,0 +1,123 @@
+"""
+Unit tests for the in-process prompt history search index.
+"""
+import sys
+
+from app.main import app
+from app.core.config import settings
+from app.services.auth import auth_service
+from app.services.supabase_client import supabase_service
+from app.services.history_recorder import HistoryRecorder
+from app.services.history_search import HistorySearchIndex, history_search_index, index_recorded_row
+
+class UnconfiguredService:
+    def is_configured(self):
+        return False
+
+def _row(row_id, original, enhanced="", user_id="user-1", role="webdev", created_at="2024-01-01"):
+    return {
+        "id": row_id,
+        "user_id": user_id,
+        "original_prompt": original,
+        "enhanced_prompt": enhanced,
+        "role": role,
+        "success": True,
+        "created_at": created_at,
+    }
+
+def test_search_requires_every_term_and_ranks_original_matches_first():
+    """Rows must contain all terms; original-prompt matches outrank enhancement matches."""
+    index = HistorySearchIndex()
+    index.add(_row("a", "Build a login form", "Create a React login form with validation"))
+    index.add(_row("b", "Style the dashboard", "Mention the login form fields in the dashboard layout"))
+    index.add(_row("c", "Write a login handler", "Validate credentials server side"))
+    index.add(_row("d", "Login form for admins", user_id="user-2"))
+    
+    results = index.search("user-1", "login form")
+    
+    assert [row["id"] for row in results] == ["a", "b"]
+    assert results[0]["rank"] > results[1]["rank"]
+    assert results[0]["original_preview"] == "Build a login form"
+    assert index.search("user-1", "login payments") == []
+    assert [row["id"] for row in index.search("user-2", "login")] == ["d"]
+
+def test_search_filters_pages_and_evicts_oldest():
+    """Role filters and offsets apply to ranked results; old rows fall out when full."""
+    index = HistorySearchIndex(max_docs_per_user=3)
+    for i in range(4):
+        index.add(_row(f"id-{i}", f"deploy service {i}", role="syseng" if i % 2 else "webdev", created_at=f"2024-01-0{i + 1}"))
+    
+    assert [row["id"] for row in index.search("user-1", "deploy")] == ["id-3", "id-2", "id-1"]
+    assert [row["id"] for row in index.search("user-1", "deploy", limit=1, offset=1)] == ["id-2"]
+    assert [row["id"] for row in index.search("user-1", "deploy", role="syseng")] == ["id-3", "id-1"]
+    assert index.stats()["docs"] == 3
+
+def test_recorder_feeds_subscribed_index():
+    """Recorded rows are searchable right away, even without a database."""
+    index = HistorySearchIndex()
+    recorder = HistoryRecorder(service=UnconfiguredService())
+    recorder.subscribe(index.add)
+    
+    assert recorder.record("user-1", "Plot sales by region", "Create a bar chart of sales", "analyst") is False
+    
+    results = index.search("user-1", "sales chart")
+    assert len(results) == 1 and results[0]["role"] == "analyst"
+
+def test_global_index_follows_configured_backend(monkeypatch):
+    """Recorded rows reach the global index only while it serves searches."""
+    try:
+        monkeypatch.setattr(settings, "HISTORY_SEARCH_BACKEND", "postgres")
+        index_recorded_row(_row("pg", "deploy to kubernetes"))
+        monkeypatch.setattr(settings, "HISTORY_SEARCH_BACKEND", "local")
+        index_recorded_row(_row("local", "deploy to kubernetes"))
+        
+        assert [row["id"] for row in history_search_index.search("user-1", "kubernetes")] == ["local"]
+    finally:
+        history_search_index.clear()
+
+def test_search_endpoint_pages_with_cursor(client, monkeypatch):
+    """The endpoint serves the local index with opaque cursors."""
+    monkeypatch.setattr(settings, "HISTORY_SEARCH_BACKEND", "local")
+    app.dependency_overrides[auth_service.get_current_user] = lambda: {"id": "user-9"}
+    try:
+        for i in range(3):
+            history_search_index.add(_row(f"id-{i}", f"refactor module {i}", user_id="user-9", created_at=f"2024-01-0{i + 1}"))
+        
+        first = client.get("/history/search", params={"q": "refactor", "limit": 2}).json()
+        second = client.get("/history/search", params={"q": "refactor", "limit": 2, "cursor": first["next_cursor"]}).json()
+        bad = client.get("/history/search", params={"q": "refactor", "cursor": "???"})
+    finally:
+        app.dependency_overrides.clear()
+        history_search_index.clear()
+    
+    assert [row["id"] for row in first["items"]] == ["id-2", "id-1"]
+    assert [row["id"] for row in second["items"]] == ["id-0"]
+    assert second["next_cursor"] is None
+    assert bad.status_code == 400
+
+def test_auto_backend_falls_back_to_local_when_postgres_search_fails(client, monkeypatch):
+    """In auto mode a failing search RPC is skipped for a while and the local index answers."""
+    calls = []
+    
+    async def failing_search(*args, **kwargs):
+        calls.append(args)
+        return {"success": False, "error": "function search_prompt_history does not exist"}
+    
+    monkeypatch.setattr(settings, "HISTORY_SEARCH_BACKEND", "auto")
+    monkeypatch.setattr(sys.modules["app.services.history_search"], "_postgres_retry_at", 0.0)
+    monkeypatch.setattr(supabase_service, "is_configured", lambda: True)
+    monkeypatch.setattr(supabase_service, "search_prompt_history", failing_search)
+    app.dependency_overrides[auth_service.get_current_user] = lambda: {"id": "user-9"}
+    try:
+        index_recorded_row(_row("id-1", "migrate the billing tables", user_id="user-9"))
+        
+        first = client.get("/history/search", params={"q": "billing"})
+        second = client.get("/history/search", params={"q": "billing"})
+    finally:
+        app.dependency_overrides.clear()
+        history_search_index.clear()
+    
+    assert first.status_code == 200
+    assert [row["id"] for row in first.json()["items"]] == ["id-1"]
+    assert [row["id"] for row in second.json()["items"]] == ["id-1"]
+    assert len(calls) == 1
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Unit tests for the asynchronous LLM client.
+"""
+import asyncio
+import json
+import httpx
+import pytest
+
+from app.services.llm_client import AsyncLLMClient, HedgePolicy, HostLimitedTransport
+from app.utils.metrics import PrefixCacheStats
+
+def _completion_payload(content):
+    """Build a minimal OpenAI-compatible chat completion body."""
+    return {
+        "id": "cmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "sonar",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+    }
+
+def test_agenerate_completion_uses_pooled_client():
+    """The async client should return the same result shape as the sync client."""
+    requests = []
+    
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json=_completion_payload("Enhanced prompt: hi"))
+    
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = AsyncLLMClient(api_key="sk-test", base_url="https://llm.test/v1", http_client=http_client)
+    
+    result = asyncio.run(client.agenerate_completion(
+        messages=[{"role": "user", "content": "hello"}],
+        model="sonar",
+        temperature=0.0,
+    ))
+    
+    assert result["success"] is True
+    assert result["content"] == "Enhanced prompt: hi"
+    assert result["metadata"]["finish_reason"] == "stop"
+    assert requests[0]["temperature"] == 0.0
+
+def test_agenerate_completion_reports_errors():
+    """Provider errors should be returned, not raised."""
+    http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(400, json={"error": {"message": "bad"}}))
+    )
+    client = AsyncLLMClient(api_key="sk-test", base_url="https://llm.test/v1", http_client=http_client)
+    
+    result = asyncio.run(client.agenerate_completion(messages=[{"role": "user", "content": "hello"}]))
+    
+    assert result["success"] is False
+    assert result["error_type"] == "BadRequestError"
+
+def test_host_limited_transport_caps_in_flight_requests():
+    """No more than max_per_host requests should be in flight for one host."""
+    in_flight = 0
+    peak = 0
+    
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={})
+    
+    async def run():
+        transport = HostLimitedTransport(httpx.MockTransport(handler), max_per_host=2)
+        async with httpx.AsyncClient(transport=transport) as client:
+            await asyncio.gather(*[client.get("https://llm.test/ping") for _ in range(6)])
+    
+    asyncio.run(run())
+    
+    assert peak == 2
+
+@pytest.mark.parametrize("usage, cached", [
+    ({"prompt_tokens": 1200, "completion_tokens": 50, "total_tokens": 1250,
+      "prompt_tokens_details": {"cached_tokens": 1024}}, 1024),
+    ({"prompt_tokens": 1200, "completion_tokens": 50, "total_tokens": 1250,
+      "prompt_cache_hit_tokens": 896, "prompt_cache_miss_tokens": 304}, 896),
+    ({"prompt_tokens": 1200, "completion_tokens": 50, "total_tokens": 1250}, None),
+])
+def test_agenerate_completion_reports_cached_prompt_tokens(usage, cached):
+    """OpenAI and DeepSeek prefix cache counts should both be read into the usage metadata."""
+    def handler(request):
+        return httpx.Response(200, json={**_completion_payload("hi"), "usage": usage})
+    
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = AsyncLLMClient(api_key="sk-test", base_url="https://llm.test/v1", http_client=http_client)
+    
+    result = asyncio.run(client.agenerate_completion(messages=[{"role": "user", "content": "hello"}]))
+    
+    assert result["metadata"]["usage"] == {"prompt_tokens": 1200, "completion_tokens": 50, "cached_tokens": cached}
+
+def test_prefix_cache_stats_per_scope():
+    """Hit rate counts only calls whose provider reported cache usage."""
+    stats = PrefixCacheStats()
+    stats.record("webdev", {"prompt_tokens": 1000, "cached_tokens": 768})
+    stats.record("webdev", {"prompt_tokens": 1000, "cached_tokens": 0})
+    stats.record("webdev", None)
+    
+    snapshot = stats.snapshot()["webdev"]
+    
+    assert snapshot["calls"] == 3
+    assert snapshot["reported"] == 2
+    assert snapshot["hit_rate"] == 0.5
+    assert snapshot["cached_token_ratio"] == 768 / 2000
+
+def _warm_policy(budget=1.0):
+    """A hedge policy whose completion deadline is already 50ms."""
+    policy = HedgePolicy(enabled=True, percentile=0.95, budget=budget, min_samples=1)
+    for _ in range(100):
+        policy._histogram("completion").observe(50)
+    return policy
+
+def test_hedge_backup_wins_and_cancels_slow_primary():
+    """A call past the deadline is raced by a backup; the slower call is cancelled."""
+    policy = _warm_policy()
+    cancelled = []
+    
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("primary")
+            raise
+        return "primary"
+    
+    async def fast():
+        return "backup"
+    
+    result = asyncio.run(policy.run("completion", slow, fast))
+    stats = policy.stats()
+    
+    assert result == "backup"
+    assert cancelled == ["primary"]
+    assert (stats["hedges"], stats["hedge_wins"], stats["hedge_win_rate"]) == (1, 1, 1.0)
+
+def test_hedge_budget_limits_backups():
+    """Beyond the budget, slow calls wait for the primary instead of hedging."""
+    policy = _warm_policy(budget=0.5)
+    
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "primary"
+    
+    async def backup():
+        return "backup"
+    
+    async def run():
+        return [await policy.run("completion", slow, backup) for _ in range(4)]
+    
+    results = asyncio.run(run())
+    
+    assert results.count("backup") == 2
+    assert policy.stats()["budget_exhausted"] == 2
+
+def test_hedge_falls_back_to_primary_when_backup_fails():
+    """A failing backup does not win; the primary's result is still used."""
+    policy = _warm_policy()
+    
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "primary"
+    
+    async def broken():
+        raise RuntimeError("backup down")
+    
+    assert asyncio.run(policy.run("completion", slow, broken)) == "primary"
+    assert policy.stats()["hedge_wins"] == 0
+
+def test_hedging_disabled_runs_primary_only():
+    """Without hedging enabled the backup is never called."""
+    policy = HedgePolicy(enabled=False)
+    
+    async def primary():
+        return "primary"
+    
+    async def backup():
+        raise AssertionError("backup called")
+    
+    assert asyncio.run(policy.run("completion", primary, backup)) == "primary"
+    assert policy.stats()["calls"] == 0
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Unit tests for the password hashing pool and latency histograms.
+"""
+import asyncio
+import threading
+import pytest
+from passlib.context import CryptContext
+
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
+from app.utils.metrics import LatencyHistogram
+
+def test_hash_and_verify_run_in_pool():
+    """Hashing and verification should round-trip and be timed per operation."""
+    hasher = PasswordHasher(
+        max_workers=2,
+        max_queue=2,
+        context=CryptContext(schemes=["sha256_crypt"], sha256_crypt__default_rounds=1000),
+    )
+    
+    async def run():
+        hashed = await hasher.hash("correct horse")
+        return hashed, await hasher.verify("correct horse", hashed), await hasher.verify("wrong", hashed)
+    
+    hashed, correct, wrong = asyncio.run(run())
+    hasher.shutdown()
+    
+    assert hashed.startswith("$5$")
+    assert correct is True
+    assert wrong is False
+    stats = hasher.stats()
+    assert stats["latency"]["hash"]["count"] == 1
+    assert stats["latency"]["verify"]["count"] == 2
+    assert stats["pending"] == 0
+
+def test_saturated_pool_sheds_requests():
+    """Requests beyond workers plus queue should be rejected immediately."""
+    release = threading.Event()
+    
+    class BlockingContext:
+        def verify(self, plain_password, hashed_password):
+            release.wait(1)
+            return True
+    
+    hasher = PasswordHasher(max_workers=1, max_queue=1, context=BlockingContext())
+    
+    async def run():
+        running = [asyncio.ensure_future(hasher.verify("a", "b")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.verify("a", "b")
+        release.set()
+        return await asyncio.gather(*running)
+    
+    results = asyncio.run(run())
+    hasher.shutdown()
+    
+    assert results == [True, True]
+    assert hasher.stats()["rejected"] == 1
+
+def test_latency_histogram_percentiles():
+    """Percentiles should resolve to the bucket bound containing them."""
+    histogram = LatencyHistogram(buckets_ms=[10, 100, 1000])
+    for value in [5, 6, 7, 8, 50, 60, 70, 80, 90, 500]:
+        histogram.observe(value)
+    
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 10
+    assert snapshot["p50_ms"] == 100
+    assert snapshot["p99_ms"] == 1000
+    assert snapshot["buckets"] == {"le_10": 4, "le_100": 5, "le_1000": 1, "le_inf": 0}
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Unit tests for the async stage pipeline.
+"""
+import asyncio
+import pytest
+
+from app.services.pipeline import Pipeline, Stage
+
+def _sleeper(value, delay=0.05):
+    async def run(inputs):
+        await asyncio.sleep(delay)
+        return value
+    return run
+
+def test_independent_stages_run_concurrently():
+    """Stages without dependencies overlap; dependents see their inputs."""
+    async def combine(inputs):
+        return inputs["a"] + inputs["b"]
+    
+    pipeline = Pipeline([
+        Stage("combine", combine, depends_on=["a", "b"]),
+        Stage("a", _sleeper(1)),
+        Stage("b", _sleeper(2)),
+    ])
+    
+    run = asyncio.run(pipeline.run())
+    
+    assert run.results["combine"] == 3
+    assert list(run.timings) == ["a", "b", "combine"]
+    assert run.timings["combine"]["start_ms"] >= run.timings["a"]["duration_ms"]
+    # Two 50ms stages in parallel finish well under their 100ms sum
+    assert run.total_ms < 95
+
+def test_failures_and_predicates_skip_dependents():
+    """A failed stage skips its dependents, other branches still run."""
+    async def fail(inputs):
+        raise RuntimeError("boom")
+    
+    pipeline = Pipeline([
+        Stage("fail", fail),
+        Stage("after_fail", _sleeper("never", 0), depends_on=["fail"]),
+        Stage("ok", _sleeper(5, 0)),
+        Stage("gated", _sleeper("gated", 0), depends_on=["ok"], when=lambda inputs: inputs["ok"] > 10),
+    ])
+    
+    run = asyncio.run(pipeline.run())
+    
+    assert isinstance(run.errors["fail"], RuntimeError)
+    assert {name: timing["status"] for name, timing in run.timings.items()} == {
+        "fail": "error",
+        "after_fail": "skipped",
+        "ok": "ok",
+        "gated": "skipped",
+    }
+    assert run.results["gated"] is None
+    assert run.ran("ok") and not run.ran("gated")
+
+def test_invalid_graphs_are_rejected():
+    """Unknown dependencies and cycles fail at construction."""
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", _sleeper(1), depends_on=["missing"])])
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", _sleeper(1), depends_on=["b"]), Stage("b", _sleeper(1), depends_on=["a"])])
\ No newline at end of file
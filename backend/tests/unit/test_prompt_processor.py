@@ -0,0 +1,223 @@
+"""
+Unit tests for request coalescing in the prompt processor service.
+"""
+import asyncio
+import sys
+
+from app.services.prompt_processor import PromptProcessorService
+
+class SlowLLMClient:
+    """LLM client stub that takes a moment to answer and counts calls."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def agenerate_completion(self, messages, model=None, temperature=None, max_tokens=None):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return {"success": True, "content": "Enhanced prompt: X\nExplanation: Y", "model": model}
+
+def test_identical_direct_requests_share_one_call(monkeypatch):
+    """Concurrent identical requests should await a single provider call."""
+    slow_client = SlowLLMClient()
+    module = sys.modules["app.services.prompt_processor"]
+    monkeypatch.setattr(module, "async_llm_client", slow_client)
+    monkeypatch.setattr(module, "response_cache", None)
+    monkeypatch.setattr(module, "semantic_cache", None)
+    processor = PromptProcessorService()
+    
+    async def run():
+        return await asyncio.gather(*[
+            processor.process_with_direct_api("Build a landing page", "webdev", "sonar")
+            for _ in range(4)
+        ])
+    
+    results = asyncio.run(run())
+    
+    assert slow_client.calls == 1
+    assert [result["cache"] for result in results] == [None, "COALESCED", "COALESCED", "COALESCED"]
+    assert all(result["response"] == results[0]["response"] for result in results)
+    stats = processor.stats()
+    assert stats["executions"] == 1
+    assert stats["shared"] == 3
+    assert stats["waiter_counts"] == {4: 1}
+
+def test_agent_requests_coalesce_per_session(monkeypatch):
+    """Duplicate multi-agent requests only coalesce within one session."""
+    processor = PromptProcessorService()
+    runs = []
+    
+    async def fake_run_agents(prompt, role, session_id, candidates=1):
+        runs.append(session_id)
+        await asyncio.sleep(0.02)
+        return {"success": True, "messages": [], "final_prompt": prompt, "error": None}
+    
+    monkeypatch.setattr(processor, "_run_agents", fake_run_agents)
+    
+    async def run():
+        return await asyncio.gather(
+            processor.process_with_agents("Build a landing page", "webdev", "session-1"),
+            processor.process_with_agents("Build a  landing page", "webdev", "session-1"),
+            processor.process_with_agents("Build a landing page", "webdev", "session-2"),
+        )
+    
+    asyncio.run(run())
+    
+    assert sorted(runs) == ["session-1", "session-2"]
+
+def test_speculative_draft_wins_when_scored_higher(monkeypatch):
+    """The draft runs alongside the critic and replaces the refinement if better."""
+    module = sys.modules["app.services.prompt_processor"]
+    monkeypatch.setattr(module.settings, "AGENT_SPECULATIVE_DRAFT", True)
+    monkeypatch.setattr(module, "few_shot_retriever", None)
+    processor = PromptProcessorService()
+    calls = []
+    
+    async def fake_run_agent(agent_type, role, prompt, context=None):
+        calls.append((agent_type, bool(context and "critic_feedback" in context and agent_type == "refiner")))
+        await asyncio.sleep(0.01)
+        if agent_type == "refiner":
+            prompt = "with feedback" if context and "critic_feedback" in context else "draft"
+        # The evaluator likes the draft better
+        score = 0.9 if prompt == "draft" else 0.6
+        return {
+            "success": True,
+            "message": prompt,
+            "metadata": {"confidence": score, "suggestions": []},
+        }
+    
+    monkeypatch.setattr(processor, "_run_agent", fake_run_agent)
+    
+    result = asyncio.run(processor.process_with_agents("Build a landing page", "webdev", "session-1"))
+    
+    assert result["success"] is True
+    assert result["final_prompt"] == "draft"
+    assert result["metadata"]["selected_candidate"] == "draft"
+    stages = result["metadata"]["pipeline"]["stages"]
+    assert set(stages) == {"critic", "refine", "evaluate", "draft", "evaluate_draft"}
+    assert all(stage["status"] == "ok" for stage in stages.values())
+    # The draft started with the critic instead of after it
+    assert stages["draft"]["start_ms"] < stages["critic"]["duration_ms"]
+    assert sorted(calls) == sorted([
+        ("critic", False), ("refiner", False), ("refiner", True), ("evaluator", False), ("evaluator", False)
+    ])
+
+def test_best_of_n_keeps_highest_scored_refinement(monkeypatch):
+    """Refinements fan out at rising temperatures and one batched evaluation picks the winner."""
+    module = sys.modules["app.services.prompt_processor"]
+    monkeypatch.setattr(module, "few_shot_retriever", None)
+    processor = PromptProcessorService(refine_concurrency=1)
+    temperatures = []
+    
+    async def fake_run_agent(agent_type, role, prompt, context=None, temperature=None):
+        if agent_type == "refiner":
+            temperatures.append(temperature)
+            return {"success": True, "message": f"candidate at {temperature}", "metadata": {"confidence": 0.5}}
+        return {"success": True, "message": prompt, "metadata": {"confidence": 0.5, "suggestions": []}}
+    
+    async def fake_evaluate_candidates(role, candidates, context):
+        return {
+            "success": True,
+            "message": "Candidate 2 is clearer",
+            "metadata": {
+                "confidence": 0.9,
+                "suggestions": [],
+                "analysis": {"candidate_scores": [0.4, 0.9], "selected_index": 1},
+            },
+        }
+    
+    monkeypatch.setattr(processor, "_run_agent", fake_run_agent)
+    monkeypatch.setattr(processor, "_evaluate_candidates", fake_evaluate_candidates)
+    
+    # Three requested, but only one extra slot is free
+    result = asyncio.run(processor.process_with_agents("Build a landing page", "webdev", "session-1", candidates=3))
+    
+    assert result["success"] is True
+    assert len(temperatures) == 2
+    assert temperatures[1] > temperatures[0]
+    assert result["final_prompt"] == f"candidate at {temperatures[1]}"
+    assert result["metadata"]["candidates"] == 2
+    assert result["metadata"]["candidate_scores"] == [0.4, 0.9]
+    stats = processor.stats()
+    assert stats["refine_candidates_requested"] == 3
+    assert stats["refine_candidates_granted"] == 2
+    assert stats["refine_candidates_in_flight"] == 0
+
+def test_best_of_n_candidates_differ_on_autogen_engine(monkeypatch):
+    """Each AutoGen refinement samples at its own temperature, so candidates differ."""
+    import autogen
+    from app.services.agents import AgentPool
+    
+    module = sys.modules["app.services.prompt_processor"]
+    monkeypatch.setattr(module.settings, "AGENT_ENGINE", "autogen")
+    monkeypatch.setattr(module, "agent_pool", AgentPool(size=0, max_size=3))
+    replies = {}
+    
+    def fake_initiate_chat(self, recipient, message=None, **kwargs):
+        # Answer with the temperature the assistant's client would sample at
+        temperature = recipient.client._config_list[0]["temperature"]
+        replies[id(self)] = f"Refined prompt: Build a landing page at temperature {temperature}"
+    
+    monkeypatch.setattr(autogen.UserProxyAgent, "initiate_chat", fake_initiate_chat)
+    monkeypatch.setattr(autogen.UserProxyAgent, "last_message", lambda self, agent=None: {"content": replies[id(self)]})
+    processor = PromptProcessorService(refine_concurrency=2)
+    
+    results = asyncio.run(processor._refine_candidates("webdev", "Build a landing page", {"critic_feedback": "Too vague"}, 3))
+    
+    messages = [result["message"] for result in results]
+    assert len(messages) == 3
+    assert len(set(messages)) == 3
+
+def test_early_exit_gates_skip_stages(monkeypatch):
+    """A well-formed prompt skips every agent; a highly rated one skips refinement."""
+    module = sys.modules["app.services.prompt_processor"]
+    monkeypatch.setattr(module.settings, "AGENT_EARLY_EXIT", True)
+    monkeypatch.setattr(module, "few_shot_retriever", None)
+    processor = PromptProcessorService()
+    calls = []
+    
+    async def fake_run_agent(agent_type, role, prompt, context=None, temperature=None):
+        calls.append(agent_type)
+        analysis = {"clarity": 0.9, "technical_accuracy": 0.9, "completeness": 0.95}
+        return {"success": True, "message": "Looks good", "metadata": {"confidence": 0.9, "analysis": analysis}}
+    
+    monkeypatch.setattr(processor, "_run_agent", fake_run_agent)
+    
+    structured = (
+        "Build a responsive landing page for a SaaS analytics product using React and Tailwind.\n"
+        "Requirements:\n"
+        "- The hero section must include a headline of at most 12 words and one call to action\n"
+        "- Include a pricing table with exactly 3 tiers\n"
+        "- Avoid external image hosting; the page should score at least 90 on Lighthouse\n"
+        "Format the answer as a single component file with brief comments for the target audience of junior developers."
+    )
+    result = asyncio.run(processor.process_with_agents(structured, "webdev", "session-1"))
+    
+    assert calls == []
+    assert result["success"] is True
+    assert result["final_prompt"] == structured
+    assert result["metadata"]["early_exit"] == "pregate"
+    assert all(stage["status"] == "skipped" for stage in result["metadata"]["pipeline"]["stages"].values())
+    
+    result = asyncio.run(processor.process_with_agents("Build a landing page", "webdev", "session-1"))
+    
+    assert calls == ["critic"]
+    assert result["final_prompt"] == "Build a landing page"
+    assert result["metadata"]["early_exit"] == "critic"
+    assert [message.type for message in result["messages"]] == ["critique"]
+    stages = result["metadata"]["pipeline"]["stages"]
+    assert stages["critic"]["status"] == "ok"
+    assert stages["refine"]["status"] == stages["evaluate"]["status"] == "skipped"
+    assert processor.stats()["early_exits"] == {"pregate": 1, "critic": 1}
+
+def test_direct_messages_share_a_static_prefix():
+    """The system message is identical across prompts so providers can cache it."""
+    processor = PromptProcessorService()
+    
+    first = processor._build_direct_messages("Build a landing page", "webdev")
+    second = processor._build_direct_messages("Tune a Postgres query", "webdev")
+    
+    assert first[0] == second[0]
+    assert first[0]["role"] == "system"
+    assert "Build a landing page" not in first[0]["content"]
+    assert first[-1]["content"].startswith("Original prompt: Build a landing page")
\ No newline at end of file
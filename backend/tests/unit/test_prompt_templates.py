@@ -0,0 +1,45 @@
+"""
+Unit tests for the compiled prompt template registry.
+"""
+import json
+
+from app.core.agent_config import get_agent_config
+from app.core.prompt_templates import DIRECT, PromptTemplateRegistry
+
+def test_templates_are_compiled_for_every_agent_and_role():
+    """Every pair gets a template whose hash follows its content."""
+    registry = PromptTemplateRegistry(overrides_path=None)
+    
+    critic = registry.get("critic", "webdev")
+    direct = registry.get(DIRECT, "webdev")
+    
+    assert registry.stats()["templates"] == 4 * 4
+    assert critic.system_message == get_agent_config("critic", "webdev")["system_message"]
+    assert "Role-specific context:" in critic.system_message
+    assert "specializing in webdev topics" in direct.system_message
+    assert critic.content_hash == PromptTemplateRegistry(overrides_path=None).get("critic", "webdev").content_hash
+    assert critic.content_hash != registry.get("critic", "analyst").content_hash
+
+def test_overrides_reload_atomically(tmp_path):
+    """Changed overrides swap in new templates; invalid ones keep the current set."""
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps({"roles": {"webdev": {"system_message": "Focus on accessibility."}}}))
+    registry = PromptTemplateRegistry(overrides_path=str(path), reload_interval=0)
+    first = registry.get(DIRECT, "webdev")
+    
+    assert "Focus on accessibility." in first.system_message
+    assert registry.get("refiner", "webdev").system_message.endswith("Focus on accessibility.")
+    
+    path.write_text(json.dumps({"agents": {"refiner": {"temperature": 0.2}}}))
+    # Make sure the modification time differs on coarse-grained filesystems
+    registry._mtime = None
+    
+    assert registry.get("refiner", "webdev").temperature == 0.2
+    assert registry.get(DIRECT, "webdev").content_hash != first.content_hash
+    assert registry.version == 2
+    
+    path.write_text(json.dumps({"roles": {"unknown": {"system_message": "x"}}}))
+    registry._mtime = None
+    
+    assert registry.get("refiner", "webdev").temperature == 0.2
+    assert registry.version == 2
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Unit tests for latency-aware provider routing and failover.
+"""
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.services.provider_router import Backend, ProviderRouter, parse_backends
+
+DEEPSEEK = Backend("deepseek", "deepseek-chat")
+OPENAI = Backend("openai", "gpt-4o-mini")
+
+def make_router(mode="latency", **kwargs):
+    return ProviderRouter([DEEPSEEK, OPENAI], mode=mode, alpha=0.5, **kwargs)
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.example.com"))
+
+def test_parse_backends():
+    """Backends are provider:model pairs in order; malformed entries are rejected."""
+    assert parse_backends(" deepseek:deepseek-chat, openai:gpt-4o-mini,") == [DEEPSEEK, OPENAI]
+    with pytest.raises(ValueError):
+        parse_backends("openai")
+
+def test_default_routing_honours_requested_provider():
+    """Without opting in, requests only go to the provider the user picked."""
+    router = ProviderRouter([DEEPSEEK, OPENAI])
+    router.record_success(DEEPSEEK, 5.0)
+    router.record_failure(DEEPSEEK)
+    
+    assert router.mode == "fixed"
+    assert router.route({"deepseek", "openai"}, preferred="deepseek") == [DEEPSEEK]
+
+def test_route_orders_by_mode_and_available_keys():
+    """Latency mode prefers the faster backend, failover the requested one, fixed only the requested one."""
+    router = make_router()
+    router.record_success(DEEPSEEK, 2.0)
+    router.record_success(OPENAI, 0.5)
+    
+    assert router.route({"deepseek", "openai"}, preferred="deepseek") == [OPENAI, DEEPSEEK]
+    assert router.route({"deepseek"}, preferred="openai") == [DEEPSEEK]
+    
+    router.mode = "failover"
+    assert router.route({"deepseek", "openai"}, preferred="deepseek") == [DEEPSEEK, OPENAI]
+    
+    router.mode = "fixed"
+    assert router.route({"deepseek", "openai"}, preferred="deepseek") == [DEEPSEEK]
+    assert router.route({"openai"}, preferred="deepseek") == []
+
+def test_unhealthy_backend_is_tried_last_until_cooldown():
+    """A failing backend drops behind healthy ones and is preferred again after the cooldown."""
+    router = make_router(mode="failover", error_threshold=0.5, cooldown=60)
+    router.record_failure(DEEPSEEK)
+    
+    assert not router.is_healthy(DEEPSEEK)
+    assert router.route({"deepseek", "openai"}, preferred="deepseek") == [OPENAI, DEEPSEEK]
+    
+    router._health[DEEPSEEK].last_failure -= 60
+    assert router.route({"deepseek", "openai"}, preferred="deepseek") == [DEEPSEEK, OPENAI]
+
+def test_call_fails_over_on_connection_errors_only():
+    """Connect errors move to the next backend; other errors are raised without touching health."""
+    router = make_router()
+    calls = []
+    
+    async def flaky(backend, final):
+        calls.append((backend.provider, final))
+        if backend == DEEPSEEK:
+            raise connection_error()
+        return "ok"
+    
+    result, backend = asyncio.run(router.call([DEEPSEEK, OPENAI], flaky))
+    
+    assert (result, backend) == ("ok", OPENAI)
+    assert calls == [("deepseek", False), ("openai", True)]
+    stats = router.stats()
+    assert stats["failovers"] == 1
+    assert stats["backends"]["deepseek:deepseek-chat"]["failures"] == 1
+    assert stats["backends"]["openai:gpt-4o-mini"]["successes"] == 1
+    
+    async def rejected(backend, final):
+        raise ValueError("invalid api key")
+    
+    with pytest.raises(ValueError):
+        asyncio.run(router.call([OPENAI, DEEPSEEK], rejected))
+    assert router.stats()["backends"]["openai:gpt-4o-mini"]["failures"] == 0
+    
+    async def down(backend, final):
+        raise connection_error()
+    
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(router.call([OPENAI], down))
\ No newline at end of file
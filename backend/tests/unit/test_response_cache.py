@@ -0,0 +1,85 @@
+"""
+Unit tests for the prompt enhancement response cache.
+"""
+import asyncio
+
+from app.services.response_cache import (
+    ResponseCache,
+    SQLiteResponseBackend,
+    make_cache_key,
+    wants_cache_bypass,
+)
+
+def test_cache_key_normalizes_whitespace_and_versions_system_message():
+    """Whitespace-only differences share a key; a new system message does not."""
+    key = make_cache_key("Build  a\nsite ", "webdev", "openai", "gpt-4o-mini", 0.5, "v1")
+    
+    assert key == make_cache_key("Build a site", "webdev", "openai", "gpt-4o-mini", 0.5, "v1")
+    assert key != make_cache_key("Build a site", "webdev", "openai", "gpt-4o-mini", 0.5, "v2")
+    assert key != make_cache_key("Build a site", "webdev", "openai", "gpt-4o-mini", 0.7, "v1")
+
+def test_sqlite_backend_is_shared_and_bounded(tmp_path):
+    """Entries written by one backend are visible to another and pruned past max_size."""
+    path = str(tmp_path / "responses.sqlite3")
+    writer = ResponseCache(SQLiteResponseBackend(path, max_size=2, ttl=60, prune_interval=0), ttl=60)
+    reader = ResponseCache(SQLiteResponseBackend(path, max_size=2, ttl=60, prune_interval=0), ttl=60)
+    
+    async def run():
+        for key in ["a", "b", "c"]:
+            await writer.set(key, {"response": key})
+        return await reader.get("a"), await reader.get("c")
+    
+    oldest, newest = asyncio.run(run())
+    
+    assert oldest is None
+    assert newest == {"response": "c"}
+    assert reader.stats()["size"] == 2
+    assert reader.stats()["hits"] == 1
+
+def test_sqlite_backend_reads_do_not_write_and_prunes_are_batched(tmp_path):
+    """Hits only update access times in memory; the next prune writes them and evicts the coldest entry."""
+    backend = SQLiteResponseBackend(str(tmp_path / "responses.sqlite3"), max_size=2, ttl=60, prune_interval=3600)
+    backend.set("a", {"response": "a"})
+    backend.set("b", {"response": "b"})
+    backend.set("c", {"response": "c"})
+    # Within the interval nothing is pruned
+    assert backend.stats()["size"] == 3
+    
+    writes = backend._conn.total_changes
+    assert backend.get("a") == {"response": "a"}
+    assert backend._conn.total_changes == writes
+    
+    backend._next_prune = 0
+    backend.set("d", {"response": "d"})
+    
+    assert backend.stats()["size"] == 2
+    assert backend.get("a") == {"response": "a"}
+    assert backend.get("d") == {"response": "d"}
+
+def test_wants_cache_bypass():
+    """The body flag and no-cache request headers both bypass the cache."""
+    assert wants_cache_bypass(True, None)
+    assert wants_cache_bypass(False, "no-cache")
+    assert not wants_cache_bypass(False, "max-age=0, private")
+    assert not wants_cache_bypass(False, None)
+
+def test_normal_prompt_serves_repeats_from_cache(client, mock_llm_client, test_session_id):
+    """A repeated prompt should hit the cache until the client bypasses it."""
+    body = {
+        "prompt": "How do I create a responsive layout in CSS?",
+        "role": "webdev",
+        "model": "sonar",
+        "sessionId": test_session_id
+    }
+    
+    first = client.post("/normal-prompt", json=body)
+    second = client.post("/normal-prompt", json={**body, "prompt": "  How do I create a responsive layout   in CSS?"})
+    bypassed = client.post("/normal-prompt", json={**body, "bypassCache": True})
+    
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.headers["Cache-Control"].startswith("private, max-age=")
+    assert second.json() == first.json()
+    assert bypassed.headers["X-Cache"] == "BYPASS"
+    assert bypassed.headers["Cache-Control"] == "no-store"
+    assert len(mock_llm_client.get_calls()) == 2
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Unit tests for few-shot example retrieval.
+"""
+import json
+import os
+
+from app.services.retrieval import FewShotRetriever, format_example_answer
+
+def _example(text, domain, improved, issues=("Too vague",)):
+    return {
+        "original_prompt": {"text": text, "user_context": {"domain": domain}},
+        "analysis": {"issues": [{"details": detail} for detail in issues]},
+        "improved_prompt": {"text": improved},
+    }
+
+def _write(path, examples):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"training_examples": examples}, f)
+
+EXAMPLES = [
+    _example("analyze this dataset", "data_analysis", "Analyze the customer churn dataset and report the top factors."),
+    _example("create ui for dashboard", "frontend_development", "Design a responsive admin dashboard UI with charts in React."),
+    _example("make me a story", "creative_writing", "Write a 500-word fantasy story with a hopeful tone."),
+]
+
+def test_retrieves_similar_examples_for_the_role(tmp_path):
+    """The closest example ranks first and unrelated prompts get none."""
+    path = tmp_path / "rag.json"
+    _write(path, EXAMPLES)
+    retriever = FewShotRetriever(path=str(path), top_k=2, min_score=0.25)
+    
+    assert retriever.load() == 3
+    results = retriever.retrieve("build a react dashboard with charts", "webdev")
+    
+    assert results[0]["original"] == "create ui for dashboard"
+    assert all(result["score"] >= 0.25 for result in results)
+    assert retriever.retrieve("zzz qqq", "analyst") == []
+
+def test_reloads_when_the_file_changes(tmp_path):
+    """A changed modification time swaps in the new examples."""
+    path = tmp_path / "rag.json"
+    _write(path, EXAMPLES[:1])
+    retriever = FewShotRetriever(path=str(path), min_score=0.25, reload_interval=0)
+    retriever.load()
+    assert retriever.retrieve("write a fantasy story", "designer") == []
+    
+    _write(path, EXAMPLES)
+    os.utime(path, (1, 1))
+    
+    results = retriever.retrieve("write a fantasy story", "designer")
+    assert results[0]["original"] == "make me a story"
+    assert retriever.stats()["loads"] == 2
+
+def test_missing_file_keeps_previous_examples(tmp_path):
+    """A failed reload leaves the last good index in place."""
+    path = tmp_path / "rag.json"
+    _write(path, EXAMPLES)
+    retriever = FewShotRetriever(path=str(path))
+    retriever.load()
+    
+    retriever.path = str(tmp_path / "missing.json")
+    
+    assert retriever.load() == 3
+    assert retriever.stats()["examples"] == 3
+
+def test_example_answer_matches_direct_response_format():
+    """Few-shot answers use the format the direct path parses."""
+    example = FewShotRetriever.parse_examples({"training_examples": EXAMPLES})[0]
+    
+    answer = format_example_answer(example)
+    
+    assert answer.startswith("Enhanced prompt: Analyze the customer churn dataset")
+    assert "\n\nExplanation: Addressed too vague." in answer
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Unit tests for the semantic near-duplicate cache.
+"""
+import pytest
+
+from app.services.semantic_cache import HashedNgramEmbedder, SemanticCache
+
+def test_embedder_scores_rewordings_above_different_requests():
+    """Rewordings should be closer than prompts asking for something else."""
+    embedder = HashedNgramEmbedder(dim=512)
+    
+    base = embedder.embed("analyze this dataset")
+    reworded = embedder.embed("analyse my dataset please")
+    different = embedder.embed("visualize this dataset")
+    
+    assert float(base @ reworded) > 0.99
+    assert float(base @ different) < 0.9
+
+def test_semantic_cache_hits_within_scope_only():
+    """Near-duplicates hit within their role and model; other scopes miss."""
+    cache = SemanticCache(threshold=0.9, capacity=10, ttl=60, sample_rate=0.0, verify_threshold=0.6)
+    cache.store("How do I optimize my SQL query?", ("analyst", "sonar"), {"response": "Enhanced prompt: X"})
+    
+    hit = cache.lookup("optimise this SQL query please", ("analyst", "sonar"))
+    other_role = cache.lookup("optimise this SQL query please", ("webdev", "sonar"))
+    unrelated = cache.lookup("Write a haiku about autumn", ("analyst", "sonar"))
+    
+    assert hit["value"] == {"response": "Enhanced prompt: X"}
+    assert hit["sampled"] is False
+    assert other_role is None
+    assert unrelated is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["lookups"] == 3
+
+def test_semantic_cache_capacity_and_false_hit_sampling():
+    """The oldest entry is overwritten when full and sampled hits are verified."""
+    cache = SemanticCache(threshold=0.9, capacity=1, ttl=60, sample_rate=1.0, verify_threshold=0.6)
+    cache.store("deploy a flask app", "scope", {"response": "Deploy Flask with gunicorn"})
+    cache.store("tune postgres indexes", "scope", {"response": "Tune Postgres indexes"})
+    
+    assert cache.lookup("deploy a flask app", "scope") is None
+    
+    match = cache.lookup("tune postgres indexes", "scope")
+    assert match["sampled"] is True
+    assert cache.verify(match, "Tune Postgres indexes for reads") is True
+    assert cache.verify(match, "Write a haiku about autumn") is False
+    assert cache.stats()["false_hit_rate"] == 0.5
+
+def test_semantic_cache_grows_on_demand_and_evicts_old_scopes():
+    """Indexes allocate as entries arrive and the least recently used scope is dropped."""
+    cache = SemanticCache(threshold=0.9, capacity=100, ttl=60, sample_rate=0.0, verify_threshold=0.6, max_scopes=2)
+    for i in range(20):
+        cache.store(f"summarize report number {i}", "a", {"response": str(i)})
+    cache.store("deploy a flask app", "b", {"response": "Flask"})
+    
+    assert len(cache._indexes["a"].vectors) == 32
+    assert len(cache._indexes["b"].vectors) == 16
+    assert cache.lookup("summarize report number 3", "a")["value"] == {"response": "3"}
+    
+    cache.store("tune postgres indexes", "c", {"response": "Postgres"})
+    
+    assert cache.lookup("deploy a flask app", "b") is None
+    assert cache.lookup("summarize report number 3", "a") is not None
+    assert cache.stats()["scopes"] == 2
+    assert cache.stats()["evicted_scopes"] == 1
+
+@pytest.mark.parametrize("stored, asked", [
+    ("Build a settings page with dark mode", "Build a settings page without dark mode"),
+    ("Build a settings page that supports dark mode", "Build a settings page that doesn't support dark mode"),
+    ("List the customers who signed up in 2023", "List the customers who signed up in 2024"),
+    ('Rename the "user_id" column', 'Rename the "account_id" column'),
+    ("Compare TCP and UDP for streaming", "Compare UDP and TCP for streaming"),
+])
+def test_semantic_cache_rejects_near_misses(stored, asked):
+    """Prompts that differ in negation, numbers, literals or word order never share an enhancement."""
+    cache = SemanticCache(threshold=0.5, capacity=10, ttl=60, sample_rate=0.0, verify_threshold=0.6)
+    cache.store(stored, "scope", {"response": "Enhanced prompt: X"})
+    
+    assert cache.lookup(asked, "scope") is None
+    assert cache.lookup(stored, "scope") is not None
+
+def test_semantic_cache_skips_rejected_candidates():
+    """A near miss that is more similar does not hide a valid match behind it."""
+    cache = SemanticCache(threshold=0.5, capacity=10, ttl=60, sample_rate=0.0, verify_threshold=0.6)
+    cache.store("Summarize the 2023 sales report", "scope", {"response": "2023"})
+    cache.store("Please summarise the 2024 sales report", "scope", {"response": "2024"})
+    
+    assert cache.lookup("Summarize the 2024 sales report", "scope")["value"] == {"response": "2024"}
\ No newline at end of file
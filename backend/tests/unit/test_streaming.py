@@ -0,0 +1,71 @@
+"""
+Unit tests for streamed prompt enhancement.
+"""
+import json
+
+from app.utils.streaming import SectionTracker
+
+def _parse_sse(body):
+    """Parse an SSE body into a list of (event, data) tuples."""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_section_tracker_detects_markers_split_across_chunks():
+    """Markers should be found even when a delta boundary splits them."""
+    tracker = SectionTracker()
+    events = []
+    for chunk in ["Enhan", "ced Pro", "mpt: Do X.\nExpla", "nation", ": Because Y."]:
+        events.extend(tracker.feed(chunk))
+    
+    assert events == [
+        {"section": "enhanced_prompt", "previous": None},
+        {"section": "explanation", "previous": "enhanced_prompt"},
+    ]
+    assert tracker.sections() == {"enhanced_prompt": "Do X.", "explanation": "Because Y."}
+
+def test_normal_prompt_stream_endpoint(client, mock_llm_client, test_roles, test_prompts, test_session_id):
+    """The streaming endpoint should emit deltas, a section change and a summary."""
+    response = client.post(
+        "/normal-prompt/stream",
+        json={
+            "prompt": test_prompts[0],
+            "role": test_roles[0],
+            "model": "sonar",
+            "sessionId": test_session_id
+        }
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = _parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "delta"
+    assert ("section", {"section": "explanation", "previous": "enhanced_prompt"}) in events
+    assert names[-1] == "summary"
+    
+    summary = events[-1][1]
+    assert summary["success"] is True
+    assert summary["enhanced_prompt"] == "Build a responsive CSS grid layout."
+    assert summary["explanation"] == "Added specifics."
+    assert "".join(data["text"] for name, data in events if name == "delta") == summary["response"]
+
+def test_normal_prompt_stream_invalid_role(client, mock_llm_client, test_prompts, test_session_id):
+    """Invalid roles should produce a single error event."""
+    response = client.post(
+        "/normal-prompt/stream",
+        json={
+            "prompt": test_prompts[0],
+            "role": "invalid_role",
+            "model": "sonar",
+            "sessionId": test_session_id
+        }
+    )
+    
+    events = _parse_sse(response.text)
+    assert len(events) == 1
+    assert events[0][0] == "error"
+    assert "Invalid role" in events[0][1]["error"]
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Unit tests for the async Supabase data layer against a PostgREST stand-in.
+"""
+import asyncio
+import json
+import re
+import httpx
+import pytest
+
+from app.services.supabase_client import SupabaseService
+from app.utils.pagination import encode_cursor
+
+class FakePostgrest:
+    """In-memory stand-in for the PostgREST endpoints the service uses."""
+    
+    def __init__(self):
+        self.tables = {"users": [], "prompt_history": []}
+        self.requests = []
+    
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        assert request.headers["apikey"] == "service-key"
+        table = request.url.path.rsplit("/", 1)[-1]
+        if table not in self.tables:
+            return httpx.Response(404, json={"message": f"relation {table} does not exist"})
+        
+        if request.method == "POST":
+            row = json.loads(request.content)
+            row["id"] = str(len(self.tables[table]) + 1)
+            self.tables[table].append(row)
+            return httpx.Response(201, json=[row])
+        
+        rows = list(self.tables[table])
+        params = dict(request.url.params)
+        for column, condition in params.items():
+            if condition.startswith("eq."):
+                rows = [row for row in rows if str(row.get(column)) == condition[3:]]
+        if "or" in params:
+            # Only the keyset form: (a.lt."x",and(a.eq."x",b.lt."y"))
+            (a, _, x), _, (b, _, y) = re.findall(r'(\w+)\.(lt|eq)\."([^"]*)"', params["or"])
+            rows = [row for row in rows if (row[a], row[b]) < (x, y)]
+        if "order" in params:
+            for part in reversed(params["order"].split(",")):
+                column, direction = part.split(".")
+                rows.sort(key=lambda row: row[column], reverse=direction == "desc")
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        if params.get("select", "*") != "*":
+            columns = params["select"].split(",")
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return httpx.Response(200, json=rows)
+
+def _service(fake):
+    return SupabaseService(
+        url="https://project.supabase.co",
+        key="service-key",
+        transport=httpx.MockTransport(fake.handler),
+    )
+
+def test_prompt_history_round_trip():
+    """Saved history should be returned newest first through PostgREST queries."""
+    fake = FakePostgrest()
+    service = _service(fake)
+    
+    async def run():
+        await service.save_prompt_history("user-1", "first", "First enhanced", "webdev")
+        fake.tables["prompt_history"][0]["created_at"] = "2024-01-01"
+        await service.save_prompt_history("user-1", "second", "Second enhanced", "webdev")
+        fake.tables["prompt_history"][1]["created_at"] = "2024-01-02"
+        await service.save_prompt_history("user-2", "other", "Other enhanced", "webdev")
+        history = await service.get_user_prompt_history("user-1", limit=10)
+        await service.aclose()
+        return history
+    
+    history = asyncio.run(run())
+    
+    assert history["success"] is True
+    assert [row["original_prompt"] for row in history["data"]] == ["second", "first"]
+    query = fake.requests[-1].url.params
+    assert query["user_id"] == "eq.user-1"
+    assert query["order"] == "created_at.desc"
+    assert fake.requests[0].headers["Prefer"] == "return=representation"
+
+def test_get_user_and_errors():
+    """Users are looked up by id and email; PostgREST errors become result errors."""
+    fake = FakePostgrest()
+    fake.tables["users"].append({"id": "7", "email": "user@example.com"})
+    service = _service(fake)
+    
+    async def run():
+        by_id = await service.get_user("7")
+        by_email = await service.get_user_by_email("user@example.com")
+        missing = await service.get_user("8")
+        del fake.tables["prompt_history"]
+        failed = await service.get_user_prompt_history("7")
+        await service.aclose()
+        return by_id, by_email, missing, failed
+    
+    by_id, by_email, missing, failed = asyncio.run(run())
+    
+    assert by_id == by_email == {"id": "7", "email": "user@example.com"}
+    assert missing is None
+    assert failed == {"success": False, "error": "relation prompt_history does not exist"}
+
+def test_prompt_history_pages_by_keyset():
+    """Pages follow (created_at, id) order, project columns and filter by role."""
+    fake = FakePostgrest()
+    for i in range(5):
+        fake.tables["prompt_history"].append({
+            "id": f"00000000-0000-4000-8000-00000000000{i}",
+            "user_id": "user-1",
+            "role": "webdev" if i % 2 == 0 else "analyst",
+            "original_prompt": f"prompt {i}",
+            "original_preview": f"prompt {i}",
+            # Two rows share a timestamp so the id breaks the tie
+            "created_at": "2024-01-02T00:00:00+00:00" if i >= 3 else f"2024-01-0{i}T00:00:00+00:00",
+        })
+    service = _service(fake)
+    
+    async def run():
+        pages = []
+        cursor = None
+        while True:
+            page = await service.get_prompt_history_page(
+                "user-1", limit=2, cursor=cursor, columns=["original_preview"]
+            )
+            pages.append(page["data"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        by_role = await service.get_prompt_history_page("user-1", role="analyst")
+        await service.aclose()
+        return pages, by_role
+    
+    pages, by_role = asyncio.run(run())
+    
+    assert [[row["id"][-1] for row in page] for page in pages] == [["4", "3"], ["2", "1"], ["0"]]
+    assert set(pages[0][0]) == {"created_at", "id", "original_preview"}
+    assert [row["id"][-1] for row in by_role["data"]] == ["3", "1"]
+    assert by_role["next_cursor"] is None
+    assert fake.requests[-1].url.params["order"] == "created_at.desc,id.desc"
+
+def test_prompt_history_page_rejects_bad_input():
+    """Malformed cursors and unknown columns are reported as ValueError."""
+    service = SupabaseService(url=None, key=None)
+    
+    with pytest.raises(ValueError):
+        asyncio.run(service.get_prompt_history_page("user-1", cursor="not-a-cursor"))
+    # Cursors are client-supplied; values that could rewrite the filter are rejected
+    tampered = [
+        ['2024-01-01",id.gt."0', "00000000-0000-4000-8000-000000000001"],
+        ["2024-01-01T00:00:00+00:00", '0"),or(user_id.neq."0'],
+        [20240101, "00000000-0000-4000-8000-000000000001"],
+    ]
+    for values in tampered:
+        with pytest.raises(ValueError):
+            asyncio.run(service.get_prompt_history_page("user-1", cursor=encode_cursor(values)))
+    with pytest.raises(ValueError):
+        asyncio.run(service.get_prompt_history_page("user-1", columns=["password_hash"]))
\ No newline at end of file
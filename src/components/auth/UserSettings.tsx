@@ -9,6 +9,7 @@ import { PersonalInformation } from "./PersonalInformation";
 import { Badge } from "@/components/ui/badge";
 import { Input } from "@/components/ui/input";
 import { supabase } from "@/lib/supabase";
+import { ApiService } from "@/services/apiService";
 import {
   Dialog,
   DialogContent,
@@ -22,7 +23,7 @@ interface UserApiKeys {
 }
 
 export const UserSettings = () => {
-  const { user, signOut } = useAuth();
+  const { user, session, signOut } = useAuth();
   const navigate = useNavigate();
   const [notifications, setNotifications] = useState(true);
   const [open, setOpen] = useState(false);
@@ -131,6 +132,11 @@ export const UserSettings = () => {
           throw new Error(result.error.message);
         }
         
+        // Make the backend pick up the new keys immediately
+        if (session?.access_token) {
+          await ApiService.invalidateApiKeyCache(user!.id, session.access_token);
+        }
+        
         // Refresh the API keys after saving
         await fetchUserApiKeys();
         setSaveSuccess(true);
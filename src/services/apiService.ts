@@ -161,6 +161,24 @@ export class ApiService {
     }
   }
 
+  // Drop the backend's cached copy of the user's API keys after they change;
+  // the backend only accepts this for the user the access token belongs to
+  static async invalidateApiKeyCache(sessionId: string, accessToken: string): Promise<void> {
+    try {
+      await fetch(`${this.AGENT_URL}/api-keys/invalidate`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "Authorization": `Bearer ${accessToken}`,
+        },
+        body: JSON.stringify({ sessionId }),
+      });
+    } catch (error) {
+      // The cache expires on its own, so a failed invalidation is not fatal
+      console.error("Error invalidating API key cache:", error);
+    }
+  }
+
   // RAG endpoint - commented out
   /*
   static async gregifyPromptRAG(